@@ -0,0 +1,92 @@
+"""
+Texturen vorbacken - Schreibt die Boden- und Hintergrundtexturen aller Rennen als renderfertige .npy-Dateien
+
+Mode7 bereitet jede Textur beim Laden auf (PNG dekodieren, ins Pixelformat des Displays umwandeln,
+auf Zweierpotenz auffüllen bzw. zum Skybox-Band kacheln). Dieses Skript erledigt das einmalig vorab und legt
+das Ergebnis in BAKED_TEXTURE_DIR ab (Array als .npy, Größe/Mip-Tabelle/Offsets und Hash der Quelldatei als .json).
+Im Spiel öffnet Mode7 die Dateien per Memory-Mapping (numpy.load mit mmap_mode='r').
+
+Die vorgebackenen Dateien hängen vom Pixelformat und von den Renderer-Einstellungen (Auflösung, Horizont, Mipmaps) ab.
+Ändert sich eine PNG-Datei, wird die zugehörige vorgebackene Textur am Hash erkannt und ignoriert,
+bis das Skript erneut ausgeführt wird.
+
+Palettenindizierte Bodentexturen (siehe INDEXED_FLOOR) hängen nicht vom Pixelformat ab und werden einmal gebacken,
+die Palette steht mit in der .json-Datei.
+
+Aufruf:
+- python bake_textures.py
+- python bake_textures.py --pixel-formats packed
+"""
+
+import argparse
+import os
+from types import SimpleNamespace
+
+# Muss vor dem Import von pygame gesetzt sein
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from settings.renderer_settings import WIN_RES, BAKED_TEXTURE_DIR, FLOOR_TEXTURE_ORIGIN_TILE
+from settings.league_settings import LEAGUES, SINGLE_MODE_RACES
+from mode7 import Mode7
+from texture_cache import save_baked_texture
+
+# Pixelformate des Renderers (siehe PACKED_PIXELS in den Renderer-Einstellungen)
+PIXEL_FORMATS = {"rgb": False, "packed": True}
+
+# Alle Rennen aus Ligen und Einzelrennen-Auswahl (ohne Duplikate)
+def all_races():
+    races = []
+    for race in [race for league in LEAGUES for race in league.races] + list(SINGLE_MODE_RACES):
+        if race not in races:
+            races.append(race)
+    return races
+
+# Backt die Bodentextur in dem Format, das der übergebene Renderer verwendet.
+def bake_floor_texture(mode7, path):
+    floor_array, mip_levels, offset, size, palette = mode7.decode_floor_texture(path)
+    info = {"size": size, "mip_levels": mip_levels.tolist(), "offset": offset}
+    if palette is not None:
+        info["palette"] = palette.tolist()
+    name = mode7.baked_texture_name("floor", path, FLOOR_TEXTURE_ORIGIN_TILE)
+    save_baked_texture(BAKED_TEXTURE_DIR, name, path, floor_array, info)
+    print(f"{name}: {floor_array.nbytes / 1024 / 1024:.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description = "Backt die Mode-7-Texturen aller Rennen als .npy-Dateien vor")
+    parser.add_argument("--pixel-formats", nargs = "+", default = list(PIXEL_FORMATS), choices = list(PIXEL_FORMATS))
+    parser.add_argument("--no-indexed", dest = "indexed", action = "store_false",
+        help = "Keine palettenindizierten Bodentexturen backen")
+    args = parser.parse_args()
+
+    # Für convert() wird ein Display gebraucht (das Pixelformat des Displays landet in den gepackten Texturen)
+    pygame.init()
+    app = SimpleNamespace(screen = pygame.display.set_mode(WIN_RES))
+
+    races = all_races()
+    floor_paths = sorted({race.floor_texture_path for race in races})
+    bg_paths = sorted({race.bg_texture_path for race in races})
+
+    # Palettenindizierte Bodentexturen (unabhängig vom Pixelformat)
+    if args.indexed:
+        mode7 = Mode7(app, races[0].floor_texture_path, races[0].bg_texture_path, False, indexed_floor = True)
+        for path in floor_paths:
+            bake_floor_texture(mode7, path)
+
+    for pixel_format in args.pixel_formats:
+        # Renderer nur als Träger der Einstellungen (Pixelformat, Horizont), die Texturen werden unten einzeln dekodiert
+        mode7 = Mode7(app, races[0].floor_texture_path, races[0].bg_texture_path, False,
+            packed_pixels = PIXEL_FORMATS[pixel_format])
+
+        for path in floor_paths:
+            bake_floor_texture(mode7, path)
+
+        for path in bg_paths:
+            bg_array, size = mode7.decode_bg_texture(path)
+            name = mode7.baked_texture_name("bg", path, mode7.horizon)
+            save_baked_texture(BAKED_TEXTURE_DIR, name, path, bg_array, {"size": size})
+            print(f"{name}: {bg_array.nbytes / 1024:.1f} KB")
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,33 @@
 # da die Formen nicht im Bildschirmraum sind, sondern in einem benutzerdefinierten logischen 3D-Raum,
 # von dem pygame nichts weiß.
 
+import math
+
+import numpy
+
+# Kantenlänge der Zellen des Gitters, über das die Strecke ihre Kollisionsrechtecke findet (siehe CollisionGrid),
+# in Weltkoordinaten. Das Spieler-Kollisionsrechteck liegt damit meist in einer, höchstens in vier Zellen.
+COLLISION_GRID_CELL_SIZE = 8.0
+
+# Rechtecke, die mehr Zellen überdecken würden (z.B. die Fläche der Monochrome-Strecke),
+# werden nicht ins Gitter eingetragen, sondern bei jeder Abfrage direkt geprüft.
+COLLISION_GRID_MAX_CELLS_PER_RECT = 1024
+
+# Bei so wenigen Rechtecken ist das Durchlaufen der Liste schneller als das Nachschlagen im Gitter
+COLLISION_GRID_MIN_RECTS = 4
+
+# Rechtecke werden um diesen Betrag vergrößert eingetragen, damit Rechtecke, die sich genau an einer Zellgrenze
+# berühren, trotz Rundung eine gemeinsame Zelle haben (overlap zählt Berühren als Überlappung)
+COLLISION_GRID_MARGIN = 1e-6
+
+# Abstand, bis zu dem zwei Rechtecke eines Index als Nachbarn gelten (siehe CollisionGrid.neighbours).
+# Etwa die Größe des Spieler-Kollisionsrechtecks: Verlässt es ein Rechteck, liegt es meist in einem Nachbarn.
+COLLISION_NEIGHBOUR_MARGIN = 1.0
+
+# Höchstzahl der Paare aus Probe- und Kollisionsrechteck, die eine Batch-Abfrage auf einmal vergleicht
+# (begrenzt den Speicher für die Zwischenergebnisse, siehe overlap_matrix)
+BATCH_OVERLAP_BLOCK_PAIRS = 1 << 20
+
 # Eine Klasse, die ein rechteckiges Kollisionsrechteck um ein Spielobjekt modelliert.
 # Eine numpy-Liste wird verwendet, um die Position des Kollisionsrechtecks zu modellieren.
 class CollisionRect:
@@ -22,4 +49,227 @@ class CollisionRect:
 
 
     def __str__(self):
-        return "(" + str(self.position[0]) + ", " + str(self.position[1]) + "), " + str(self.width) + ", " + str(self.height)
\ No newline at end of file
+        return "(" + str(self.position[0]) + ", " + str(self.position[1]) + "), " + str(self.width) + ", " + str(self.height)
+
+
+
+# Räumlicher Index über eine Liste von Kollisionsrechtecken (gleichmäßiges Gitter).
+# Jedes Rechteck wird in alle Zellen eingetragen, die es überdeckt. Eine Abfrage prüft nur die Rechtecke
+# in den Zellen, die das abgefragte Rechteck überdeckt, der Aufwand hängt also nicht von der Anzahl
+# der Rechtecke auf der Strecke ab. Das Ergebnis ist dasselbe wie beim Durchlaufen der ganzen Liste.
+#
+# Optional gehört zu jedem Rechteck ein Bit-Flag (Parameter flags, gleich lang wie rects).
+# So kann ein Index Rechtecke verschiedener Arten enthalten, overlap_flags bestimmt dann alle Arten auf einmal.
+class CollisionGrid:
+    def __init__(self, rects, cell_size = COLLISION_GRID_CELL_SIZE, flags = None):
+        self.rects = list(rects)
+        self.cell_size = cell_size
+        self.flags = list(flags) if flags is not None else [1] * len(self.rects)
+
+        # Zelle (Spalte, Zeile) -> Liste aus (Rechteck, Flag) der Rechtecke, die sie überdecken,
+        # in der Reihenfolge der Liste
+        self.cells = {}
+
+        # Rechtecke (mit Flag), die bei jeder Abfrage geprüft werden (zu groß fürs Gitter oder zu wenige Rechtecke)
+        self.unindexed_rects = []
+
+        # Indizes der Rechtecke pro Zelle bzw. der nicht eingetragenen Rechtecke, nur zum Bestimmen der Nachbarn
+        cell_indices = {}
+        unindexed_indices = []
+
+        for index, (rect, flag) in enumerate(zip(self.rects, self.flags)):
+            first_column, last_column, first_row, last_row = self.cell_range(rect, COLLISION_GRID_MARGIN)
+            cell_count = (last_column - first_column + 1) * (last_row - first_row + 1)
+            if len(self.rects) < COLLISION_GRID_MIN_RECTS or cell_count > COLLISION_GRID_MAX_CELLS_PER_RECT:
+                self.unindexed_rects.append((rect, flag))
+                unindexed_indices.append(index)
+                continue
+            for column in range(first_column, last_column + 1):
+                for row in range(first_row, last_row + 1):
+                    self.cells.setdefault((column, row), []).append((rect, flag))
+                    cell_indices.setdefault((column, row), []).append(index)
+
+        # Nachbarn jedes Rechtecks: die anderen Rechtecke, die es (um COLLISION_NEIGHBOUR_MARGIN vergrößert) berührt,
+        # in der Reihenfolge der Liste. Werden einmal beim Laden bestimmt (siehe overlaps mit CollisionHitCache).
+        # Kandidaten sind die Rechtecke in den Zellen, die das vergrößerte Rechteck überdeckt, und die nicht eingetragenen.
+        # Für ein nicht eingetragenes Rechteck (zu viele Zellen) kommen alle Rechtecke in Frage.
+        self.neighbours = {}
+        unindexed = set(unindexed_indices)
+        for index, rect in enumerate(self.rects):
+            if index in unindexed:
+                candidates = range(len(self.rects))
+            else:
+                candidates = set(unindexed_indices)
+                first_column, last_column, first_row, last_row = self.cell_range(
+                    rect, COLLISION_NEIGHBOUR_MARGIN + COLLISION_GRID_MARGIN
+                )
+                for column in range(first_column, last_column + 1):
+                    for row in range(first_row, last_row + 1):
+                        candidates.update(cell_indices.get((column, row), ()))
+                candidates = sorted(candidates)
+            self.neighbours[rect] = [
+                self.rects[other] for other in candidates
+                if other != index and self.near(rect, self.rects[other], COLLISION_NEIGHBOUR_MARGIN)
+            ]
+
+    # Bestimmt, ob das erste Rechteck, um margin vergrößert, das zweite berührt (wie CollisionRect.overlap)
+    @staticmethod
+    def near(rect, other, margin):
+        return (
+            abs(rect.position[0] - other.position[0]) <= (rect.width / 2 + margin) + other.width / 2 and
+            abs(rect.position[1] - other.position[1]) <= (rect.height / 2 + margin) + other.height / 2
+        )
+
+    # Erste und letzte Spalte bzw. Zeile der Zellen, die das Rechteck (um margin vergrößert) überdeckt
+    def cell_range(self, rect, margin = 0.0):
+        half_width = rect.width / 2 + margin
+        half_height = rect.height / 2 + margin
+        x = rect.position[0]
+        y = rect.position[1]
+        return (
+            math.floor((x - half_width) / self.cell_size), math.floor((x + half_width) / self.cell_size),
+            math.floor((y - half_height) / self.cell_size), math.floor((y + half_height) / self.cell_size)
+        )
+
+    # Bestimmt, ob das übergebene Kollisionsrechteck mit einem der Rechtecke im Index überlappt.
+    #
+    # Mit dem Zwischenspeicher einer Abfragestelle (siehe CollisionHitCache) wird zuerst das Rechteck geprüft,
+    # das dort zuletzt getroffen wurde, dann dessen Nachbarn. Meist bleibt das abgefragte Rechteck
+    # viele Frames lang im selben Rechteck, die Abfrage braucht dann nur einen Vergleich.
+    def overlaps(self, other, cache = None):
+        if cache is None:
+            return self.find_overlap(other) is not None
+
+        last_hit = cache.last_hit
+        if last_hit is not None:
+            if last_hit.overlap(other):
+                cache.hits += 1
+                return True
+            for rect in self.neighbours[last_hit]:
+                if rect.overlap(other):
+                    cache.last_hit = rect
+                    cache.neighbour_hits += 1
+                    return True
+
+        cache.last_hit = self.find_overlap(other)
+        cache.full_queries += 1
+        return cache.last_hit is not None
+
+    # Erstes Rechteck im Index, mit dem das übergebene Kollisionsrechteck überlappt, None, wenn es keins gibt
+    def find_overlap(self, other):
+        for rect, _ in self.unindexed_rects:
+            if rect.overlap(other):
+                return rect
+
+        if not self.cells:
+            return None
+        first_column, last_column, first_row, last_row = self.cell_range(other)
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                for rect, _ in self.cells.get((column, row), ()):
+                    if rect.overlap(other):
+                        return rect
+        return None
+
+    # Bestimmt die Flags aller Rechtecke, mit denen das übergebene Kollisionsrechteck überlappt (bitweise Oder).
+    # Rechtecke, deren Flag schon gesetzt ist, werden nicht mehr geprüft.
+    def overlap_flags(self, other):
+        flags = 0
+        for rect, flag in self.unindexed_rects:
+            if flag & ~flags and rect.overlap(other):
+                flags |= flag
+
+        if not self.cells:
+            return flags
+        first_column, last_column, first_row, last_row = self.cell_range(other)
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                for rect, flag in self.cells.get((column, row), ()):
+                    if flag & ~flags and rect.overlap(other):
+                        flags |= flag
+        return flags
+
+
+
+# Zwischenspeicher einer Abfragestelle für CollisionGrid.overlaps (z.B. die Prüfung der nächsten Position
+# in der Bewegung des Spielers): das dort zuletzt getroffene Rechteck und Zähler, wie die Abfragen beantwortet wurden.
+# Jede Stelle braucht einen eigenen Zwischenspeicher, da verschiedene Stellen verschiedene Positionen abfragen.
+class CollisionHitCache:
+    def __init__(self):
+        self.last_hit = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        # Abfragen, beantwortet vom zuletzt getroffenen Rechteck, von einem seiner Nachbarn bzw. vom ganzen Index
+        self.hits = 0
+        self.neighbour_hits = 0
+        self.full_queries = 0
+
+    # Zählerstände für das Monitoring, hit_rate = Anteil der Abfragen, die ohne den ganzen Index auskamen
+    def stats(self):
+        queries = self.hits + self.neighbour_hits + self.full_queries
+        return {
+            "queries": queries,
+            "hits": self.hits,
+            "neighbour_hits": self.neighbour_hits,
+            "full_queries": self.full_queries,
+            "hit_rate": (self.hits + self.neighbour_hits) / queries if queries else 0.0,
+        }
+
+
+
+# ------------------ Kollisionsrechtecke als Arrays (Batch-Abfragen) ---------------------------
+
+# Für viele Abfragen auf einmal (mehrere Fahrzeuge, Auswertungen außerhalb des Spiels) liegen die Rechtecke
+# zusätzlich als (N, 4)-Array vor: pro Zeile Mittelpunkt x, Mittelpunkt y, halbe Breite, halbe Höhe.
+# Die Abfragen rechnen wie CollisionRect.overlap und liefern daher genau dieselben Ergebnisse.
+
+# Spalten der Rechteck-Arrays
+RECT_X = 0
+RECT_Y = 1
+RECT_HALF_WIDTH = 2
+RECT_HALF_HEIGHT = 3
+
+# Wandelt eine Liste von CollisionRect in ein (N, 4)-Array um.
+# Ein Array wird unverändert zurückgegeben, damit die Batch-Abfragen beides annehmen.
+def rect_array(rects):
+    if isinstance(rects, numpy.ndarray):
+        return rects
+    array = numpy.empty((len(rects), 4))
+    for index, rect in enumerate(rects):
+        array[index] = rect.position[0], rect.position[1], rect.width / 2, rect.height / 2
+    return array
+
+# Bestimmt für jedes Probe-Rechteck, mit welchen der Rechtecke es überlappt.
+#
+# Parameter:
+# probes    - (M, 4)-Array oder Liste von CollisionRect
+# rects     - (N, 4)-Array oder Liste von CollisionRect
+#
+# Rückgabe: (M, N)-Array aus bool
+def overlap_matrix(probes, rects):
+    probes = rect_array(probes)
+    rects = rect_array(rects)
+    result = numpy.zeros((len(probes), len(rects)), dtype = bool)
+    if len(rects) == 0:
+        return result
+
+    # Probes blockweise, damit die Zwischenergebnisse bei großen Batches nicht den Speicher füllen
+    block = max(1, BATCH_OVERLAP_BLOCK_PAIRS // len(rects))
+    for start in range(0, len(probes), block):
+        probe_block = probes[start:start + block, None]
+        result[start:start + block] = (
+            # x-Position nah genug?
+            (numpy.abs(rects[:, RECT_X] - probe_block[..., RECT_X]) <= rects[:, RECT_HALF_WIDTH] + probe_block[..., RECT_HALF_WIDTH]) &
+            # y-Positionen nah genug?
+            (numpy.abs(rects[:, RECT_Y] - probe_block[..., RECT_Y]) <= rects[:, RECT_HALF_HEIGHT] + probe_block[..., RECT_HALF_HEIGHT])
+        )
+    return result
+
+# Bestimmt für jedes Probe-Rechteck, ob es mit einem der Rechtecke überlappt (wie collides_with_list).
+#
+# Rückgabe: (M,)-Array aus bool
+def overlaps_any(probes, rects):
+    return overlap_matrix(probes, rects).any(axis = 1)
+
+# ------------------ Ende der Kollisionsrechtecke als Arrays ---------------------------
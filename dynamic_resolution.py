@@ -0,0 +1,56 @@
+from settings.renderer_settings import DYNAMIC_RESOLUTION_MIN_SCALE, DYNAMIC_RESOLUTION_STEP
+from settings.renderer_settings import DYNAMIC_RESOLUTION_HEADROOM, DYNAMIC_RESOLUTION_COOLDOWN
+
+# Regelt die interne Auflösung des Mode-7-Renderers (siehe Mode7.set_render_scale) so,
+# dass die Arbeitszeit pro Frame im Budget der Ziel-Framerate bleibt.
+# Sprites und HUD sind davon nicht betroffen, sie werden immer in Fensterauflösung gezeichnet.
+class DynamicResolution:
+    # target_fps: Framerate, die gehalten werden soll (Budget pro Frame = 1000 / target_fps ms)
+    # min_scale: kleinster Skalierungsfaktor relativ zur Fensterauflösung
+    # step: Schrittweite, um die der Faktor pro Anpassung verändert wird
+    # headroom: Anteil des Budgets, unter den die Frame-Zeit fallen muss, bevor der Faktor wieder erhöht wird
+    # cooldown: Anzahl Frames, die nach einer Anpassung gewartet wird (die Messung muss sich erst einpendeln)
+    def __init__(self, target_fps, min_scale = DYNAMIC_RESOLUTION_MIN_SCALE, step = DYNAMIC_RESOLUTION_STEP,
+            headroom = DYNAMIC_RESOLUTION_HEADROOM, cooldown = DYNAMIC_RESOLUTION_COOLDOWN):
+        self.budget_ms = 1000 / target_fps
+        self.min_scale = min_scale
+        self.step = step
+        self.headroom = headroom
+        self.cooldown = cooldown
+
+        self.scale = 1.0
+
+        # Geglättete Frame-Zeit (exponentieller gleitender Mittelwert), damit einzelne Ausreißer
+        # (Laden, Garbage Collection, ...) die Auflösung nicht hin- und herspringen lassen
+        self.smoothed_frame_time = None
+        self.frames_until_adjust = cooldown
+
+    # Setzt die Messung zurück, z.B. nach dem Laden eines Rennens (der Skalierungsfaktor bleibt erhalten).
+    def reset(self):
+        self.smoothed_frame_time = None
+        self.frames_until_adjust = self.cooldown
+
+    # Übergibt die Arbeitszeit des letzten Frames in ms (ohne die Wartezeit von clock.tick, siehe get_rawtime).
+    # Gibt True zurück, wenn sich der Skalierungsfaktor geändert hat.
+    def update(self, frame_time_ms):
+        if self.smoothed_frame_time is None:
+            self.smoothed_frame_time = frame_time_ms
+        else:
+            self.smoothed_frame_time += (frame_time_ms - self.smoothed_frame_time) * 0.1
+
+        if self.frames_until_adjust > 0:
+            self.frames_until_adjust -= 1
+            return False
+
+        new_scale = self.scale
+        if self.smoothed_frame_time > self.budget_ms:
+            new_scale = max(self.min_scale, self.scale - self.step)
+        elif self.smoothed_frame_time < self.budget_ms * self.headroom:
+            new_scale = min(1.0, self.scale + self.step)
+
+        if new_scale == self.scale:
+            return False
+
+        self.scale = round(new_scale, 4)
+        self.frames_until_adjust = self.cooldown
+        return True
@@ -13,13 +13,14 @@ from settings.track_settings import *
 from settings.ui_settings import *
 from settings.ui_settings import GAME_OVER_OVERLAY_ALPHA, GAME_OVER_IMAGE, PRESS_SPACE_IMAGE
 from settings.ui_settings import FINISH_OVERLAY_ALPHA, RACE_FINISHED_IMAGE, get_pixel_font
-from settings.key_settings import STD_CONFIRM_KEY, STD_DEBUG_RESTART_KEY
+from settings.key_settings import STD_CONFIRM_KEY, STD_DEBUG_RESTART_KEY, STD_INTERLACE_TOGGLE_KEY
 from settings.league_settings import *
 from settings.music_settings import *
 from settings.gamepad_settings import GAMEPAD_DEBUG
 
 # Weitere Importe aus diesem Projekt
-from mode7 import Mode7
+from mode7 import Mode7, texture_cache
+from dynamic_resolution import DynamicResolution
 from player import Player
 from particles import SparkParticle
 from camera import Camera
@@ -41,6 +42,10 @@ from collision import CollisionRect
 # das Verwalten der internen Spieluhr.
 class App:
     def __init__(self):
+        # Zeitstempel des Programmstarts (für die Meldung, wann das Spiel spielbar ist)
+        self.startup_timestamp = time.time()
+        self.startup_reported = False
+
         # ------------- Allgemeine Initialisierung --------------------
 
         # pygame.font muss initialisiert werden, bevor Fonts geladen werden
@@ -49,6 +54,12 @@ class App:
         self.screen = pygame.display.set_mode(WIN_RES)
         self.clock = pygame.time.Clock()
 
+        # Regelt die interne Auflösung des Mode-7-Renderers anhand der Frame-Zeit (falls eingeschaltet)
+        self.dynamic_resolution = DynamicResolution(TARGET_FPS) if DYNAMIC_RESOLUTION else None
+
+        # Ob der Boden im Interlacing-Modus gerendert wird (per Taste umschaltbar, bleibt für weitere Rennen erhalten)
+        self.interlaced_floor = INTERLACED_FLOOR
+
         self.in_racing_mode = False
 
         # Erstellt eine Gruppe von Sprites, die alle Sprites enthält,
@@ -102,6 +113,9 @@ class App:
 
         # ------------- Menü anzeigen -----------------------
 
+        # Mode-7-Kernel im Hintergrund kompilieren (bzw. aus dem Cache laden), während Intro und Menü laufen
+        Mode7.start_warm_up()
+
         # Zeige Startbildschirm und Streckenauswahl
         menu = Menu(self.screen, gamepad=self.gamepad)
         selected_race_index = menu.run()
@@ -286,6 +300,10 @@ class App:
             # Veranlasst die Mode7-gerenderte Umgebung zur Aktualisierung
             self.mode7.update(self.camera)
 
+            # Einmalig melden, wie lange es vom Programmstart bis zum ersten Renn-Frame gedauert hat
+            if not self.startup_reported:
+                self.report_startup_time()
+
             # --- PARTIKEL UPDATE ---
             self.particles.update()
             
@@ -334,6 +352,10 @@ class App:
                 self.lap_time_display_timestamp = self.time
                 self.previous_lap_count = current_lap_count
 
+                # Zähler der Kollisionsabfragen (Anteil der Abfragen, die das zuletzt getroffene Rechteck beantwortet hat)
+                if SHOULD_DEBUG_LOG:
+                    print(f"Kollisions-Zwischenspeicher: {current_race.race_track.hit_cache_stats()}")
+
             # Prüft, ob der Spieler das Rennen beendet hat.
             # Wenn ja, wird ein Status-Flag in der Spielerinstanz gesetzt, falls noch nicht geschehen.
             if self.current_league.current_race().player_finished_race() and not self.player.finished:
@@ -378,6 +400,14 @@ class App:
         # sodass das Spiel nie mit einer höheren Framerate als der übergebenen läuft.
         self.clock.tick(TARGET_FPS)
 
+        # Dynamische Auflösung: Arbeitszeit des Frames (ohne Wartezeit) an die Regelung übergeben
+        # und bei Bedarf die interne Auflösung des Renderers anpassen
+        if self.dynamic_resolution and self.in_racing_mode:
+            if self.dynamic_resolution.update(self.clock.get_rawtime()):
+                self.mode7.set_render_scale(self.dynamic_resolution.scale)
+                if SHOULD_DEBUG_LOG:
+                    print(f"Dynamische Auflösung: {self.mode7.render_width}x{self.mode7.render_height}")
+
         # Beschriftung des Fensters zeigt aktuelle Framerate an
         # (f'...' ist eine lesbarere + schnellere Art, Formatstrings zu schreiben als mit "%")
         pygame.display.set_caption(f'{self.clock.get_fps():.1f}')
@@ -397,18 +427,34 @@ class App:
         # Spieler auf Startposition der (neuen) Rennstrecke zurücksetzen
         self.player.reinitialize()
 
+        # Falls das Aufwärmen der Kernel noch läuft (Intro schnell übersprungen), darauf warten
+        Mode7.wait_for_warm_up()
+
         # Renderer-Feld durch Mode-7-Renderer für die neue Rennstrecke ersetzen.
         # Dritter Parameter bestimmt, ob der Renderer einen Nebeleffekt anwendet oder nicht.
+        # Mit dynamischer Auflösung startet der Renderer mit dem zuletzt geregelten Skalierungsfaktor.
         self.mode7 = Mode7(
             app = self,
             floor_tex_path = race.floor_texture_path,
             bg_tex_path = race.bg_texture_path,
-            is_foggy = race.is_foggy
+            is_foggy = race.is_foggy,
+            render_scale = self.dynamic_resolution.scale if self.dynamic_resolution else 1.0,
+            interlaced = self.interlaced_floor
         )
 
+        # Die Ladezeit soll nicht als Frame-Zeit in die Regelung eingehen
+        if self.dynamic_resolution:
+            self.dynamic_resolution.reset()
+
         # Mini-Map für dieses Rennen vorbereiten (einmalig)
         self.init_minimap(race)
 
+        # Zähler des Textur-Caches protokollieren (Treffer = Rennen ohne erneutes Laden der Texturen)
+        if SHOULD_DEBUG_LOG:
+            print(f"Textur-Cache: {texture_cache.stats()}")
+            if self.mode7.shading_bands:
+                print(f"Shading-Bänder: {self.mode7.shading_report()}")
+
         # Musik neu starten
         mixer.music.load(race.music_track_path)
         mixer.music.set_volume(MUSIC_VOLUME * 0.4)  # 40% Lautstärke im Rennen
@@ -742,6 +788,14 @@ class App:
     def get_time(self):
         self.time = time.time()
 
+    # Gibt aus, wie lange es vom Programmstart bis zum ersten gerenderten Renn-Frame gedauert hat
+    # (inklusive der Zeit im Menü) und wie lange das Aufwärmen der Mode-7-Kernel gebraucht hat.
+    def report_startup_time(self):
+        self.startup_reported = True
+        startup_seconds = time.time() - self.startup_timestamp
+        warm_up_info = f"{Mode7.warm_up_seconds:.2f}s" if Mode7.warm_up_seconds is not None else "-"
+        print(f"Spielbar nach {startup_seconds:.2f}s seit Programmstart (Mode7-Warm-up: {warm_up_info})")
+
     def check_event(self):
         for event in pygame.event.get():
             # Prozess beenden, der das Spiel ausführt,
@@ -787,6 +841,12 @@ class App:
                     self.load_race(self.current_league.current_race())
                 if event.key == STD_DEBUG_RESTART_KEY and DEBUG_RESTART_RACE_ON_R:
                     self.load_race(self.current_league.current_race())
+                # Interlacing des Bodens umschalten
+                if event.key == STD_INTERLACE_TOGGLE_KEY and self.in_racing_mode:
+                    self.interlaced_floor = not self.interlaced_floor
+                    self.mode7.set_interlaced(self.interlaced_floor)
+                    if SHOULD_DEBUG_LOG:
+                        print(f"Interlacing: {'an' if self.interlaced_floor else 'aus'}")
 
             # Gamepad-Button-Events (nur sichere Buttons 0-3 und 8-9)
             if event.type == pygame.JOYBUTTONDOWN and self.gamepad:
@@ -1,10 +1,484 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
 import pygame
 import numpy
 
 # JIT-Compiler und prange-Funktion für Leistungssteigerung
+import numba
 from numba import njit, prange
+from numba.core import types
+from numba.extending import overload
+from numba.experimental import structref
 
 from settings.renderer_settings import *
+from texture_cache import TextureCache, load_baked_texture
+from render_tuning import ensure_render_config, auto_tune, thread_count_candidates, load_render_config, save_render_config
+
+# Kompilierte Kernel werden auf der Festplatte gecacht (cache=True bei den njit-Dekoratoren),
+# damit nicht bei jedem Spielstart neu kompiliert werden muss.
+# Numba erkennt nur Änderungen an dieser Datei, nicht an den Renderer-Einstellungen,
+# die als Konstanten in die Kernel einkompiliert werden (Auflösung, SCALE, ...).
+# Deshalb bekommt jede Kombination dieser Einstellungen ein eigenes Cache-Verzeichnis.
+# Muss gesetzt sein, bevor die Kernel unten dekoriert werden.
+RENDER_SETTINGS_KEY = f"{WIDTH}x{HEIGHT}_scale{SCALE}_fog{FOG_DENSITY}"
+numba.config.CACHE_DIR = os.path.abspath(os.path.join(RENDER_CACHE_DIR, RENDER_SETTINGS_KEY))
+
+# Indizes der Zeilentabellen (siehe compute_row_tables).
+# Jede Tabelle enthält einen Wert pro Bildschirmzeile.
+ROW_INV_DEPTH = 0 # 1 / z der Zeile
+ROW_U0 = 1 # Texturkoordinate px am linken Bildschirmrand (Spalte 0)
+ROW_V0 = 2 # Texturkoordinate py am linken Bildschirmrand (Spalte 0)
+ROW_DU = 3 # Änderung von px pro Bildschirmspalte
+ROW_DV = 4 # Änderung von py pro Bildschirmspalte
+ROW_ATTENUATION = 5 # Dämpfungskoeffizient im Intervall [0, 1]
+ROW_FOG = 6 # additiver Nebelwert
+ROW_TABLE_COUNT = 7
+
+# Indizes der Mip-Tabellen. Werden sowohl für die Beschreibung der Mip-Stufen einer Bodentextur
+# (eine Zeile pro Stufe, siehe build_mip_chain) als auch für die ganzzahligen Zeilentabellen verwendet,
+# die pro Bildschirmzeile die Werte der gewählten Stufe enthalten (siehe compute_row_tables).
+MIP_MASK_U = 0 # Bitmaske der Stufe in u-Richtung (Breite - 1)
+MIP_MASK_V = 1 # Bitmaske der Stufe in v-Richtung (Höhe - 1)
+MIP_BASE_U = 2 # Position der Stufe im Textur-Atlas in u-Richtung
+MIP_BASE_V = 3 # Position der Stufe im Textur-Atlas in v-Richtung
+MIP_TABLE_COUNT = 4
+
+# Indizes der Band-Tabelle, die die Bodenzeilen in Bänder mit eigener horizontaler Shading-Rate aufteilt
+# (eine Zeile pro Band, siehe shading_band_rows)
+BAND_FIRST = 0 # erste Bildschirmzeile des Bands
+BAND_END = 1 # Bildschirmzeile nach dem Ende des Bands
+BAND_RATE = 2 # Anzahl benachbarter Spalten, die sich ein berechnetes Pixel teilen (1, 2 oder 4)
+BAND_RATE_SHIFT = 3 # log2 der Rate (Spalte >> BAND_RATE_SHIFT = Index des Abtastwerts)
+BAND_ROW_STEP = 4 # Abstand der berechneten Zeilen (1 = jede Zeile, 2 = nur die Zeilen eines Halbbilds beim Interlacing)
+BAND_TABLE_COUNT = 5
+
+# Anzahl der Nachkommabits der Festkomma-Texturkoordinaten im Kernel "fixed" (16.16 wie die Mode-7-Register des SNES)
+FIXED_POINT_SHIFT = 16
+FIXED_POINT_ONE = 1 << FIXED_POINT_SHIFT
+
+# Kantenlänge (log2) der Kacheln der gekachelten Bodentextur (siehe tile_texture): 8x8 Texel
+FLOOR_TILE_SHIFT = 3
+FLOOR_TILE_SIZE = 1 << FLOOR_TILE_SHIFT
+FLOOR_TILE_MASK = FLOOR_TILE_SIZE - 1
+
+# Prozessweiter Cache für vorbereitete Texturen, den alle Mode7-Renderer teilen.
+# Ein neu gestartetes Rennen muss seine Texturen dadurch nicht erneut laden und umwandeln.
+texture_cache = TextureCache(TEXTURE_CACHE_BUDGET_MB * 1024 * 1024)
+
+# Kleinste Zweierpotenz, die mindestens n ist.
+def next_power_of_two(n):
+    return 1 << max(int(n) - 1, 0).bit_length()
+
+# Bereitet die Bodentextur für das Wrapping per Bitmaske vor.
+# Die Textur wird in beiden Richtungen auf die nächste Zweierpotenz aufgefüllt,
+# und zwar zur Hälfte links/oben und zur Hälfte rechts/unten mit der Textur selbst (Kachelung),
+# d.h. die Bildpunkte der Originaltextur werden nicht verändert oder skaliert.
+#
+# Zusätzlich wird pro Achse der Offset berechnet, der auf eine Texturkoordinate addiert werden muss,
+# damit (int(Koordinate + Offset) & Maske) für die Kachel origin_tile genau das gleiche Texel liefert
+# wie das bisherige (Koordinate % Texturgröße). Der Offset enthält außerdem TEXTURE_WRAP_BIAS,
+# damit alle Koordinaten positiv sind und int() wie floor() abrundet.
+#
+# Rückgabe: (aufgefülltes Array, Masken pro Achse, Offsets pro Achse)
+def prepare_floor_texture(floor_array, origin_tile):
+    masks = []
+    offsets = []
+    pad_widths = []
+    for axis in range(2):
+        size = floor_array.shape[axis]
+        padded_size = next_power_of_two(size)
+        pad_before = (padded_size - size) // 2
+        pad_widths.append((pad_before, padded_size - size - pad_before))
+        masks.append(padded_size - 1)
+        offsets.append(float(TEXTURE_WRAP_BIAS - origin_tile[axis] * size + pad_before))
+    # Farbkanäle (falls vorhanden) werden nicht aufgefüllt
+    pad_widths += [(0, 0)] * (floor_array.ndim - 2)
+
+    padded = numpy.pad(floor_array, pad_widths, mode = "wrap")
+    return padded, (masks[0], masks[1]), (offsets[0], offsets[1])
+
+# Baut aus der (auf Zweierpotenzen aufgefüllten) Bodentextur eine Mip-Kette mit höchstens max_levels Stufen.
+# Jede Stufe ist halb so breit und hoch wie die vorherige (downsample verkleinert eine Stufe um den Faktor 2).
+# Alle Stufen liegen in einem gemeinsamen Textur-Atlas, damit die Kernel weiterhin ein einziges Array bekommen:
+# Stufe 0 bei (0, 0), alle weiteren rechts daneben untereinander, Stufe L bei (Breite, Höhe - 2 * (Höhe >> L)).
+# Der Atlas ist dadurch 1,5-mal so breit wie die Textur.
+#
+# Da die Texturgrößen Zweierpotenzen sind, liefert (int(Koordinate / 2^L) & Maske der Stufe L) genau das Texel
+# der Stufe L, das die Texel der Stufe 0 an dieser Stelle zusammenfasst (gleicher Offset wie bei Stufe 0).
+#
+# Rückgabe: (Atlas, Mip-Tabelle als int64-Array (Stufen, MIP_TABLE_COUNT))
+def build_mip_chain(floor_array, max_levels, downsample):
+    levels = [floor_array]
+    while len(levels) < max_levels and min(levels[-1].shape[:2]) >= 2:
+        levels.append(downsample(levels[-1]))
+
+    width, height = floor_array.shape[:2]
+    atlas_width = width + width // 2 if len(levels) > 1 else width
+    atlas = numpy.zeros((atlas_width, height) + floor_array.shape[2:], dtype = floor_array.dtype)
+    mip_levels = numpy.zeros((len(levels), MIP_TABLE_COUNT), dtype = numpy.int64)
+    for level, level_array in enumerate(levels):
+        base_u, base_v = (0, 0) if level == 0 else (width, height - 2 * (height >> level))
+        level_width, level_height = level_array.shape[:2]
+        atlas[base_u:base_u + level_width, base_v:base_v + level_height] = level_array
+        mip_levels[level] = (level_width - 1, level_height - 1, base_u, base_v)
+    return atlas, mip_levels
+
+# Mip-Tabelle einer Bodentextur ohne Mipmaps (nur Stufe 0 mit den Bitmasken pro Achse)
+def single_mip_level(masks):
+    return numpy.array([[masks[0], masks[1], 0, 0]], dtype = numpy.int64)
+
+# Ordnet eine Textur (bzw. den Textur-Atlas) kachelweise an (siehe TILED_FLOOR in den Renderer-Einstellungen):
+# Die Texel einer Kachel aus FLOOR_TILE_SIZE x FLOOR_TILE_SIZE Texeln liegen hintereinander im Speicher.
+# Das Ergebnis hat die Form (Breite / Kachel, Höhe / Kachel, Kachel, Kachel) plus ggf. die Farbkanäle,
+# Texel (u, v) liegt bei [u >> FLOOR_TILE_SHIFT, v >> FLOOR_TILE_SHIFT, u & FLOOR_TILE_MASK, v & FLOOR_TILE_MASK]
+# (siehe floor_texel). Ränder, die keine ganze Kachel füllen, werden aufgefüllt (das betrifft nur den Atlas
+# mit Mip-Stufen kleiner als eine Kachel, die aufgefüllten Texel werden nie gelesen).
+def tile_texture(array):
+    pad_widths = [(0, -size % FLOOR_TILE_SIZE) for size in array.shape[:2]] + [(0, 0)] * (array.ndim - 2)
+    array = numpy.pad(array, pad_widths)
+    width, height = array.shape[:2]
+    tiles = array.reshape((width // FLOOR_TILE_SIZE, FLOOR_TILE_SIZE, height // FLOOR_TILE_SIZE, FLOOR_TILE_SIZE)
+        + array.shape[2:])
+    return numpy.ascontiguousarray(tiles.swapaxes(1, 2))
+
+# Verkleinert ein RGB-Array (w, h, 3) um den Faktor 2, jedes Texel ist der Mittelwert von 2x2 Texeln.
+def downsample_rgb(array):
+    total = (array[0::2, 0::2].astype(numpy.uint16) + array[1::2, 0::2] + array[0::2, 1::2] + array[1::2, 1::2])
+    return ((total + 2) // 4).astype(numpy.uint8)
+
+# Verkleinert ein Array mit gepackten 32-Bit-Pixeln um den Faktor 2 (Mittelwert pro Farbkanal, siehe downsample_rgb).
+def downsample_packed(array, shifts):
+    channels = numpy.stack([(array >> shift) & 0xFF for shift in shifts], axis = 2).astype(numpy.uint8)
+    averaged = downsample_rgb(channels).astype(numpy.uint32)
+    return (averaged[..., 0] << shifts[0]) | (averaged[..., 1] << shifts[1]) | (averaged[..., 2] << shifts[2])
+
+# Verkleinert ein Array mit Palettenindizes um den Faktor 2.
+# Indizes lassen sich nicht mitteln, daher wird jeweils das linke obere der 2x2 Texel übernommen.
+def downsample_indexed(array):
+    return numpy.ascontiguousarray(array[0::2, 0::2])
+
+# Bereitet die Hintergrundtextur als Skybox-Band vor, das pro Frame mit einer einzigen Slice-Kopie
+# auf den Bildschirm kommt.
+# Vertikal wird die Textur so oft untereinander gekachelt, dass sie genau die Zeilen über dem Horizont abdeckt
+# (gleiches Ergebnis wie Zeile j % Texturhöhe).
+# Horizontal wird rechts ein Streifen in Bildschirmbreite mit dem Anfang der Textur angehängt,
+# sodass für jede Verschiebung in [0, Texturbreite) das Fenster [Verschiebung, Verschiebung + Bildschirmbreite)
+# am Stück im Array liegt.
+def prepare_bg_texture(bg_array, horizon):
+    rows = numpy.arange(horizon) % bg_array.shape[1]
+    columns = numpy.arange(bg_array.shape[0] + WIDTH) % bg_array.shape[0]
+    return numpy.ascontiguousarray(bg_array[columns][:, rows])
+
+# Reduziert eine RGB-Textur (w, h, 3) auf eine Palette mit höchstens palette_size Farben.
+# Hat die Textur nicht mehr Farben, ist das Ergebnis verlustfrei. Sonst werden die häufigsten Farben übernommen
+# und alle anderen auf die nächstgelegene Palettenfarbe (euklidischer Abstand im RGB-Raum) abgebildet.
+#
+# Rückgabe: (Indizes als uint8-Array (w, h), Palette als uint8-Array (Farbanzahl, 3))
+def quantize_texture(rgb_array, palette_size):
+    colors = ((rgb_array[..., 0].astype(numpy.uint32) << 16)
+        | (rgb_array[..., 1].astype(numpy.uint32) << 8)
+        | rgb_array[..., 2])
+    unique_colors, inverse, counts = numpy.unique(colors, return_inverse = True, return_counts = True)
+    unique_rgb = numpy.stack([unique_colors >> 16, (unique_colors >> 8) & 0xFF, unique_colors & 0xFF], axis = 1).astype(numpy.int32)
+
+    if len(unique_colors) <= palette_size:
+        palette = unique_rgb
+        color_indices = numpy.arange(len(unique_colors))
+    else:
+        palette = unique_rgb[numpy.argsort(counts)[::-1][:palette_size]]
+        color_indices = numpy.empty(len(unique_colors), dtype = numpy.intp)
+        # Abstände blockweise berechnen, damit die Abstandsmatrix klein bleibt
+        for start in range(0, len(unique_rgb), 4096):
+            block = unique_rgb[start:start + 4096]
+            distances = ((block[:, None, :] - palette[None, :, :]) ** 2).sum(axis = 2)
+            color_indices[start:start + 4096] = distances.argmin(axis = 1)
+
+    indices = color_indices[inverse].reshape(colors.shape).astype(numpy.uint8)
+    return indices, palette.astype(numpy.uint8)
+
+# Dämpfungskoeffizient und Nebelwert der Bildschirmzeile j.
+# Hängen nur vom Abstand zum Horizont ab, nicht von der Kamera (siehe compute_row_tables).
+# half_height ist die halbe Höhe des Frames, in den gerendert wird (siehe Mode7.set_render_scale).
+@njit(fastmath=True, cache=True)
+def row_shading(j, horizon, half_height, is_foggy):
+    # Um hässliche Artefakte am Horizont zu verhindern:
+    # Einen Dämpfungskoeffizienten im Intervall [0, 1] basierend auf dem "Tiefen"-Wert berechnen
+    z = j - horizon + 0.01
+    attenuation = min(max(7.5 * (abs(z) / half_height), 0), 1)
+
+    # Nebeleffekt berechnen, abhängig davon, ob die gerenderte Szene neblig ist.
+    fog = (1 - attenuation) * FOG_DENSITY if is_foggy else 0.0
+    return attenuation, fog
+
+# Erstellt für jede Bildschirmzeile eine eigene Kopie der Palette, in der Dämpfung und Nebel der Zeile
+# schon eingerechnet sind (gleiche Rechnung wie in den Kernels für direkte Farben).
+# Mit gepackten Pixeln enthält jede Palette 32-Bit-Werte im Pixelformat des Displays (shifts).
+# height ist die Höhe des Frames, in den gerendert wird.
+#
+# Rückgabe: (height, Farbanzahl) uint32 bzw. (height, Farbanzahl, 3) uint8
+def build_row_palettes(palette, horizon, height, is_foggy, packed_pixels, shifts):
+    shading = numpy.array([row_shading(j, horizon, height // 2, is_foggy) for j in range(height)])
+    attenuation = shading[:, 0, None, None]
+    fog = shading[:, 1, None, None]
+    row_palettes = (palette[None, :, :] * attenuation + fog).astype(numpy.uint8)
+
+    if packed_pixels:
+        row_palettes = row_palettes.astype(numpy.uint32)
+        return ((row_palettes[..., 0] << shifts[0]) | (row_palettes[..., 1] << shifts[1]) | (row_palettes[..., 2] << shifts[2]))
+    return row_palettes
+
+# Wendet Dämpfung und Nebel auf ein gepacktes 32-Bit-Pixel an.
+# Die Farbkanäle werden über die Bit-Verschiebungen des Pixelformats (Surface.get_shifts) entpackt
+# und nach dem Anwenden wieder an dieselbe Stelle gepackt.
+@njit(fastmath=True, cache=True)
+def shade_packed_pixel(texel, attenuation, fog, shifts):
+    r = (texel >> shifts[0]) & 0xFF
+    g = (texel >> shifts[1]) & 0xFF
+    b = (texel >> shifts[2]) & 0xFF
+    return ((int(r * attenuation + fog) << shifts[0])
+        | (int(g * attenuation + fog) << shifts[1])
+        | (int(b * attenuation + fog) << shifts[2]))
+
+# Position des Texels zur Texturkoordinate (px, py) im Textur-Atlas,
+# in der Mip-Stufe, die für die Bildschirmzeile j gewählt wurde (siehe compute_row_tables).
+# Koordinaten sind durch den Offset immer positiv, int() rundet also ab,
+# und das Umbrechen an der Grenze der Stufe erledigt die Bitmaske.
+@njit(fastmath=True, cache=True)
+def mip_texel(px, py, row_mip_tables, j):
+    return ((int(px) & row_mip_tables[MIP_MASK_U, j]) + row_mip_tables[MIP_BASE_U, j],
+        (int(py) & row_mip_tables[MIP_MASK_V, j]) + row_mip_tables[MIP_BASE_V, j])
+
+# Texel (u, v) der Bodentextur (bzw. des Textur-Atlas), bei gekachelter Bodentextur aus der Kachel (siehe tile_texture).
+# Gekachelte Texturen haben zwei Dimensionen mehr (4 bzw. mit Farbkanälen 5), daher wählt numba beim Kompilieren
+# anhand der Dimensionen die passende Adressrechnung, in den Kernels steht also kein zusätzlicher Zweig.
+def floor_texel(floor_array, u, v):
+    if floor_array.ndim >= 4:
+        return floor_array[u >> FLOOR_TILE_SHIFT, v >> FLOOR_TILE_SHIFT, u & FLOOR_TILE_MASK, v & FLOOR_TILE_MASK]
+    return floor_array[u, v]
+
+@overload(floor_texel, jit_options = {"fastmath": True})
+def floor_texel_overload(floor_array, u, v):
+    if floor_array.ndim >= 4:
+        def tiled_texel(floor_array, u, v):
+            return floor_array[u >> FLOOR_TILE_SHIFT, v >> FLOOR_TILE_SHIFT, u & FLOOR_TILE_MASK, v & FLOOR_TILE_MASK]
+        return tiled_texel
+
+    def linear_texel(floor_array, u, v):
+        return floor_array[u, v]
+    return linear_texel
+
+# Startkoordinaten und Schrittweiten der Bildschirmzeile j als Festkommazahlen (FIXED_POINT_SHIFT Nachkommabits).
+# Die Startkoordinaten sind durch den Offset immer positiv (siehe prepare_floor_texture), int() rundet also ab,
+# die Schrittweiten werden gerundet. Die Ganzzahlen haben 64 Bit, da der Offset TEXTURE_WRAP_BIAS enthält.
+@njit(fastmath=True, cache=True)
+def fixed_point_row(row_tables, j):
+    return (int(row_tables[ROW_U0, j] * FIXED_POINT_ONE), int(row_tables[ROW_V0, j] * FIXED_POINT_ONE),
+        int(round(row_tables[ROW_DU, j] * FIXED_POINT_ONE)), int(round(row_tables[ROW_DV, j] * FIXED_POINT_ONE)))
+
+# Schreibt ein berechnetes Pixel in die Spalten i bis i + rate - 1 der Zeile j (variable Shading-Rate).
+@njit(fastmath=True, cache=True)
+def write_block(screen_array, i, j, rate, value):
+    for k in range(i, min(i + rate, screen_array.shape[0])):
+        screen_array[k, j] = value
+
+# Verteilt die Abtastwerte einer Zeile mit verringerter Shading-Rate auf alle Spalten der Zeile j
+# (Abtastwert s gilt für die Spalten s * rate bis s * rate + rate - 1).
+# Als eigene Schleife statt blockweise (write_block) und mit Shift statt Division
+# bleiben beide Schleifen der zeilenweisen Kernel vektorisierbar.
+@njit(fastmath=True, cache=True)
+def expand_samples(screen_array, j, samples, rate_shift):
+    for i in range(screen_array.shape[0]):
+        screen_array[i, j] = samples[i >> rate_shift]
+
+# Index des Shading-Bands, in dem die Bodenzeile j liegt (siehe shading_band_rows)
+@njit(fastmath=True, cache=True)
+def row_band(shading_bands, j):
+    for band in range(shading_bands.shape[0] - 1):
+        if j < shading_bands[band, BAND_END]:
+            return band
+    return shading_bands.shape[0] - 1
+
+# Teilt die Bodenzeilen eines Frames in Bänder mit eigener horizontaler Shading-Rate auf.
+# bands ist eine Tabelle aus (Beginn, Rate)-Paaren (siehe FLOOR_SHADING_BANDS in den Renderer-Einstellungen),
+# der Beginn ist der Anteil der Bodenzeilen unter dem Horizont, ab dem das Band gilt.
+# Zeilen vor dem ersten Band werden mit voller Rate berechnet. Ohne Bänder gibt es ein einziges Band mit voller Rate.
+# Mit field (0 oder 1) enthalten die Bänder nur die Zeilen des Halbbilds, d.h. jede zweite Zeile mit j % 2 == field
+# (siehe INTERLACED_FLOOR in den Renderer-Einstellungen). Der Beginn jedes Bands ist dann die erste Zeile des Halbbilds.
+#
+# Rückgabe: int64-Array (Anzahl Bänder, BAND_TABLE_COUNT), lückenlos von horizon bis height
+def shading_band_rows(bands, horizon, height, field = None):
+    floor_rows = height - horizon
+    starts = [horizon] + [horizon + round(start * floor_rows) for start, _ in bands] + [height]
+    rates = [1] + [rate for _, rate in bands]
+    for rate in rates:
+        if rate not in SHADING_RATES:
+            raise ValueError(f"Ungültige Shading-Rate: {rate} (erlaubt: {', '.join(map(str, SHADING_RATES))})")
+
+    row_step = 1 if field is None else 2
+    band_rows = []
+    for first, end, rate in zip(starts, starts[1:], rates):
+        if end > first:
+            if field is not None:
+                first += (field - first) & 1
+            band_rows.append((first, end, rate, rate.bit_length() - 1, row_step))
+    return numpy.array(band_rows, dtype = numpy.int64).reshape(-1, BAND_TABLE_COUNT)
+
+# Überblendet die Zeilen des nicht neu berechneten Halbbilds (stale_field) mit der jeweils darüberliegenden,
+# gerade berechneten Zeile (in der ersten Bodenzeile mit der darunterliegenden), um Kammartefakte bei Bewegung zu mildern.
+# Die überblendeten Zeilen werden im nächsten Frame ohnehin neu berechnet, der Fehler sammelt sich also nicht an.
+# first ist die erste Bodenzeile (Horizont des Frames).
+@njit(fastmath=True, parallel=True, nogil=True, cache=True)
+def blend_stale_field(screen_array, first, stale_field):
+    height = screen_array.shape[1]
+    start = first + ((stale_field - first) & 1)
+    for k in prange((height - start + 1) // 2):
+        j = start + 2 * k
+        fresh = j - 1 if j > first else j + 1
+        if fresh < height:
+            for i in range(screen_array.shape[0]):
+                for c in range(3):
+                    screen_array[i, j, c] = (int(screen_array[i, j, c]) + int(screen_array[i, fresh, c])) >> 1
+
+# Variante von blend_stale_field für gepackte 32-Bit-Pixel.
+# Mittelwert pro Byte ohne Entpacken: gemeinsame Bits plus halbe unterschiedliche Bits (ohne Übertrag ins Nachbarbyte).
+@njit(fastmath=True, parallel=True, nogil=True, cache=True)
+def blend_stale_field_packed(screen_array, first, stale_field):
+    height = screen_array.shape[1]
+    start = first + ((stale_field - first) & 1)
+    for k in prange((height - start + 1) // 2):
+        j = start + 2 * k
+        fresh = j - 1 if j > first else j + 1
+        if fresh < height:
+            for i in range(screen_array.shape[0]):
+                a, b = screen_array[i, j], screen_array[i, fresh]
+                screen_array[i, j] = (a & b) + (((a ^ b) >> 1) & 0x7F7F7F7F)
+
+# Übernimmt die Zeilen des nicht neu berechneten Halbbilds (stale_field) aus dem zuletzt gerenderten Puffer.
+# Beim asynchronen Rendern (siehe ASYNC_FLOOR_RENDERING) wechseln sich zwei Puffer ab, der Puffer eines Frames
+# enthält also nicht das Halbbild des direkt vorangegangenen Frames. first ist die erste Bodenzeile.
+@njit(fastmath=True, parallel=True, nogil=True, cache=True)
+def copy_stale_field(screen_array, previous_array, first, stale_field):
+    height = screen_array.shape[1]
+    start = first + ((stale_field - first) & 1)
+    for k in prange((height - start + 1) // 2):
+        j = start + 2 * k
+        screen_array[:, j] = previous_array[:, j]
+
+# Berechnet die Zeilentabellen (vgl. HDMA-Tabellen auf dem SNES) für einen Frame.
+# Alle Größen der Mode-7-Projektion, die nur von der Bildschirmzeile j abhängen
+# (Tiefe, Dämpfung, Nebel, Texturkoordinate am linken Rand, Schrittweite pro Spalte),
+# werden hier einmal pro Zeile berechnet statt einmal pro Pixel.
+#
+# Parameter:
+# row_tables: Array der Form (ROW_TABLE_COUNT, Höhe des Frames), das mit den Tabellen gefüllt wird
+# is_foggy: ob die Szene, von der ein Frame gerendert wird, einen Nebeleffekt hat
+# pos: aktuelle Position der Kamera
+# angle: aktueller Winkel, um den die Kamera rotiert ist
+# horizon: die minimale y-Koordinate der Bodenpixel
+# focal_len: (dynamische) Brennweite der Kamera
+# tex_offset: Offset der Bodentextur pro Achse (siehe prepare_floor_texture),
+#   ist in den Startkoordinaten ROW_U0 und ROW_V0 bereits enthalten
+# row_mip_tables: ganzzahliges Array der Form (MIP_TABLE_COUNT, Höhe des Frames), das mit den Werten
+#   der pro Zeile gewählten Mip-Stufe gefüllt wird
+# mip_levels: Mip-Tabelle der Bodentextur (siehe build_mip_chain)
+# width: Breite des Frames in Pixeln (die Höhe ergibt sich aus row_tables)
+#
+# Die Mip-Stufe einer Zeile richtet sich nach der Schrittweite pro Bildschirmspalte:
+# Überspringt die Zeile 2^L oder mehr Texel pro Pixel, wird Stufe L verwendet (höchstens die letzte vorhandene).
+# Die Texturkoordinaten der Zeile werden dafür durch 2^L geteilt.
+@njit(fastmath=True, cache=True)
+def compute_row_tables(row_tables, is_foggy, pos, angle, horizon, focal_len, tex_offset, row_mip_tables, mip_levels,
+        width):
+    # Sinus- und Kosinuswerte des Spielerwinkels berechnen,
+    # um sie zum Rendern der Umgebung basierend auf der Rotation des Spielers zu verwenden.
+    sin, cos = numpy.sin(angle), numpy.cos(angle)
+
+    height = row_tables.shape[1]
+    half_width = width // 2
+
+    for j in range(horizon, height):
+        # Rohe Koordinaten wie bisher pro Pixel:
+        # x = half_width - i hängt als einzige Größe von der Spalte i ab,
+        # y und z hängen nur von der Zeile j ab.
+        # Kleine Konstante in z verhindert Division durch 0 direkt am Horizont.
+        y = j + focal_len
+        z = j - horizon + 0.01
+        inv_z = 1.0 / z
+
+        # Rotation und Projektion sind linear in x, also auch linear in i:
+        # px(i) = u0 + i * du, py(i) = v0 + i * dv
+        row_tables[ROW_INV_DEPTH, j] = inv_z
+        row_tables[ROW_U0, j] = ((half_width * cos + y * sin) * inv_z + pos[1]) * SCALE + tex_offset[0]
+        row_tables[ROW_V0, j] = ((half_width * -sin + y * cos) * inv_z + pos[0]) * SCALE + tex_offset[1]
+        row_tables[ROW_DU, j] = -cos * inv_z * SCALE
+        row_tables[ROW_DV, j] = sin * inv_z * SCALE
+
+        # Mip-Stufe anhand der Schrittweite in Texeln pro Bildschirmspalte wählen
+        stride = abs(inv_z) * SCALE
+        level = 0
+        while level < len(mip_levels) - 1 and stride >= 2 << level:
+            level += 1
+        if level > 0:
+            level_scale = 1.0 / (1 << level)
+            for k in (ROW_U0, ROW_V0, ROW_DU, ROW_DV):
+                row_tables[k, j] *= level_scale
+        for k in range(MIP_TABLE_COUNT):
+            row_mip_tables[k, j] = mip_levels[level, k]
+
+        # Dämpfung und Nebel der Zeile (siehe row_shading)
+        row_tables[ROW_ATTENUATION, j], row_tables[ROW_FOG, j] = row_shading(j, horizon, height // 2, is_foggy)
+
+# ------------------ Zustand des Renderers ---------------------------
+
+# Alles, was die Kernel über viele Frames hinweg unverändert brauchen (Texturen, Tabellen, Pixelformat, Auflösung),
+# steckt in einem kompilierten Zustandsobjekt (numba structref), das bei jeder Änderung der internen Auflösung
+# neu angelegt wird (siehe Mode7.set_render_scale). Pro Frame bekommt der Kernel dann nur noch den Zustand,
+# das Ziel-Array, die Kamera-Pose, die Brennweite und die Auswahl der Band-Tabelle, statt jede Tabelle einzeln
+# (numba muss jedes Argument bei jedem Aufruf entpacken und seinen Typ prüfen).
+# Das Ziel-Array bleibt ein Argument, da die Display-Surface nur während des Renderns gesperrt sein darf.
+#
+# Felder:
+# floor_array: Textur-Atlas der Bodentextur (siehe Mode7.decode_floor_texture)
+# mip_levels: Mip-Tabelle der Bodentextur (siehe build_mip_chain)
+# tex_offset: Offset der Bodentextur pro Achse (siehe prepare_floor_texture)
+# row_tables, row_mip_tables: Zeilentabellen, die in jedem Frame neu gefüllt werden (siehe compute_row_tables)
+# band_tables: Band-Tabellen für den vollen Frame und die beiden Halbbilder (siehe BANDS_FULL_FRAME und BANDS_FIELD)
+# pixel_shifts: Bit-Verschiebungen der Farbkanäle im Pixelformat des Displays
+# row_palettes: Paletten pro Bildschirmzeile (siehe build_row_palettes), ohne palettenindizierte Bodentextur leer
+# is_foggy, horizon, width: Nebel, Horizont und Breite des Frames, in den gerendert wird
+@structref.register
+class RenderStateType(types.StructRef):
+    def preprocess_fields(self, fields):
+        return tuple((name, types.unliteral(typ)) for name, typ in fields)
+
+class RenderState(structref.StructRefProxy):
+    pass
+
+structref.define_proxy(RenderState, RenderStateType, [
+    "floor_array", "mip_levels", "tex_offset", "row_tables", "row_mip_tables", "band_tables",
+    "pixel_shifts", "row_palettes", "is_foggy", "horizon", "width",
+])
+
+# Indizes in band_tables des Renderer-Zustands: voller Frame bzw. Halbbild field (BANDS_FIELD + field) beim Interlacing
+BANDS_FULL_FRAME = 0
+BANDS_FIELD = 1
+
+# Platzhalter für row_palettes, wenn die Bodentextur nicht palettenindiziert ist
+NO_ROW_PALETTES = numpy.zeros((0, 0), dtype = numpy.uint32)
+
+# Beginnt einen Frame: füllt die Zeilentabellen des Zustands für die übergebene Kamera-Pose und Brennweite
+# (siehe compute_row_tables) und gibt die gewählte Band-Tabelle zurück.
+# Wird von den Kernels vor der parallelen Schleife aufgerufen.
+@njit(fastmath=True, cache=True)
+def begin_frame(state, pos, angle, focal_len, bands):
+    compute_row_tables(state.row_tables, state.is_foggy, pos, angle, state.horizon, focal_len, state.tex_offset,
+        state.row_mip_tables, state.mip_levels, state.width)
+    return state.band_tables[bands]
+
+# ------------------ Ende des Zustands des Renderers ---------------------------
 
 class Mode7:
     # Initialisierungsmethode, die die Texturen lädt (spezifiziert über den an den Konstruktor übergebenen Pfad),
@@ -14,7 +488,32 @@ class Mode7:
     # Der horizon-Parameter beschreibt die Horizonthöhe der mit diesem Renderer gerenderten Szenen,
     # d.h. die minimale Höhe der Bodentextur-Pixel
     # (dabei beachten, dass die y-Koordinate nach unten auf dem Bildschirm abnimmt). 
-    def __init__(self, app, floor_tex_path, bg_tex_path, is_foggy, horizon = STD_HORIZON):
+    #
+    # Der kernel-Parameter wählt den Kernel, der den Frame rendert (siehe RENDER_KERNEL in den Renderer-Einstellungen).
+    # Der packed_pixels-Parameter wählt das gepackte 32-Bit-Pixelformat (siehe PACKED_PIXELS in den Renderer-Einstellungen).
+    # Der indexed_floor-Parameter wählt die palettenindizierte Bodentextur (siehe INDEXED_FLOOR in den Renderer-Einstellungen).
+    # Der mipmapped_floor-Parameter schaltet Mipmaps für die Bodentextur ein (siehe FLOOR_MIPMAPS in den Renderer-Einstellungen).
+    # Der tiled_floor-Parameter legt die Bodentextur gekachelt ab (siehe TILED_FLOOR in den Renderer-Einstellungen).
+    # Der render_resolution-Parameter legt eine feste interne Auflösung (Breite, Höhe) für Boden und Himmel fest
+    # (siehe INTERNAL_RESOLUTION in den Renderer-Einstellungen), None = Fensterauflösung.
+    # Der render_scale-Parameter gibt die anfängliche interne Auflösung relativ dazu an (siehe set_render_scale).
+    # Der shading_bands-Parameter legt Bänder mit verringerter horizontaler Shading-Rate fest
+    # (siehe FLOOR_SHADING_BANDS in den Renderer-Einstellungen), None = jedes Pixel wird berechnet.
+    # Die Parameter interlaced und interlace_blend schalten das Interlacing des Bodens bzw. das Überblenden
+    # des wiederverwendeten Halbbilds ein (siehe INTERLACED_FLOOR in den Renderer-Einstellungen und set_interlaced).
+    # Der async_render-Parameter lässt den Boden in einem eigenen Thread rendern, latency_budget_ms legt fest,
+    # wie lange draw() auf den Boden des aktuellen Frames wartet (siehe ASYNC_FLOOR_RENDERING in den Renderer-Einstellungen).
+    # Der reuse_static_frames-Parameter zeigt bei ruhender Kamera den letzten Frame erneut an
+    # (siehe STATIC_FRAME_REUSE in den Renderer-Einstellungen und update).
+    # Der render_config-Parameter legt Threads und Chunk-Größe der Kernel fest (siehe render_tuning.py),
+    # None = laut RENDER_THREADS in den Renderer-Einstellungen.
+    def __init__(self, app, floor_tex_path, bg_tex_path, is_foggy, horizon = STD_HORIZON, kernel = RENDER_KERNEL,
+            packed_pixels = PACKED_PIXELS, indexed_floor = INDEXED_FLOOR, mipmapped_floor = FLOOR_MIPMAPS,
+            tiled_floor = TILED_FLOOR, render_resolution = INTERNAL_RESOLUTION, render_scale = 1.0,
+            shading_bands = FLOOR_SHADING_BANDS if VARIABLE_RATE_SHADING else None,
+            interlaced = INTERLACED_FLOOR, interlace_blend = INTERLACE_BLEND,
+            async_render = ASYNC_FLOOR_RENDERING, latency_budget_ms = ASYNC_RENDER_LATENCY_BUDGET_MS, render_config = None,
+            reuse_static_frames = STATIC_FRAME_REUSE):
         # Renderer mit der App verknüpfen
         self.app = app
 
@@ -22,28 +521,523 @@ class Mode7:
         self.is_foggy = is_foggy
         self.horizon = horizon
 
-        # Bodentextur laden
-        self.floor_tex = pygame.image.load(floor_tex_path).convert()
-        
-        # Bodentexturgröße für spätere Verwendung speichern
-        self.floor_tex_size = self.floor_tex.get_size()
+        if kernel not in RENDER_KERNELS:
+            raise ValueError(f"Unbekannter Mode-7-Kernel: {kernel} (erlaubt: {', '.join(RENDER_KERNELS)})")
+        self.kernel = kernel
+
+        # Gepackte Pixel werden direkt in die Display-Surface geschrieben,
+        # das geht nur, wenn diese 4 Bytes pro Pixel hat
+        if packed_pixels and self.app.screen.get_bytesize() != 4:
+            print("Display-Surface hat kein 32-Bit-Format, Mode7 verwendet RGB-Arrays")
+            packed_pixels = False
+        self.packed_pixels = packed_pixels
+
+        # Bit-Verschiebungen der Farbkanäle im Pixelformat des Displays (für gepackte Pixel)
+        self.pixel_shifts = tuple(self.app.screen.get_shifts()[:3])
+
+        self.indexed_floor = indexed_floor
+        self.mipmapped_floor = mipmapped_floor
+        self.tiled_floor = tiled_floor
+
+        # Threads und Chunk-Größe der Kernel, gesetzt in dem Thread, der rendert (siehe render_floor)
+        self.render_config = render_config if render_config is not None else Mode7.configured_render_config(
+            self.kernel, self.packed_pixels, self.indexed_floor, self.tiled_floor
+        )
+
+        # Bodentextur laden (bzw. aus dem Textur-Cache holen, siehe load_floor_texture).
+        # Die Textur-Arrays werden zwischen Renderern geteilt und sind schreibgeschützt.
+        # floor_tex_size ist die Größe der Originaltextur, d.h. der Kachel in Weltkoordinaten,
+        # nicht die des aufgefüllten Arrays.
+        # Mit palettenindizierter Bodentextur gehört die Palette dazu (sonst None).
+        # Die Mip-Tabelle beschreibt die Mip-Stufen im Textur-Atlas (ohne Mipmaps nur Stufe 0, siehe build_mip_chain).
+        self.floor_array, self.floor_mip_levels, self.floor_tex_offset, self.floor_tex_size, self.floor_palette = texture_cache.get(
+            self.texture_cache_key("floor", floor_tex_path, FLOOR_TEXTURE_ORIGIN_TILE),
+            lambda: self.load_floor_texture(floor_tex_path)
+        )
+
+        # Hintergrundtextur laden (bzw. aus dem Textur-Cache holen, siehe load_bg_texture)
+        self.bg_array, self.bg_tex_size = texture_cache.get(
+            self.texture_cache_key("bg", bg_tex_path, self.horizon),
+            lambda: self.load_bg_texture(bg_tex_path)
+        )
+
+        # Auflösung, auf die sich set_render_scale bezieht.
+        # Bei fester interner Auflösung wird auch der Himmel in dieser Auflösung gezeichnet
+        # und der ganze Frame auf das Fenster hochskaliert (einheitliche Pixelgröße wie im Original-Design).
+        self.base_render_size = tuple(render_resolution) if render_resolution else (WIDTH, HEIGHT)
+        self.sky_at_render_resolution = render_resolution is not None
+
+        self.shading_bands = shading_bands
+
+        # Interlacing: Halbbild, das im letzten Frame berechnet wurde (0 = gerade, 1 = ungerade Zeilen)
+        self.interlaced = interlaced
+        self.interlace_blend = interlace_blend
+        self.field = 0
+
+        # Asynchrones Rendern: zwei Puffer, in die der Render-Thread abwechselnd den Boden rendert (siehe set_render_scale).
+        # pending_floor ist der Auftrag, der gerade gerendert wird (Future, Puffer), front_buffer der Index des Puffers
+        # mit dem zuletzt fertig gerenderten Boden (None, solange es keinen gibt), frame_bg_offsets
+        # die Verschiebung des Himmels, die zum Boden im jeweiligen Puffer gehört.
+        self.async_render = async_render
+        self.latency_budget_ms = latency_budget_ms
+        self.pending_floor = None
+        self.front_buffer = None
+        self.frame_bg_offsets = [0, 0]
+
+        # Wie oft draw() den Boden des aktuellen bzw. des vorigen Frames angezeigt hat (für das Monitoring)
+        self.frames_on_time = 0
+        self.frames_late = 0
+
+        # Ruhende Kamera: Pose (Position, Winkel, Brennweite, Verschiebung des Himmels) des zuletzt gerenderten Frames,
+        # gespeicherter Frame (Kopie des Fensters direkt nach draw(), None = keiner), ob der gerade gerenderte Frame
+        # gespeichert werden soll und ob update() den gespeicherten wiederverwendet hat (siehe update und draw)
+        self.reuse_static_frames = reuse_static_frames
+        self.frame_pose = None
+        self.static_frame = None
+        self.static_frame_pending = False
+        self.frame_reused = False
+
+        # Wie oft ein Frame gerendert bzw. wiederverwendet wurde (für das Monitoring)
+        self.frames_rendered = 0
+        self.frames_reused = 0
+
+        # Bereich der Display-Surface über bzw. unter dem Horizont.
+        # Bei verringerter interner Auflösung (ohne feste interne Auflösung) wird der Himmel direkt
+        # in den oberen Bereich gezeichnet und der intern gerenderte Boden in den unteren hochskaliert.
+        self.screen_sky_area = self.app.screen.subsurface((0, 0, WIDTH, self.horizon))
+        self.screen_floor_area = self.app.screen.subsurface((0, self.horizon, WIDTH, HEIGHT - self.horizon))
+
+        # Kernel passend zu Kernel-Art, Pixelformat und Art der Bodentextur auswählen
+        self.render = self.select_kernel(self.kernel, self.packed_pixels, self.indexed_floor)
+
+        # Interne Auflösung festlegen und alle davon abhängigen Puffer und Tabellen anlegen
+        self.set_render_scale(render_scale)
+
+    # Legt die interne Auflösung fest, in der der Boden gerendert wird, als Faktor relativ zur Fenstergröße
+    # bzw. zur festen internen Auflösung (1.0 = unverändert).
+    # Kann jederzeit aufgerufen werden, z.B. von der dynamischen Auflösung (siehe main.py).
+    #
+    # Entspricht die interne Auflösung der Fensterauflösung, rendert der Kernel wie gehabt direkt
+    # in die Display-Surface (bzw. ins Bildschirm-Array).
+    # Sonst rendert er in eine eigene Surface im Pixelformat des Displays, die in draw()
+    # per Nearest-Neighbour auf das Fenster hochskaliert wird (bei ganzzahligem Verhältnis wird
+    # jedes interne Pixel zu einem gleich großen Block).
+    # Horizont und Brennweite werden mitskaliert, der Bildausschnitt bleibt also gleich.
+    # Ohne feste interne Auflösung wird nur der Boden hochskaliert, der Himmel bleibt in Fensterauflösung.
+    # Sprites und HUD werden immer in Fensterauflösung gezeichnet.
+    # Mit Interlacing und gepackten Pixeln gibt es die interne Surface auch in Fensterauflösung,
+    # da die Display-Surface in jedem Frame von Sprites und HUD überschrieben wird und das vorige Halbbild nicht behält,
+    # ebenso beim asynchronen Rendern, bei dem der Kernel in zwei eigene Puffer rendert (siehe submit_floor).
+    def set_render_scale(self, render_scale):
+        # Puffer und Zustand werden gleich ersetzt, der Render-Thread darf sie nicht mehr verwenden
+        self.finish_floor()
+        self.front_buffer = None
+
+        # Der gespeicherte Frame hat die alte Auflösung
+        self.frame_pose = None
+        self.static_frame = None
+        self.static_frame_pending = False
+        self.frame_reused = False
+
+        self.render_scale = render_scale
+        self.render_height = max(2, round(self.base_render_size[1] * render_scale))
+        self.render_width = max(2, round(self.base_render_size[0] * render_scale))
+
+        # Alle Längen der Projektion werden gleichmäßig (anhand der Höhe) skaliert
+        self.render_size_factor = self.render_height / HEIGHT
+        self.render_horizon = min(round(self.horizon * self.render_size_factor), self.render_height - 1)
+
+        if (self.render_width, self.render_height) == (WIDTH, HEIGHT) and not (self.interlaced and self.packed_pixels) \
+                and not self.async_render:
+            self.render_surface = None
+        else:
+            self.render_surface = pygame.Surface((self.render_width, self.render_height), 0, self.app.screen)
+            self.render_floor_area = self.render_surface.subsurface(
+                (0, self.render_horizon, self.render_width, self.render_height - self.render_horizon)
+            )
+
+        # Skybox-Band in der internen Auflösung (Nearest-Neighbour aus dem Band in Fensterauflösung)
+        if self.render_surface is not None and self.sky_at_render_resolution:
+            bg_tex_width = self.bg_tex_size[0]
+            self.sky_tex_width = max(1, round(bg_tex_width * self.render_size_factor))
+            columns = numpy.arange(self.sky_tex_width + self.render_width) % self.sky_tex_width * bg_tex_width // self.sky_tex_width
+            rows = numpy.arange(self.render_horizon) * self.horizon // max(self.render_horizon, 1)
+            self.sky_array = numpy.ascontiguousarray(self.bg_array[columns][:, rows])
+        else:
+            self.sky_tex_width = self.bg_tex_size[0]
+            self.sky_array = self.bg_array
+
+        # Array erstellen, das die Bildschirmpixel darstellt.
+        # Mit gepackten Pixeln gibt es kein eigenes Array,
+        # der Kernel schreibt direkt in die Pixel der Display-Surface (bzw. der internen Surface).
+        # Beim asynchronen Rendern gibt es stattdessen zwei Puffer (auch mit gepackten Pixeln),
+        # da der Render-Thread keine Surface sperren darf, auf die der Haupt-Thread gerade zeichnet.
+        if self.async_render:
+            self.screen_array = None
+            self.frame_buffers = [
+                self.create_screen_array(self.kernel, self.render_width, self.render_height, self.packed_pixels)
+                for _ in range(2)
+            ]
+        else:
+            self.screen_array = None if self.packed_pixels else self.create_screen_array(
+                self.kernel, self.render_width, self.render_height
+            )
+
+        # Zeilentabellen, die einmal pro Frame vom Kernel neu gefüllt werden (siehe compute_row_tables),
+        # dazu die ganzzahligen Tabellen der pro Zeile gewählten Mip-Stufe
+        self.row_tables = numpy.zeros((ROW_TABLE_COUNT, self.render_height))
+        self.row_mip_tables = numpy.zeros((MIP_TABLE_COUNT, self.render_height), dtype = numpy.int64)
+
+        # Bänder der Bodenzeilen mit ihrer horizontalen Shading-Rate (siehe shading_band_rows)
+        self.shading_band_table = shading_band_rows(self.shading_bands or (), self.render_horizon, self.render_height)
+
+        # Die gleichen Bänder, beschränkt auf die Zeilen des geraden bzw. ungeraden Halbbilds (Interlacing).
+        # Nach dem Anlegen der Puffer gibt es noch kein voriges Halbbild, der nächste Frame wird deshalb ganz berechnet.
+        # Alle drei Tabellen haben gleich viele Bänder und liegen im Zustand in einem Array (siehe BANDS_FULL_FRAME).
+        self.band_tables = numpy.stack([self.shading_band_table] + [
+            shading_band_rows(self.shading_bands or (), self.render_horizon, self.render_height, field) for field in (0, 1)
+        ])
+        self.full_frame_pending = True
+
+        # Paletten pro Bildschirmzeile mit eingerechneter Dämpfung und Nebel (siehe build_row_palettes).
+        # Beides hängt nur von der Zeile ab, daher reicht es, die Paletten einmal pro Auflösung zu erstellen.
+        self.row_palettes = build_row_palettes(
+            self.floor_palette, self.render_horizon, self.render_height, self.is_foggy, self.packed_pixels, self.pixel_shifts
+        ) if self.indexed_floor else None
+
+        # Zustand, den die Kernel bis zur nächsten Änderung der Auflösung verwenden (siehe RenderState)
+        self.render_state = RenderState(
+            self.floor_array, self.floor_mip_levels, self.floor_tex_offset, self.row_tables, self.row_mip_tables,
+            self.band_tables, self.pixel_shifts, NO_ROW_PALETTES if self.row_palettes is None else self.row_palettes,
+            bool(self.is_foggy), self.render_horizon, self.render_width
+        )
+        self.compile_kernels()
+
+    # Kompiliert den Kernel (und ggf. das Überblenden beim Interlacing) für die Typen, mit denen update() ihn aufruft,
+    # bzw. lädt ihn aus dem Festplatten-Cache. Ist er schon kompiliert (z.B. durch das Aufwärmen), kostet das fast nichts.
+    # Kompiliert numba erst beim Aufruf mit dem Pixel-Array einer Surface, halten Referenzzyklen aus dem Compiler
+    # das Array (und damit die Sperre der Surface) noch bis zur nächsten Garbage Collection am Leben,
+    # sodass danach nicht auf die Surface gezeichnet werden kann. Hier wird nur der Typ des Arrays verwendet.
+    def compile_kernels(self):
+        if self.async_render:
+            screen_type = numba.typeof(self.frame_buffers[0])
+        elif self.packed_pixels:
+            surface = self.render_surface if self.render_surface is not None else self.app.screen
+            screen_type = numba.typeof(pygame.surfarray.pixels2d(surface))
+        else:
+            screen_type = numba.typeof(self.screen_array)
 
-        # 3D-Array erstellen, das die Pixel des Bodens darstellt.
-        # Genauer: Kopiert die Pixel von der Oberfläche, die die Bodentextur darstellt,
-        # in ein neues 3D-Array.
-        self.floor_array = pygame.surfarray.array3d(self.floor_tex)
+        self.render.compile((numba.typeof(self.render_state), screen_type, numba.typeof(numpy.zeros(2)),
+            types.float64, types.float64, types.int64))
+        if self.interlaced and self.interlace_blend:
+            blend = blend_stale_field_packed if self.packed_pixels else blend_stale_field
+            blend.compile((screen_type, types.int64, types.int64))
+        if self.async_render and self.interlaced:
+            copy_stale_field.compile((screen_type, screen_type, types.int64, types.int64))
 
-        # Hintergrundtextur laden
-        self.bg_tex = pygame.image.load(bg_tex_path).convert()
+    # Schaltet das Interlacing des Bodens ein oder aus (z.B. per Taste während des Rennens, siehe main.py),
+    # optional auch das Überblenden des wiederverwendeten Halbbilds (None = unverändert).
+    # Die Puffer werden dabei neu angelegt, der erste Frame danach wird ganz berechnet.
+    def set_interlaced(self, interlaced, interlace_blend = None):
+        self.finish_floor()
+        self.interlaced = interlaced
+        if interlace_blend is not None:
+            self.interlace_blend = interlace_blend
+        self.set_render_scale(self.render_scale)
 
-        # Decken-Textur auf Bodentexturgröße skalieren
-        self.bg_tex_size = self.bg_tex.get_size()
+    # Anzahl der Bodenpixel und der tatsächlich berechneten Pixel pro Shading-Band (siehe shading_band_rows),
+    # in der aktuellen internen Auflösung.
+    #
+    # Rückgabe: Liste aus Dictionaries mit erster und letzter Zeile, Rate, Pixeln und berechneten Pixeln
+    def shading_report(self):
+        report = []
+        for first, end, rate, _, _ in self.shading_band_table.tolist():
+            rows = end - first
+            report.append({
+                "rows": (first, end - 1),
+                "rate": rate,
+                "pixels": rows * self.render_width,
+                "shaded_pixels": rows * -(-self.render_width // rate),
+            })
+        return report
 
-        # Decke durch 3D-Array analog zum Boden darstellen
-        self.bg_array = pygame.surfarray.array3d(self.bg_tex)
+    # Erstellt das RGB-Array (Breite x Höhe), in das der übergebene Kernel den Frame rendert.
+    # Der zeilenweise Kernel schreibt jede Zeile am Stück,
+    # daher liegen dort die Pixel einer Zeile hintereinander im Speicher
+    # (Indizierung bleibt [x][y] wie bei surfarray).
+    # Mit gepackten Pixeln ein 32-Bit-Array im gleichen Layout wie surfarray.pixels2d einer Surface.
+    @staticmethod
+    def create_screen_array(kernel, width = WIDTH, height = HEIGHT, packed_pixels = False):
+        if packed_pixels:
+            return numpy.zeros((height, width), dtype = numpy.uint32).T
+        if kernel in ("rows", "fixed"):
+            return numpy.zeros((height, width, 3), dtype = numpy.uint8).transpose(1, 0, 2)
+        return numpy.zeros((width, height, 3), dtype = numpy.uint8)
+
+    # Gibt den Kernel passend zu Kernel-Art, Pixelformat und Art der Bodentextur zurück.
+    # Die Kernel für palettenindizierte Bodentexturen funktionieren mit beiden Pixelformaten
+    # (das Format steckt in den Zeilenpaletten).
+    @staticmethod
+    def select_kernel(kernel, packed_pixels, indexed_floor):
+        kernels = {
+            "columns": (Mode7.render_frame, Mode7.render_frame_packed, Mode7.render_frame_indexed),
+            "rows": (Mode7.render_frame_rows, Mode7.render_frame_rows_packed, Mode7.render_frame_rows_indexed),
+            "fixed": (Mode7.render_frame_fixed, Mode7.render_frame_fixed_packed, Mode7.render_frame_fixed_indexed),
+        }[kernel]
+        if indexed_floor:
+            return kernels[2]
+        if packed_pixels:
+            return kernels[1]
+        return kernels[0]
+
+    # ------------------ Aufwärmen der Kernel ---------------------------
+
+    # Thread, der die Kernel im Hintergrund aufwärmt (siehe start_warm_up)
+    warm_up_thread = None
+
+    # Dauer des letzten Aufwärmens in Sekunden (None, solange es nicht abgeschlossen ist)
+    warm_up_seconds = None
+
+    # Startet das Aufwärmen der Kernel in einem Hintergrund-Thread,
+    # z.B. während das Intro läuft. Der erste Frame eines Rennens muss dann nicht mehr auf numba warten.
+    @staticmethod
+    def start_warm_up(kernel = RENDER_KERNEL, packed_pixels = PACKED_PIXELS, indexed_floor = INDEXED_FLOOR,
+            tiled_floor = TILED_FLOOR):
+        # Der Thread-Pool von numba muss im Haupt-Thread gestartet werden. Geschieht das erst beim Laden
+        # eines parallelen Kernels im Hintergrund-Thread, blockiert das Programm beim Beenden.
+        numba.get_num_threads()
+        Mode7.warm_up_thread = threading.Thread(target = Mode7.warm_up,
+            args = (kernel, packed_pixels, indexed_floor, tiled_floor), daemon = True)
+        Mode7.warm_up_thread.start()
+
+    # Wartet, bis ein laufendes Aufwärmen abgeschlossen ist.
+    # Muss vor dem ersten Rendern aufgerufen werden, damit nicht zwei Threads gleichzeitig kompilieren.
+    @staticmethod
+    def wait_for_warm_up():
+        if Mode7.warm_up_thread is not None:
+            Mode7.warm_up_thread.join()
+            Mode7.warm_up_thread = None
+
+    # Kompiliert alle Kernel, die für die übergebene Konfiguration gebraucht werden (bzw. lädt sie aus dem Festplatten-Cache).
+    # Die Signaturen werden aus Platzhaltern mit den gleichen Typen wie im Spiel abgeleitet, sodass genau die Varianten
+    # entstehen, die später im Rennen verwendet werden. Die Kernel werden dabei nicht ausgeführt.
+    @staticmethod
+    def warm_up(kernel, packed_pixels, indexed_floor, tiled_floor = False):
+        start = time.perf_counter()
+
+        # Gleiches Layout wie surfarray.pixels2d der Display-Surface bzw. wie das Bildschirm-Array
+        screen_array = Mode7.create_screen_array(kernel, packed_pixels = packed_pixels)
+
+        # Zustand aus Platzhaltern (legt dabei auch den Konstruktor des Zustands für diese Typen an)
+        state = Mode7.example_state(packed_pixels, indexed_floor, tiled_floor)
+
+        Mode7.compile_for(Mode7.select_kernel(kernel, packed_pixels, indexed_floor),
+            state, screen_array, numpy.zeros(2), 0.0, float(FOCAL_LEN), BANDS_FULL_FRAME)
 
-        # Array erstellen, das die Bildschirmpixel darstellt
-        self.screen_array = pygame.surfarray.array3d(pygame.Surface(WIN_RES))
+        # Überblenden beim Interlacing (kann während des Rennens eingeschaltet werden, siehe set_interlaced)
+        Mode7.compile_for(blend_stale_field_packed if packed_pixels else blend_stale_field, screen_array, STD_HORIZON, 0)
+        # Halbbild aus dem anderen Puffer beim asynchronen Rendern
+        Mode7.compile_for(copy_stale_field, screen_array, screen_array, STD_HORIZON, 0)
+
+        Mode7.warm_up_seconds = time.perf_counter() - start
+        print(f"Mode7-Kernel bereit nach {Mode7.warm_up_seconds:.2f}s ({kernel}, {'packed' if packed_pixels else 'rgb'}"
+            f"{', indexed' if indexed_floor else ''}{', tiled' if tiled_floor else ''})")
+
+    # Bodentextur (und ggf. Zeilenpaletten) in den Typen, die die übergebene Konfiguration im Spiel verwendet,
+    # in einem Zustand in Fensterauflösung (Standard-Horizont, ohne Nebel und Bänder).
+    # Die Texturen sind wie im Spiel schreibgeschützt (siehe decode_floor_texture).
+    # Ohne rng sind alle Texel 0 (zum Kompilieren genügen die Typen), sonst zufällig (zum Messen, siehe tune_render_config).
+    # Mipmaps ändern nur die Inhalte der Mip-Tabellen, nicht die Typen, gekachelte Bodentexturen schon (siehe tile_texture).
+    @staticmethod
+    def example_state(packed_pixels, indexed_floor, tiled_floor = False, size = (2, 2), rng = None):
+        def texels(shape, dtype):
+            if rng is None:
+                return numpy.zeros(shape, dtype = dtype)
+            return rng.integers(0, numpy.iinfo(dtype).max, shape, dtype = dtype, endpoint = True)
+
+        row_palettes = NO_ROW_PALETTES
+        # Palettenindizierte Bodentextur: ein Byte pro Texel, dazu die Zeilenpaletten
+        if indexed_floor:
+            floor_array = texels(size, numpy.uint8)
+            row_palettes = build_row_palettes(texels((PALETTE_SIZE, 3), numpy.uint8), STD_HORIZON, HEIGHT, False,
+                packed_pixels, (16, 8, 0))
+        elif packed_pixels:
+            floor_array = texels(size, numpy.uint32)
+        else:
+            floor_array = texels(tuple(size) + (3,), numpy.uint8)
+        if tiled_floor:
+            floor_array = tile_texture(floor_array)
+        floor_array.flags.writeable = False
+
+        band_tables = numpy.stack([shading_band_rows((), STD_HORIZON, HEIGHT)] * 3)
+        return RenderState(floor_array, single_mip_level((size[0] - 1, size[1] - 1)), (float(TEXTURE_WRAP_BIAS),) * 2,
+            numpy.zeros((ROW_TABLE_COUNT, HEIGHT)), numpy.zeros((MIP_TABLE_COUNT, HEIGHT), dtype = numpy.int64),
+            band_tables, (16, 8, 0), row_palettes, False, STD_HORIZON, WIDTH)
+
+    # Kompiliert eine numba-Funktion für die Typen der übergebenen Beispiel-Argumente, ohne sie aufzurufen.
+    @staticmethod
+    def compile_for(function, *example_args):
+        function.compile(tuple(numba.typeof(arg) for arg in example_args))
+
+    # ------------------ Ende des Aufwärmens der Kernel ---------------------------
+
+    # ------------------ Threads der Kernel ---------------------------
+
+    # Schlüssel der Renderer-Konfiguration in der Datei mit den gemessenen Thread-Konfigurationen (siehe render_tuning.py)
+    @staticmethod
+    def tuning_key(kernel, packed_pixels, indexed_floor, tiled_floor):
+        return (f"{RENDER_SETTINGS_KEY}/{kernel}-{'packed' if packed_pixels else 'rgb'}{'-indexed' if indexed_floor else ''}"
+            f"{'-tiled' if tiled_floor else ''}")
+
+    # Konfiguration (Threads, Chunk-Größe) laut RENDER_THREADS und RENDER_CHUNK_SIZE in den Renderer-Einstellungen.
+    # Bei "auto" die für diesen Rechner gemessene (siehe renderer_benchmark.py --tune), ohne Messung die Vorgabe von numba.
+    @staticmethod
+    def configured_render_config(kernel, packed_pixels, indexed_floor, tiled_floor):
+        if RENDER_THREADS != "auto":
+            return RENDER_THREADS or 0, RENDER_CHUNK_SIZE
+        tuned = load_render_config(RENDER_TUNING_FILE, Mode7.tuning_key(kernel, packed_pixels, indexed_floor, tiled_floor))
+        return tuned if tuned is not None else (0, RENDER_CHUNK_SIZE)
+
+    # Misst den Kernel der übergebenen Konfiguration mit verschiedenen Thread-Anzahlen und Chunk-Größen
+    # (siehe auto_tune) und speichert die beste Kombination für diesen Rechner.
+    # Gemessen wird ein voller Frame in Fensterauflösung aus mehreren Blickrichtungen auf einer zufälligen Bodentextur
+    # in der aufgefüllten Größe der meisten Strecken. Der Kernel muss schon kompiliert sein (siehe warm_up).
+    #
+    # Rückgabe: (beste Konfiguration, Liste aus (Konfiguration, Frame-Zeit in ms))
+    @staticmethod
+    def tune_render_config(kernel, packed_pixels, indexed_floor, tiled_floor = False, frames = RENDER_TUNING_FRAMES):
+        state = Mode7.example_state(packed_pixels, indexed_floor, tiled_floor, (4096, 2048), numpy.random.default_rng(0))
+        screen_array = Mode7.create_screen_array(kernel, packed_pixels = packed_pixels)
+        render = Mode7.select_kernel(kernel, packed_pixels, indexed_floor)
+        pos = numpy.zeros(2)
+        angles = numpy.linspace(0.0, 2 * numpy.pi, 8, endpoint = False)
+
+        def render_frame(k):
+            render(state, screen_array, pos, angles[k % len(angles)], float(FOCAL_LEN), BANDS_FULL_FRAME)
+
+        best, results = auto_tune(render_frame, thread_count_candidates(numba.config.NUMBA_NUM_THREADS),
+            RENDER_TUNING_CHUNK_SIZES, frames)
+        save_render_config(RENDER_TUNING_FILE, Mode7.tuning_key(kernel, packed_pixels, indexed_floor, tiled_floor),
+            best, results)
+        return best, results
+
+    # ------------------ Ende der Threads der Kernel ---------------------------
+
+    # Format, in dem eine Textur der übergebenen Art vorbereitet wird:
+    # "indexed" für die palettenindizierte Bodentextur (unabhängig vom Pixelformat, das steckt erst in den Zeilenpaletten),
+    # sonst "rgb" oder "packed" mit der Kanal-Anordnung des Displays (z.B. "packed16-8-0").
+    # Mit Mipmaps wird bei der Bodentextur "-mip" angehängt, gekachelt "-tiled".
+    def texture_format(self, kind):
+        if kind == "floor" and self.indexed_floor:
+            texture_format = "indexed"
+        elif self.packed_pixels:
+            texture_format = "packed" + "-".join(str(shift) for shift in self.pixel_shifts)
+        else:
+            texture_format = "rgb"
+        if kind == "floor" and self.mipmapped_floor:
+            texture_format += "-mip"
+        if kind == "floor" and self.tiled_floor:
+            texture_format += "-tiled"
+        return texture_format
+
+    # Schlüssel für den Textur-Cache. Enthält alles, wovon die vorbereitete Textur abhängt:
+    # Art und Pfad der Textur, Format (siehe texture_format),
+    # die Bildschirmbreite und den Parameter der Vorbereitung (Ursprungskachel bzw. Horizonthöhe).
+    def texture_cache_key(self, kind, path, parameter):
+        return (kind, os.path.abspath(path), self.texture_format(kind), WIDTH, parameter)
+
+    # Name einer vorgebackenen Textur (siehe bake_textures.py), gebildet aus den gleichen Angaben wie der Cache-Schlüssel
+    def baked_texture_name(self, kind, path, parameter):
+        parameter = "_".join(str(value) for value in parameter) if isinstance(parameter, tuple) else str(parameter)
+        base = os.path.splitext(os.path.basename(path))[0]
+        return f"{base}_{kind}_{self.texture_format(kind)}_w{WIDTH}_{parameter}"
+
+    # Lädt die vorgebackene Textur zu den übergebenen Angaben, falls sie verwendet werden soll und aktuell ist.
+    # Rückgabe: (Array, Angaben) oder None
+    def load_baked_texture(self, kind, path, parameter):
+        if not USE_BAKED_TEXTURES:
+            return None
+        return load_baked_texture(BAKED_TEXTURE_DIR, self.baked_texture_name(kind, path, parameter), path)
+
+    # Lädt die Bodentextur für den Kernel, vorgebacken falls möglich, sonst aus der PNG-Datei (siehe decode_floor_texture).
+    #
+    # Rückgabe: (Textur-Atlas, Mip-Tabelle, Offsets, Größe der Originaltextur, Palette oder None)
+    def load_floor_texture(self, path):
+        baked = self.load_baked_texture("floor", path, FLOOR_TEXTURE_ORIGIN_TILE)
+        if baked is not None:
+            floor_array, info = baked
+            palette = numpy.array(info["palette"], dtype = numpy.uint8) if "palette" in info else None
+            mip_levels = numpy.array(info["mip_levels"], dtype = numpy.int64)
+            return floor_array, mip_levels, tuple(info["offset"]), tuple(info["size"]), palette
+        return self.decode_floor_texture(path)
+
+    # Lädt die Hintergrundtextur, vorgebacken falls möglich, sonst aus der PNG-Datei (siehe decode_bg_texture).
+    #
+    # Rückgabe: (Skybox-Band, Größe der Originaltextur)
+    def load_bg_texture(self, path):
+        baked = self.load_baked_texture("bg", path, self.horizon)
+        if baked is not None:
+            bg_array, info = baked
+            return bg_array, tuple(info["size"])
+        return self.decode_bg_texture(path)
+
+    # Lädt die Bodentextur aus der PNG-Datei und bereitet sie für den Kernel vor.
+    # Genauer: Kopiert die Pixel von der Oberfläche, die die Bodentextur darstellt,
+    # in ein neues 3D-Array, das auf Zweierpotenz-Größe aufgefüllt wird,
+    # damit der Kernel per Bitmaske statt per Modulo umbrechen kann.
+    # Mit gepackten Pixeln ist es ein 2D-Array mit einem 32-Bit-Wert pro Pixel
+    # (im Pixelformat des Displays, da die Textur per convert() umgewandelt wurde).
+    # Mit palettenindizierter Bodentextur ist es ein 2D-Array mit einem Palettenindex (1 Byte) pro Pixel
+    # (siehe quantize_texture), die Palette wird mit zurückgegeben.
+    # Mit Mipmaps kommen die verkleinerten Stufen in einen gemeinsamen Textur-Atlas (siehe build_mip_chain).
+    # Zuletzt wird der Atlas auf Wunsch gekachelt (siehe tile_texture).
+    # Das Array wird schreibgeschützt, genau wie eine per Memory-Mapping geöffnete vorgebackene Textur,
+    # damit der Kernel in beiden Fällen mit denselben Typen aufgerufen wird.
+    #
+    # Rückgabe: (Textur-Atlas, Mip-Tabelle, Offsets, Größe der Originaltextur, Palette oder None)
+    def decode_floor_texture(self, path):
+        floor_tex = pygame.image.load(path).convert()
+        if self.indexed_floor:
+            texture_array, palette = quantize_texture(pygame.surfarray.array3d(floor_tex), PALETTE_SIZE)
+        else:
+            texture_array, palette = self.texture_to_array(floor_tex), None
+        floor_array, masks, offset = prepare_floor_texture(texture_array, FLOOR_TEXTURE_ORIGIN_TILE)
+
+        if self.mipmapped_floor:
+            floor_array, mip_levels = build_mip_chain(floor_array, FLOOR_MIP_LEVELS, self.downsample_floor)
+        else:
+            mip_levels = single_mip_level(masks)
+
+        if self.tiled_floor:
+            floor_array = tile_texture(floor_array)
+
+        floor_array.flags.writeable = False
+        return floor_array, mip_levels, offset, floor_tex.get_size(), palette
+
+    # Verkleinert eine Mip-Stufe der Bodentextur passend zu deren Format um den Faktor 2.
+    def downsample_floor(self, array):
+        if self.indexed_floor:
+            return downsample_indexed(array)
+        if self.packed_pixels:
+            return downsample_packed(array, self.pixel_shifts)
+        return downsample_rgb(array)
+
+    # Lädt die Hintergrundtextur aus der PNG-Datei und stellt sie durch ein Array analog zum Boden dar,
+    # vorbereitet als Skybox-Band (siehe prepare_bg_texture).
+    #
+    # Rückgabe: (Skybox-Band, Größe der Originaltextur)
+    def decode_bg_texture(self, path):
+        bg_tex = pygame.image.load(path).convert()
+        bg_array = prepare_bg_texture(self.texture_to_array(bg_tex), self.horizon)
+        bg_array.flags.writeable = False
+        return bg_array, bg_tex.get_size()
+
+    # Kopiert die Pixel einer (per convert() ans Display angepassten) Textur-Surface in ein Array,
+    # je nach Pixelformat des Renderers als RGB-Array (w, h, 3) oder als gepacktes Array (w, h).
+    def texture_to_array(self, surface):
+        if self.packed_pixels:
+            return pygame.surfarray.array2d(surface).astype(numpy.uint32)
+        return pygame.surfarray.array3d(surface)
 
     # Aktualisiert die mode7-basierte Umgebung.
     # Eine Kamera-Referenz wird übergeben, um
@@ -64,109 +1058,700 @@ class Mode7:
         # Dynamische Background-Rotation - ganz leicht schneller
         dynamic_bg_rotation = BACKGROUND_ROTATION_SPEED * (1.0 + speed_factor * 0.15)
 
-        # Frame rendern mit dynamischen Werten
-        self.screen_array = self.render_frame(
-            floor_array = self.floor_array,
-            bg_array = self.bg_array,
-            screen_array = self.screen_array,
-            floor_tex_size = self.floor_tex_size,
-            bg_tex_size = self.bg_tex_size,
-            is_foggy = self.is_foggy,
-            pos = camera.position,
-            angle = camera.angle,
-            horizon = self.horizon,
-            focal_len = dynamic_focal_len,
-            bg_rotation_speed = dynamic_bg_rotation
-        )
+        # Hintergrundbild wird um den Winkel verschoben, um den der Spieler rotiert ist.
+        # Verwendet dynamische Background-Rotation.
+        # Die Modulo-Rechnung fällt dadurch nur noch einmal pro Frame an statt einmal pro Pixel.
+        bg_offset = -int(camera.angle * dynamic_bg_rotation) % self.bg_tex_size[0]
+
+        # Ruhende Kamera: Hat sich die Pose seit dem letzten gerenderten Frame nicht geändert, ist der Frame derselbe.
+        # Liegt er schon gespeichert vor, übernimmt draw() ihn, statt neu zu rendern.
+        # Gespeichert wird ein Frame erst, wenn er zweimal hintereinander mit der gleichen Pose gerendert wurde:
+        # Beim Interlacing sind dann beide Halbbilder mit dieser Pose berechnet.
+        frame_pose = (camera.position[0], camera.position[1], camera.angle, dynamic_focal_len, bg_offset)
+        self.frame_reused = self.reuse_static_frames and self.static_frame is not None and frame_pose == self.frame_pose
+        if self.frame_reused:
+            self.frames_reused += 1
+            return
+        self.static_frame_pending = self.reuse_static_frames and frame_pose == self.frame_pose
+        self.static_frame = None
+        self.frame_pose = frame_pose
+        self.frames_rendered += 1
+
+        # Interlacing: abwechselnd nur die geraden bzw. ungeraden Bodenzeilen berechnen,
+        # die anderen bleiben aus dem vorigen Frame stehen (siehe render_floor)
+        if self.interlaced and not self.full_frame_pending:
+            self.field ^= 1
+            bands = BANDS_FIELD + self.field
+        else:
+            bands = BANDS_FULL_FRAME
+        self.full_frame_pending = False
+
+        # Boden mit dynamischen Werten und dem gewählten Kernel rendern.
+        # Die Zeilentabellen baut der Kernel selbst auf (einmal pro Frame statt einmal pro Pixel),
+        # Horizont und Brennweite in der internen Auflösung (siehe set_render_scale).
+        frame_args = (camera.position, camera.angle, dynamic_focal_len * self.render_size_factor, bands)
+
+        if self.async_render:
+            # Boden im Render-Thread, Himmel und Übertragen auf das Fenster erst in draw() (siehe present_floor)
+            self.submit_floor(frame_args, bg_offset)
+        elif self.render_surface is not None and self.sky_at_render_resolution:
+            # Feste interne Auflösung: Himmel und Boden in die interne Surface
+            # (bzw. ins interne Bildschirm-Array), hochskaliert wird in draw()
+            sky_offset = bg_offset * self.sky_tex_width // self.bg_tex_size[0]
+            if self.packed_pixels:
+                render_pixels = pygame.surfarray.pixels2d(self.render_surface)
+                self.draw_sky(render_pixels, self.sky_array, sky_offset, self.render_horizon)
+                self.render_floor(render_pixels, frame_args)
+                del render_pixels
+            else:
+                self.draw_sky(self.screen_array, self.sky_array, sky_offset, self.render_horizon)
+                self.screen_array = self.render_floor(self.screen_array, frame_args)
+        elif self.render_surface is not None:
+            # Verringerte interne Auflösung: Himmel direkt ins Fenster, Boden in die interne Surface
+            # (bzw. ins interne Bildschirm-Array), hochskaliert wird in draw()
+            self.draw_window_sky(bg_offset)
+            if self.packed_pixels:
+                render_pixels = pygame.surfarray.pixels2d(self.render_surface)
+                self.render_floor(render_pixels, frame_args)
+                del render_pixels
+            else:
+                self.screen_array = self.render_floor(self.screen_array, frame_args)
+        elif self.packed_pixels:
+            # Direkt in die (dafür gesperrte) Display-Surface rendern, ohne Kopie über ein eigenes Array.
+            # Die Referenz muss danach wieder freigegeben werden, damit die Surface entsperrt wird
+            # und Sprites darauf gezeichnet werden können.
+            screen_pixels = pygame.surfarray.pixels2d(self.app.screen)
+            self.draw_sky(screen_pixels, self.bg_array, bg_offset, self.horizon)
+            self.render_floor(screen_pixels, frame_args)
+            del screen_pixels
+        else:
+            self.draw_sky(self.screen_array, self.bg_array, bg_offset, self.horizon)
+            self.screen_array = self.render_floor(self.screen_array, frame_args)
+
+    # Rendert den Boden mit dem gewählten Kernel in screen_array.
+    # Wurde nur ein Halbbild berechnet, wird das andere (aus dem vorigen Frame) auf Wunsch überblendet
+    # (siehe blend_stale_field). Beim asynchronen Rendern wird es vorher aus previous_array übernommen,
+    # dem Puffer des vorigen Frames (siehe copy_stale_field).
+    # frame_args sind Kamera-Pose, Brennweite und Band-Tabelle des Frames (siehe render_frame).
+    def render_floor(self, screen_array, frame_args, previous_array = None):
+        ensure_render_config(self.render_config)
+        bands = frame_args[-1]
+        stale_field = (bands - BANDS_FIELD) ^ 1
+        if previous_array is not None and bands != BANDS_FULL_FRAME:
+            copy_stale_field(screen_array, previous_array, self.render_horizon, stale_field)
+        screen_array = self.render(self.render_state, screen_array, *frame_args)
+        if self.interlace_blend and bands != BANDS_FULL_FRAME:
+            blend = blend_stale_field_packed if self.packed_pixels else blend_stale_field
+            blend(screen_array, self.render_horizon, stale_field)
+        return screen_array
+
+    # Zeichnet den Himmel in Fensterauflösung direkt auf die Display-Surface
+    # (bei verringerter interner Auflösung ohne feste interne Auflösung, siehe update).
+    def draw_window_sky(self, bg_offset):
+        if self.packed_pixels:
+            screen_pixels = pygame.surfarray.pixels2d(self.app.screen)
+            self.draw_sky(screen_pixels, self.bg_array, bg_offset, self.horizon)
+            del screen_pixels
+        else:
+            pygame.surfarray.blit_array(self.screen_sky_area, self.bg_array[bg_offset:bg_offset + WIDTH])
+
+    # ------------------ Asynchrones Rendern ---------------------------
+
+    # Thread, in dem alle Mode7-Renderer ihren Boden rendern (siehe render_worker).
+    # Ein einziger Thread für alle Renderer, damit nie zwei parallele Kernel gleichzeitig laufen
+    # (z.B. der letzte Auftrag des Renderers eines beendeten Rennens und der erste des neuen).
+    floor_worker = None
+
+    # Gibt den Render-Thread zurück und startet ihn beim ersten Aufruf.
+    @staticmethod
+    def render_worker():
+        if Mode7.floor_worker is None:
+            # Der Thread-Pool von numba muss im Haupt-Thread gestartet werden (siehe start_warm_up)
+            numba.get_num_threads()
+            Mode7.floor_worker = ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "Mode7")
+        return Mode7.floor_worker
 
-    # Berechnet einen einzelnen Frame der Mode-7-Umgebung Pixel für Pixel.
+    # Gibt den Boden eines Frames an den Render-Thread (Double Buffering).
+    # Vorher wird der Auftrag des vorigen Frames abgeschlossen, sein Puffer ist danach der vordere.
+    # Gerendert wird in den anderen Puffer, dessen Inhalt draw() zu diesem Zeitpunkt schon übertragen hat.
+    # bg_offset ist die Verschiebung des Himmels, die beim Anzeigen zu diesem Boden gehört.
+    def submit_floor(self, frame_args, bg_offset):
+        self.finish_floor()
+        if self.front_buffer is None:
+            back_buffer, previous_array = 0, None
+        else:
+            back_buffer, previous_array = self.front_buffer ^ 1, self.frame_buffers[self.front_buffer]
+        self.frame_bg_offsets[back_buffer] = bg_offset
+        future = Mode7.render_worker().submit(self.render_floor, self.frame_buffers[back_buffer], frame_args, previous_array)
+        self.pending_floor = (future, back_buffer)
+
+    # Schließt den laufenden Auftrag des Render-Threads ab, wartet dabei höchstens timeout Sekunden (None = unbegrenzt).
+    # Ist der Boden fertig, wird sein Puffer zum vorderen. Fehler im Render-Thread werden hier weitergegeben.
+    #
+    # Rückgabe: ob kein Auftrag mehr läuft
+    def finish_floor(self, timeout = None):
+        if self.pending_floor is None:
+            return True
+        future, buffer = self.pending_floor
+        if timeout is not None and not wait([future], timeout).done:
+            return False
+        future.result()
+        self.pending_floor = None
+        self.front_buffer = buffer
+        return True
+
+    # Überträgt den zuletzt fertig gerenderten Boden samt Himmel auf die interne Surface (siehe draw).
+    # Auf den Boden des aktuellen Frames wird höchstens latency_budget_ms gewartet, sonst wird der des vorigen angezeigt.
+    # Gibt es noch keinen fertigen Boden (erster Frame, nach einer Änderung der Auflösung), wird immer gewartet.
+    def present_floor(self):
+        if self.front_buffer is None or self.latency_budget_ms is None:
+            timeout = None
+        else:
+            timeout = self.latency_budget_ms / 1000
+        if self.finish_floor(timeout):
+            self.frames_on_time += 1
+        else:
+            self.frames_late += 1
+
+        # Vor dem ersten update() gibt es nichts anzuzeigen
+        if self.front_buffer is None:
+            return
+
+        frame_buffer = self.frame_buffers[self.front_buffer]
+        bg_offset = self.frame_bg_offsets[self.front_buffer]
+        if self.sky_at_render_resolution:
+            sky_offset = bg_offset * self.sky_tex_width // self.bg_tex_size[0]
+            self.draw_sky(frame_buffer, self.sky_array, sky_offset, self.render_horizon)
+        else:
+            self.draw_window_sky(bg_offset)
+        pygame.surfarray.blit_array(self.render_surface, frame_buffer)
+
+    # Zählerstände des asynchronen Renderns für das Monitoring:
+    # angezeigte Frames mit dem Boden des aktuellen bzw. (Latenzbudget überschritten) des vorigen Frames
+    def async_stats(self):
+        return {"on_time": self.frames_on_time, "late": self.frames_late, "latency_budget_ms": self.latency_budget_ms}
+
+    # ------------------ Ende des asynchronen Renderns ---------------------------
+
+    # Füllt die Zeilen über dem Horizont mit dem Skybox-Band.
+    # Dank des angehängten Streifens (siehe prepare_bg_texture) ist das eine einzige zusammenhängende Slice-Kopie.
+    #
+    # Parameter:
+    # screen_array: Array, in das der Himmel geschrieben wird
+    # bg_array: Skybox-Band in der Auflösung von screen_array (siehe prepare_bg_texture bzw. set_render_scale)
+    # bg_offset: Spalte des Skybox-Bands, die am linken Bildschirmrand erscheint, im Intervall [0, Texturbreite)
+    # horizon: Horizont in der Auflösung von screen_array
+    def draw_sky(self, screen_array, bg_array, bg_offset, horizon):
+        screen_array[:, :horizon] = bg_array[bg_offset:bg_offset + screen_array.shape[0]]
+
+    # Berechnet den Boden eines einzelnen Frames der Mode-7-Umgebung Pixel für Pixel
+    # (der Himmel über dem Horizont kommt aus draw_sky).
     # Benötigt numba Just-in-Time-Compiler-Unterstützung (Dekoratoren),
     # um eine vernünftige Framerate zu erreichen, wenn es jeden Frame ausgeführt wird.
     # 
     # Parameter:
-    # floor_array: Array, das die Pixel der Bodentextur enthält
-    # bg_array: Array, das die Pixel der Hintergrundtextur enthält
-    # screen_array: Array, das den gerenderten Frame enthält (Pixel für Pixel aktualisiert)
-    # floor_tex_size: Größe der Bodentextur
-    # bg_tex_size: Größe der Hintergrundtextur
-    # is_foggy: ob die Szene, von der ein Frame gerendert wird, einen Nebeleffekt hat
-    # pos: aktuelle Position der Kamera
-    # angle: aktueller Winkel, um den die Kamera rotiert ist
-    # horizon: die minimale y-Koordinate der Bodenpixel (beachten: y nimmt nach unten auf dem Bildschirm zu)
-    @staticmethod
-    @njit(fastmath=True, parallel=True)
-    def render_frame(floor_array, bg_array, screen_array, floor_tex_size, bg_tex_size,
-        is_foggy, pos, angle, horizon, focal_len, bg_rotation_speed):
-        # Sinus- und Kosinuswerte des Spielerwinkels berechnen,
-        # um sie zum Rendern der Umgebung basierend auf der Rotation des Spielers zu verwenden.
-        sin, cos = numpy.sin(angle), numpy.cos(angle)
+    # state: Zustand des Renderers mit Bodentextur, Tabellen und Pixelformat (siehe RenderState)
+    # screen_array: Array, das den gerenderten Frame enthält (Pixel für Pixel aktualisiert),
+    #   seine Größe ist die Größe des Frames (Fenster- oder interne Auflösung, siehe set_render_scale)
+    # pos, angle: aktuelle Position und aktueller Winkel der Kamera
+    # focal_len: (dynamische) Brennweite der Kamera in der Auflösung des Frames
+    # bands: Index der Band-Tabelle im Zustand (BANDS_FULL_FRAME oder Halbbild beim Interlacing)
+    #
+    # Die Kernel geben das GIL frei (nogil), damit der Haupt-Thread beim asynchronen Rendern weiterarbeiten kann
+    # (siehe submit_floor).
+    #
+    # Vor der parallelen Schleife werden die Zeilentabellen des Frames gefüllt (siehe begin_frame).
+    # Die Band-Tabelle teilt die Bodenzeilen in Bänder mit ihrer horizontalen Shading-Rate (siehe shading_band_rows),
+    # lückenlos vom Horizont (minimale y-Koordinate der Bodenpixel) bis zum unteren Rand
+    # (beachten: y nimmt nach unten auf dem Bildschirm zu),
+    # beim Interlacing nur mit den Zeilen eines Halbbilds (BAND_ROW_STEP = 2).
+    #
+    # In Bändern mit verringerter Shading-Rate berechnet nur die erste Spalte jedes Blocks aus rate Spalten
+    # das Pixel und schreibt es in den ganzen Block (siehe write_block).
+    # Die volle Rate schreibt direkt ohne write_block (in den gepackten und indizierten Varianten in einer eigenen Schleife),
+    # damit sie so schnell bleibt wie ohne Bänder.
+    @staticmethod
+    @njit(fastmath=True, parallel=True, nogil=True, cache=True)
+    def render_frame(state, screen_array, pos, angle, focal_len, bands):
+        shading_bands = begin_frame(state, pos, angle, focal_len, bands)
+        floor_array, row_tables, row_mip_tables = state.floor_array, state.row_tables, state.row_mip_tables
 
         # Farbwert für jedes einzelne Pixel (i, j) berechnen.
         # prange-Funktion (anstatt range-Funktion) für äußere Schleife aus Leistungsgründen verwendet.
-        for i in prange(WIDTH):
-            # Hintergrundbild-Rendering berechnen
-            for j in range(0, horizon):
-                # Hintergrundbild wird um den Winkel verschoben, um den der Spieler rotiert ist
-                # Verwendet dynamische bg_rotation_speed
-                screen_array[i][j] = bg_array[(i - int(angle * bg_rotation_speed)) % bg_tex_size[0]][j % bg_tex_size[1]]
-            # Boden-Rendering berechnen
-            for j in range(horizon, HEIGHT):
-                # Stellen wir uns vor, dass die Bodentextur unendlich
-                # sowohl horizontal als auch vertikal auf einer 2D-Ebene gekachelt ist.
-                # Nehmen wir an, dass die horizontalen und vertikalen Achsen dieser Ebene
-                # mit px und py bezeichnet sind.
-                # Nehmen wir weiter an, dass die horizontalen und vertikalen Achsen des Bildschirms
-                # mit x und z bezeichnet sind,
-                # während y eine imaginäre Achse ist, die aus dem Bildschirm herauskommt.
-                #
-                # Idee: Um den Mode-7-Effekt zu emulieren, berechnen, welches Pixel der Bodentextur
-                # über dem Pixel (i, j) des Bildschirms in diesem Frame liegt
-
-                # Erster Schritt: Rohe x, y, z Koordinaten berechnen
-                # ohne Mode-7-Style-Projektion.
-                #
-                # Wir passen die x-Koordinate an, sodass die Textur in der Mitte des Bildschirms ist.
-                # Außerdem wird die Tiefenkoordinate (y) immer um die Brennweite der Kamera verschoben.
-                # Schließlich müssen wir eine kleine Konstante zur Bildschirmhöhenkoordinate (z) hinzufügen,
-                # um Division-durch-0-Fehler im nächsten Schritt zu verhindern.
-                x = HALF_WIDTH - i
-                y = j + focal_len  # Verwendet dynamischen focal_len
-                z = j - horizon + 0.01 
-
-                # Spielerrotation anwenden (die aus dem Winkel berechnet wird, um den sie rotiert sind),
-                # "Standardformel für Rotation im 2D-Raum".
-                rx = x * cos + y * sin
-                ry = x * -sin + y * cos
-
-                # Mode-7-Style-Projektion anwenden.
-                # Kameraposition wird hier als Offset verwendet, um Bewegung zu ermöglichen
-                px = (rx / z + pos[1]) * SCALE
-                py = (ry / z + pos[0]) * SCALE
-
-                # Berechnen, welches Pixel der Bodentextur über dem Punkt (i, j) liegt
-                floor_pos = int(px % floor_tex_size[0]), int(py % floor_tex_size[1])
-
-                # Den entsprechenden Farbwert im Boden-Array nachschlagen
-                floor_col = floor_array[floor_pos]
-
-                # Um hässliche Artefakte am Horizont zu verhindern:
-                # Einen Dämpfungskoeffizienten im Intervall [0, 1] basierend auf dem "Tiefen"-Wert berechnen
-                attenuation = min(max(7.5 * (abs(z) / HALF_HEIGHT), 0), 1)
-
-                # Nebeleffekt berechnen, abhängig davon, ob die gerenderte Szene neblig ist.
-                fog = (1 - attenuation) * FOG_DENSITY if is_foggy else 0
-                
-                # Dämpfung und optionalen Nebeleffekt anwenden (komponentenweise auf Farbvektor)
-                floor_col = (floor_col[0] * attenuation + fog,
-                    floor_col[1] * attenuation + fog,
-                    floor_col[2] * attenuation + fog)
-
-                # Das berechnete Pixel in das Bildschirm-Array füllen
-                screen_array[i, j] = floor_col
+        for i in prange(screen_array.shape[0]):
+            for band in range(shading_bands.shape[0]):
+                first, end, rate = shading_bands[band, BAND_FIRST], shading_bands[band, BAND_END], shading_bands[band, BAND_RATE]
+                row_step = shading_bands[band, BAND_ROW_STEP]
+
+                # Spalten innerhalb eines Blocks übernehmen das Pixel der ersten Spalte (Raten sind Zweierpotenzen)
+                if i & (rate - 1):
+                    continue
+
+                # Boden-Rendering berechnen
+                for j in range(first, end, row_step):
+                    # Die gesamte Projektion steckt in den Zeilentabellen:
+                    # Texturkoordinate = Wert am linken Rand + i * Schrittweite pro Spalte.
+                    px = row_tables[ROW_U0, j] + i * row_tables[ROW_DU, j]
+                    py = row_tables[ROW_V0, j] + i * row_tables[ROW_DV, j]
+
+                    # Berechnen, welches Pixel der Bodentextur über dem Punkt (i, j) liegt (siehe mip_texel)
+                    floor_pos = mip_texel(px, py, row_mip_tables, j)
+
+                    # Den entsprechenden Farbwert im Boden-Array nachschlagen
+                    floor_col = floor_texel(floor_array, *floor_pos)
+
+                    # Dämpfung und optionalen Nebeleffekt anwenden (komponentenweise auf Farbvektor)
+                    attenuation = row_tables[ROW_ATTENUATION, j]
+                    fog = row_tables[ROW_FOG, j]
+                    floor_col = (floor_col[0] * attenuation + fog,
+                        floor_col[1] * attenuation + fog,
+                        floor_col[2] * attenuation + fog)
+
+                    # Das berechnete Pixel in das Bildschirm-Array füllen
+                    if rate == 1:
+                        screen_array[i, j] = floor_col
+                    else:
+                        write_block(screen_array, i, j, rate, floor_col)
+
+        return screen_array
+
+    # Zeilenweise Variante von render_frame (inkrementelles Abtasten / DDA).
+    # Innerhalb einer Bildschirmzeile ist die Texturkoordinate linear in der Spalte,
+    # daher wird pro Zeile nur die Koordinate am linken Rand nachgeschlagen
+    # und dann für jedes Pixel um die Schrittweite pro Spalte weitergezählt.
+    # Die parallele Schleife läuft deshalb über die Zeilen statt über die Spalten.
+    # Mit verringerter Shading-Rate wird pro Block aus rate Spalten nur einmal abgetastet
+    # und um einen ganzen Block weitergezählt, die Abtastwerte werden danach auf die Zeile verteilt.
+    #
+    # Parameter wie bei render_frame.
+    @staticmethod
+    @njit(fastmath=True, parallel=True, nogil=True, cache=True)
+    def render_frame_rows(state, screen_array, pos, angle, focal_len, bands):
+        shading_bands = begin_frame(state, pos, angle, focal_len, bands)
+        floor_array, row_tables, row_mip_tables = state.floor_array, state.row_tables, state.row_mip_tables
+
+        # Beim Interlacing nur jede zweite Zeile (siehe shading_band_rows)
+        first_row, row_step = shading_bands[0, BAND_FIRST], shading_bands[0, BAND_ROW_STEP]
+        for k in prange((screen_array.shape[1] - first_row + row_step - 1) // row_step):
+            j = first_row + k * row_step
+
+            # Shading-Rate des Bands, in dem die Zeile liegt
+            band = row_band(shading_bands, j)
+            rate, rate_shift = shading_bands[band, BAND_RATE], shading_bands[band, BAND_RATE_SHIFT]
+
+            # Boden-Rendering berechnen:
+            # Start am linken Rand der Zeile, dann pro Pixel nur noch zwei Additionen
+            px = row_tables[ROW_U0, j]
+            py = row_tables[ROW_V0, j]
+            dpx = row_tables[ROW_DU, j]
+            dpy = row_tables[ROW_DV, j]
+            attenuation = row_tables[ROW_ATTENUATION, j]
+            fog = row_tables[ROW_FOG, j]
+
+            # Bitmasken und Atlas-Position der Mip-Stufe dieser Zeile (siehe mip_texel)
+            mask_u, mask_v = row_mip_tables[MIP_MASK_U, j], row_mip_tables[MIP_MASK_V, j]
+            base_u, base_v = row_mip_tables[MIP_BASE_U, j], row_mip_tables[MIP_BASE_V, j]
+
+            if rate == 1:
+                for i in range(screen_array.shape[0]):
+                    # Den entsprechenden Farbwert im Boden-Array nachschlagen
+                    floor_col = floor_texel(floor_array, (int(px) & mask_u) + base_u, (int(py) & mask_v) + base_v)
+
+                    # Dämpfung und optionalen Nebeleffekt anwenden (komponentenweise auf Farbvektor)
+                    screen_array[i, j, 0] = floor_col[0] * attenuation + fog
+                    screen_array[i, j, 1] = floor_col[1] * attenuation + fog
+                    screen_array[i, j, 2] = floor_col[2] * attenuation + fog
+
+                    # Zum nächsten Pixel der Zeile weiterschreiten
+                    px += dpx
+                    py += dpy
+            else:
+                # Nur jede rate-te Spalte abtasten und schattieren, dann auf die Zeile verteilen
+                samples = numpy.empty((-(-screen_array.shape[0] // rate), 3), dtype = screen_array.dtype)
+                for s in range(samples.shape[0]):
+                    floor_col = floor_texel(floor_array, (int(px) & mask_u) + base_u, (int(py) & mask_v) + base_v)
+                    samples[s, 0] = floor_col[0] * attenuation + fog
+                    samples[s, 1] = floor_col[1] * attenuation + fog
+                    samples[s, 2] = floor_col[2] * attenuation + fog
+                    px += dpx * rate
+                    py += dpy * rate
+                for i in range(screen_array.shape[0]):
+                    screen_array[i, j, 0] = samples[i >> rate_shift, 0]
+                    screen_array[i, j, 1] = samples[i >> rate_shift, 1]
+                    screen_array[i, j, 2] = samples[i >> rate_shift, 2]
+
+        return screen_array
+
+    # Variante von render_frame für gepackte 32-Bit-Pixel.
+    # Texturen und Bildschirm sind 2D-Arrays mit einem Wert pro Pixel,
+    # pro Texel wird also nur ein einziger Wert gelesen und geschrieben.
+    #
+    # Parameter wie bei render_frame, die Bit-Verschiebungen der Farbkanäle R, G, B im Pixelformat des Displays
+    # kommen aus dem Zustand (pixel_shifts).
+    @staticmethod
+    @njit(fastmath=True, parallel=True, nogil=True, cache=True)
+    def render_frame_packed(state, screen_array, pos, angle, focal_len, bands):
+        shading_bands = begin_frame(state, pos, angle, focal_len, bands)
+        floor_array, row_tables, row_mip_tables = state.floor_array, state.row_tables, state.row_mip_tables
+        pixel_shifts = state.pixel_shifts
+
+        for i in prange(screen_array.shape[0]):
+            for band in range(shading_bands.shape[0]):
+                first, end, rate = shading_bands[band, BAND_FIRST], shading_bands[band, BAND_END], shading_bands[band, BAND_RATE]
+                row_step = shading_bands[band, BAND_ROW_STEP]
+
+                # Boden-Rendering berechnen (siehe render_frame)
+                if rate == 1:
+                    for j in range(first, end, row_step):
+                        px = row_tables[ROW_U0, j] + i * row_tables[ROW_DU, j]
+                        py = row_tables[ROW_V0, j] + i * row_tables[ROW_DV, j]
+                        texel = floor_texel(floor_array, *mip_texel(px, py, row_mip_tables, j))
+                        screen_array[i, j] = shade_packed_pixel(texel, row_tables[ROW_ATTENUATION, j], row_tables[ROW_FOG, j], pixel_shifts)
+                elif (i & (rate - 1)) == 0:
+                    for j in range(first, end, row_step):
+                        px = row_tables[ROW_U0, j] + i * row_tables[ROW_DU, j]
+                        py = row_tables[ROW_V0, j] + i * row_tables[ROW_DV, j]
+                        texel = floor_texel(floor_array, *mip_texel(px, py, row_mip_tables, j))
+                        write_block(screen_array, i, j, rate,
+                            shade_packed_pixel(texel, row_tables[ROW_ATTENUATION, j], row_tables[ROW_FOG, j], pixel_shifts))
+
+        return screen_array
+
+    # Variante von render_frame_rows (DDA) für gepackte 32-Bit-Pixel.
+    # Zeilen ohne Dämpfung und Nebel (der Großteil des Bodens) werden ohne Entpacken kopiert.
+    #
+    # Parameter wie bei render_frame_packed.
+    @staticmethod
+    @njit(fastmath=True, parallel=True, nogil=True, cache=True)
+    def render_frame_rows_packed(state, screen_array, pos, angle, focal_len, bands):
+        shading_bands = begin_frame(state, pos, angle, focal_len, bands)
+        floor_array, row_tables, row_mip_tables = state.floor_array, state.row_tables, state.row_mip_tables
+        pixel_shifts = state.pixel_shifts
+
+        first_row, row_step = shading_bands[0, BAND_FIRST], shading_bands[0, BAND_ROW_STEP]
+        for k in prange((screen_array.shape[1] - first_row + row_step - 1) // row_step):
+            j = first_row + k * row_step
+
+            # Shading-Rate des Bands, in dem die Zeile liegt
+            band = row_band(shading_bands, j)
+            rate, rate_shift = shading_bands[band, BAND_RATE], shading_bands[band, BAND_RATE_SHIFT]
+
+            # Boden-Rendering berechnen (siehe render_frame_rows)
+            px = row_tables[ROW_U0, j]
+            py = row_tables[ROW_V0, j]
+            dpx = row_tables[ROW_DU, j]
+            dpy = row_tables[ROW_DV, j]
+            attenuation = row_tables[ROW_ATTENUATION, j]
+            fog = row_tables[ROW_FOG, j]
+            mask_u, mask_v = row_mip_tables[MIP_MASK_U, j], row_mip_tables[MIP_MASK_V, j]
+            base_u, base_v = row_mip_tables[MIP_BASE_U, j], row_mip_tables[MIP_BASE_V, j]
+
+            if rate > 1:
+                # Verringerte Shading-Rate (siehe render_frame_rows)
+                samples = numpy.empty(-(-screen_array.shape[0] // rate), dtype = screen_array.dtype)
+                if attenuation >= 1 and fog == 0:
+                    for s in range(samples.shape[0]):
+                        samples[s] = floor_texel(floor_array, (int(px) & mask_u) + base_u, (int(py) & mask_v) + base_v)
+                        px += dpx * rate
+                        py += dpy * rate
+                else:
+                    for s in range(samples.shape[0]):
+                        texel = floor_texel(floor_array, (int(px) & mask_u) + base_u, (int(py) & mask_v) + base_v)
+                        samples[s] = shade_packed_pixel(texel, attenuation, fog, pixel_shifts)
+                        px += dpx * rate
+                        py += dpy * rate
+                expand_samples(screen_array, j, samples, rate_shift)
+            elif attenuation >= 1 and fog == 0:
+                for i in range(screen_array.shape[0]):
+                    screen_array[i, j] = floor_texel(floor_array, (int(px) & mask_u) + base_u, (int(py) & mask_v) + base_v)
+                    px += dpx
+                    py += dpy
+            else:
+                for i in range(screen_array.shape[0]):
+                    texel = floor_texel(floor_array, (int(px) & mask_u) + base_u, (int(py) & mask_v) + base_v)
+                    screen_array[i, j] = shade_packed_pixel(texel, attenuation, fog, pixel_shifts)
+                    px += dpx
+                    py += dpy
+
+        return screen_array
+
+    # Variante von render_frame für palettenindizierte Bodentexturen.
+    # Pro Texel wird nur ein Byte (der Palettenindex) gelesen und über die Palette der Zeile in die Farbe übersetzt.
+    # Dämpfung und Nebel sind in den Zeilenpaletten schon enthalten, kosten hier also nichts.
+    # Funktioniert mit beiden Pixelformaten: Mit gepackten Pixeln enthalten die Paletten 32-Bit-Werte,
+    # sonst RGB-Vektoren.
+    #
+    # Parameter wie bei render_frame, die Paletten pro Bildschirmzeile (siehe build_row_palettes)
+    # kommen aus dem Zustand (row_palettes).
+    @staticmethod
+    @njit(fastmath=True, parallel=True, nogil=True, cache=True)
+    def render_frame_indexed(state, screen_array, pos, angle, focal_len, bands):
+        shading_bands = begin_frame(state, pos, angle, focal_len, bands)
+        floor_array, row_tables, row_mip_tables = state.floor_array, state.row_tables, state.row_mip_tables
+        row_palettes = state.row_palettes
+
+        for i in prange(screen_array.shape[0]):
+            for band in range(shading_bands.shape[0]):
+                first, end, rate = shading_bands[band, BAND_FIRST], shading_bands[band, BAND_END], shading_bands[band, BAND_RATE]
+                row_step = shading_bands[band, BAND_ROW_STEP]
+
+                # Boden-Rendering berechnen (siehe render_frame)
+                if rate == 1:
+                    for j in range(first, end, row_step):
+                        px = row_tables[ROW_U0, j] + i * row_tables[ROW_DU, j]
+                        py = row_tables[ROW_V0, j] + i * row_tables[ROW_DV, j]
+                        screen_array[i, j] = row_palettes[j, floor_texel(floor_array, *mip_texel(px, py, row_mip_tables, j))]
+                elif (i & (rate - 1)) == 0:
+                    for j in range(first, end, row_step):
+                        px = row_tables[ROW_U0, j] + i * row_tables[ROW_DU, j]
+                        py = row_tables[ROW_V0, j] + i * row_tables[ROW_DV, j]
+                        write_block(screen_array, i, j, rate, row_palettes[j, floor_texel(floor_array, *mip_texel(px, py, row_mip_tables, j))])
+
+        return screen_array
+
+    # Variante von render_frame_rows (DDA) für palettenindizierte Bodentexturen.
+    #
+    # Parameter wie bei render_frame_indexed.
+    @staticmethod
+    @njit(fastmath=True, parallel=True, nogil=True, cache=True)
+    def render_frame_rows_indexed(state, screen_array, pos, angle, focal_len, bands):
+        shading_bands = begin_frame(state, pos, angle, focal_len, bands)
+        floor_array, row_tables, row_mip_tables = state.floor_array, state.row_tables, state.row_mip_tables
+        row_palettes = state.row_palettes
+
+        first_row, row_step = shading_bands[0, BAND_FIRST], shading_bands[0, BAND_ROW_STEP]
+        for k in prange((screen_array.shape[1] - first_row + row_step - 1) // row_step):
+            j = first_row + k * row_step
+
+            # Shading-Rate des Bands, in dem die Zeile liegt
+            band = row_band(shading_bands, j)
+            rate, rate_shift = shading_bands[band, BAND_RATE], shading_bands[band, BAND_RATE_SHIFT]
+
+            # Boden-Rendering berechnen (siehe render_frame_rows)
+            px = row_tables[ROW_U0, j]
+            py = row_tables[ROW_V0, j]
+            dpx = row_tables[ROW_DU, j]
+            dpy = row_tables[ROW_DV, j]
+            palette = row_palettes[j]
+            mask_u, mask_v = row_mip_tables[MIP_MASK_U, j], row_mip_tables[MIP_MASK_V, j]
+            base_u, base_v = row_mip_tables[MIP_BASE_U, j], row_mip_tables[MIP_BASE_V, j]
+
+            if rate == 1:
+                for i in range(screen_array.shape[0]):
+                    screen_array[i, j] = palette[floor_texel(floor_array, (int(px) & mask_u) + base_u, (int(py) & mask_v) + base_v)]
+                    px += dpx
+                    py += dpy
+            else:
+                # Verringerte Shading-Rate (siehe render_frame_rows)
+                # Pro Abtastwert ein Paletteneintrag (32-Bit-Wert bzw. RGB-Vektor)
+                samples = numpy.empty((-(-screen_array.shape[0] // rate),) + palette.shape[1:], dtype = screen_array.dtype)
+                for s in range(samples.shape[0]):
+                    samples[s] = palette[floor_texel(floor_array, (int(px) & mask_u) + base_u, (int(py) & mask_v) + base_v)]
+                    px += dpx * rate
+                    py += dpy * rate
+                expand_samples(screen_array, j, samples, rate_shift)
+
+        return screen_array
+
+    # Variante von render_frame_rows (DDA) mit Texturkoordinaten in 16.16-Festkomma wie bei der SNES-Hardware.
+    # Nur die Startwerte jeder Zeile werden aus den Zeilentabellen (Gleitkomma) umgerechnet (siehe fixed_point_row),
+    # Weiterzählen, Umbrechen und Nachschlagen der Texel sind reine Ganzzahl-Operationen
+    # (Addition, Shift, Bitmaske) ohne Umwandlung von Gleitkomma in Ganzzahl pro Pixel.
+    # Dämpfung und Nebel werden wie in render_frame_rows berechnet.
+    # Durch die gerundete Schrittweite liegt ein Pixel am Ende der Zeile um höchstens Breite / 2^17 Texel daneben,
+    # d.h. nur Pixel direkt an einer Texelgrenze können ein anderes Texel zeigen als im Gleitkomma-Kernel.
+    #
+    # Parameter wie bei render_frame.
+    @staticmethod
+    @njit(fastmath=True, parallel=True, nogil=True, cache=True)
+    def render_frame_fixed(state, screen_array, pos, angle, focal_len, bands):
+        shading_bands = begin_frame(state, pos, angle, focal_len, bands)
+        floor_array, row_tables, row_mip_tables = state.floor_array, state.row_tables, state.row_mip_tables
+
+        first_row, row_step = shading_bands[0, BAND_FIRST], shading_bands[0, BAND_ROW_STEP]
+        for k in prange((screen_array.shape[1] - first_row + row_step - 1) // row_step):
+            j = first_row + k * row_step
+
+            # Shading-Rate des Bands, in dem die Zeile liegt
+            band = row_band(shading_bands, j)
+            rate, rate_shift = shading_bands[band, BAND_RATE], shading_bands[band, BAND_RATE_SHIFT]
+
+            # Boden-Rendering berechnen: Start am linken Rand der Zeile als Festkommazahl
+            u, v, du, dv = fixed_point_row(row_tables, j)
+            attenuation = row_tables[ROW_ATTENUATION, j]
+            fog = row_tables[ROW_FOG, j]
+            mask_u, mask_v = row_mip_tables[MIP_MASK_U, j], row_mip_tables[MIP_MASK_V, j]
+            base_u, base_v = row_mip_tables[MIP_BASE_U, j], row_mip_tables[MIP_BASE_V, j]
+
+            if rate == 1:
+                for i in range(screen_array.shape[0]):
+                    floor_col = floor_texel(floor_array, ((u >> FIXED_POINT_SHIFT) & mask_u) + base_u, ((v >> FIXED_POINT_SHIFT) & mask_v) + base_v)
+                    screen_array[i, j, 0] = floor_col[0] * attenuation + fog
+                    screen_array[i, j, 1] = floor_col[1] * attenuation + fog
+                    screen_array[i, j, 2] = floor_col[2] * attenuation + fog
+                    u += du
+                    v += dv
+            else:
+                # Verringerte Shading-Rate (siehe render_frame_rows)
+                samples = numpy.empty((-(-screen_array.shape[0] // rate), 3), dtype = screen_array.dtype)
+                du *= rate
+                dv *= rate
+                for s in range(samples.shape[0]):
+                    floor_col = floor_texel(floor_array, ((u >> FIXED_POINT_SHIFT) & mask_u) + base_u, ((v >> FIXED_POINT_SHIFT) & mask_v) + base_v)
+                    samples[s, 0] = floor_col[0] * attenuation + fog
+                    samples[s, 1] = floor_col[1] * attenuation + fog
+                    samples[s, 2] = floor_col[2] * attenuation + fog
+                    u += du
+                    v += dv
+                for i in range(screen_array.shape[0]):
+                    screen_array[i, j, 0] = samples[i >> rate_shift, 0]
+                    screen_array[i, j, 1] = samples[i >> rate_shift, 1]
+                    screen_array[i, j, 2] = samples[i >> rate_shift, 2]
+
+        return screen_array
+
+    # Variante von render_frame_fixed für gepackte 32-Bit-Pixel (siehe render_frame_rows_packed).
+    #
+    # Parameter wie bei render_frame_packed.
+    @staticmethod
+    @njit(fastmath=True, parallel=True, nogil=True, cache=True)
+    def render_frame_fixed_packed(state, screen_array, pos, angle, focal_len, bands):
+        shading_bands = begin_frame(state, pos, angle, focal_len, bands)
+        floor_array, row_tables, row_mip_tables = state.floor_array, state.row_tables, state.row_mip_tables
+        pixel_shifts = state.pixel_shifts
+
+        first_row, row_step = shading_bands[0, BAND_FIRST], shading_bands[0, BAND_ROW_STEP]
+        for k in prange((screen_array.shape[1] - first_row + row_step - 1) // row_step):
+            j = first_row + k * row_step
+
+            # Shading-Rate des Bands, in dem die Zeile liegt
+            band = row_band(shading_bands, j)
+            rate, rate_shift = shading_bands[band, BAND_RATE], shading_bands[band, BAND_RATE_SHIFT]
+
+            # Boden-Rendering berechnen (siehe render_frame_fixed)
+            u, v, du, dv = fixed_point_row(row_tables, j)
+            attenuation = row_tables[ROW_ATTENUATION, j]
+            fog = row_tables[ROW_FOG, j]
+            mask_u, mask_v = row_mip_tables[MIP_MASK_U, j], row_mip_tables[MIP_MASK_V, j]
+            base_u, base_v = row_mip_tables[MIP_BASE_U, j], row_mip_tables[MIP_BASE_V, j]
+
+            if rate > 1:
+                # Verringerte Shading-Rate (siehe render_frame_rows)
+                samples = numpy.empty(-(-screen_array.shape[0] // rate), dtype = screen_array.dtype)
+                du *= rate
+                dv *= rate
+                if attenuation >= 1 and fog == 0:
+                    for s in range(samples.shape[0]):
+                        samples[s] = floor_texel(floor_array, ((u >> FIXED_POINT_SHIFT) & mask_u) + base_u, ((v >> FIXED_POINT_SHIFT) & mask_v) + base_v)
+                        u += du
+                        v += dv
+                else:
+                    for s in range(samples.shape[0]):
+                        texel = floor_texel(floor_array, ((u >> FIXED_POINT_SHIFT) & mask_u) + base_u, ((v >> FIXED_POINT_SHIFT) & mask_v) + base_v)
+                        samples[s] = shade_packed_pixel(texel, attenuation, fog, pixel_shifts)
+                        u += du
+                        v += dv
+                expand_samples(screen_array, j, samples, rate_shift)
+            elif attenuation >= 1 and fog == 0:
+                for i in range(screen_array.shape[0]):
+                    screen_array[i, j] = floor_texel(floor_array, ((u >> FIXED_POINT_SHIFT) & mask_u) + base_u, ((v >> FIXED_POINT_SHIFT) & mask_v) + base_v)
+                    u += du
+                    v += dv
+            else:
+                for i in range(screen_array.shape[0]):
+                    texel = floor_texel(floor_array, ((u >> FIXED_POINT_SHIFT) & mask_u) + base_u, ((v >> FIXED_POINT_SHIFT) & mask_v) + base_v)
+                    screen_array[i, j] = shade_packed_pixel(texel, attenuation, fog, pixel_shifts)
+                    u += du
+                    v += dv
+
+        return screen_array
+
+    # Variante von render_frame_fixed für palettenindizierte Bodentexturen (siehe render_frame_rows_indexed).
+    #
+    # Parameter wie bei render_frame_indexed.
+    @staticmethod
+    @njit(fastmath=True, parallel=True, nogil=True, cache=True)
+    def render_frame_fixed_indexed(state, screen_array, pos, angle, focal_len, bands):
+        shading_bands = begin_frame(state, pos, angle, focal_len, bands)
+        floor_array, row_tables, row_mip_tables = state.floor_array, state.row_tables, state.row_mip_tables
+        row_palettes = state.row_palettes
+
+        first_row, row_step = shading_bands[0, BAND_FIRST], shading_bands[0, BAND_ROW_STEP]
+        for k in prange((screen_array.shape[1] - first_row + row_step - 1) // row_step):
+            j = first_row + k * row_step
+
+            # Shading-Rate des Bands, in dem die Zeile liegt
+            band = row_band(shading_bands, j)
+            rate, rate_shift = shading_bands[band, BAND_RATE], shading_bands[band, BAND_RATE_SHIFT]
+
+            # Boden-Rendering berechnen (siehe render_frame_fixed)
+            u, v, du, dv = fixed_point_row(row_tables, j)
+            palette = row_palettes[j]
+            mask_u, mask_v = row_mip_tables[MIP_MASK_U, j], row_mip_tables[MIP_MASK_V, j]
+            base_u, base_v = row_mip_tables[MIP_BASE_U, j], row_mip_tables[MIP_BASE_V, j]
+
+            if rate == 1:
+                for i in range(screen_array.shape[0]):
+                    screen_array[i, j] = palette[floor_texel(floor_array, ((u >> FIXED_POINT_SHIFT) & mask_u) + base_u, ((v >> FIXED_POINT_SHIFT) & mask_v) + base_v)]
+                    u += du
+                    v += dv
+            else:
+                # Verringerte Shading-Rate (siehe render_frame_rows_indexed)
+                samples = numpy.empty((-(-screen_array.shape[0] // rate),) + palette.shape[1:], dtype = screen_array.dtype)
+                du *= rate
+                dv *= rate
+                for s in range(samples.shape[0]):
+                    samples[s] = palette[floor_texel(floor_array, ((u >> FIXED_POINT_SHIFT) & mask_u) + base_u, ((v >> FIXED_POINT_SHIFT) & mask_v) + base_v)]
+                    u += du
+                    v += dv
+                expand_samples(screen_array, j, samples, rate_shift)
 
         return screen_array
 
     def draw(self):
+        # Ruhende Kamera: gespeicherten Frame anzeigen (siehe update)
+        if self.frame_reused:
+            self.app.screen.blit(self.static_frame, (0, 0))
+            return
+
+        self.draw_frame()
+
+        # Frame speichern, solange im Fenster nur Himmel und Boden liegen (Sprites und HUD kommen erst danach).
+        # Beim asynchronen Rendern erst, wenn der Boden des aktuellen Frames angezeigt wird.
+        if self.static_frame_pending and self.pending_floor is None:
+            self.static_frame = self.app.screen.copy()
+            self.static_frame_pending = False
+
+    # Zählerstände der ruhenden Kamera für das Monitoring: gerenderte und wiederverwendete Frames
+    def frame_reuse_stats(self):
+        return {"rendered": self.frames_rendered, "reused": self.frames_reused}
+
+    # Zeigt den in update() gerenderten Frame im Fenster an (siehe draw)
+    def draw_frame(self):
+        # Asynchrones Rendern: fertigen Puffer auf die interne Surface übertragen (siehe present_floor)
+        if self.async_render:
+            self.present_floor()
+
+        # Verringerte bzw. feste interne Auflösung: interne Surface (ohne feste interne Auflösung nur deren Bodenbereich)
+        # per Nearest-Neighbour direkt auf das Fenster hochskalieren
+        if self.render_surface is not None:
+            if not self.packed_pixels and not self.async_render:
+                pygame.surfarray.blit_array(self.render_surface, self.screen_array)
+            if self.sky_at_render_resolution:
+                source, target = self.render_surface, self.app.screen
+            else:
+                source, target = self.render_floor_area, self.screen_floor_area
+            # In Fensterauflösung (Interlacing mit gepackten Pixeln) genügt eine Kopie
+            if source.get_size() == target.get_size():
+                target.blit(source, (0, 0))
+            else:
+                pygame.transform.scale(source, target.get_size(), target)
+            return
+
+        # Mit gepackten Pixeln hat der Kernel schon direkt in die Display-Surface geschrieben
+        if self.packed_pixels:
+            return
+
         # Zeichnet den Bildschirminhalt, der in der render_frame-Methode berechnet wurde.
         #
         # Kopiert Werte aus dem Array, das den Bildschirm darstellt,
@@ -17,6 +17,7 @@ from settings.machine_settings import OBSTACLE_HIT_SPEED_RETENTION
 from settings.machine_settings import MIN_JUMP_SPEED, DIRT_DAMPING, DIRT_MAX_SPEED_FACTOR, BOB_SPEED, BOB_AMPLITUDE 
 
 from collision import CollisionRect
+from track import SURFACE_DASH_PLATE, SURFACE_RAMP, SURFACE_RECOVERY_ZONE, SURFACE_DIRT
 
 from animation import AnimatedMachine
 
@@ -155,13 +156,16 @@ class Player(pygame.sprite.Sprite, AnimatedMachine):
             h = PLAYER_COLLISION_RECT_HEIGHT
         )
 
+        # Alle Oberflächen unter dem Spieler mit einer Abfrage bestimmen (siehe Track.query_surface)
+        surface = self.current_race.query_surface(current_collision_rect)
+
         # Rundenzähler aktualisieren.
         # Dafür benötigt das Streckenobjekt die aktuelle Position des Spielers.
-        self.current_race.update_lap_count(current_collision_rect, time)
+        self.current_race.update_lap_count(current_collision_rect, time, surface)
 
         # Spieler boosten lassen, wenn auf Dash-Plate.
         # Über eine Dash-Plate springen führt natürlich nicht zu einem Boost.
-        if self.current_race.is_on_dash_plate(current_collision_rect) and not self.jumping and not self.boosted:
+        if surface & SURFACE_DASH_PLATE and not self.jumping and not self.boosted:
             self.boosted = True
             self.last_boost_started_timestamp = time # Zeitstempel zur Bestimmung, wann der Boost enden soll
         if self.boosted:
@@ -169,7 +173,7 @@ class Player(pygame.sprite.Sprite, AnimatedMachine):
 
         # Spieler springen lassen, wenn auf Rampe.
         # Nur springen wenn Geschwindigkeit positiv und über Minimum (verhindert Rückwärts-Sprünge)
-        if self.current_race.is_on_ramp(current_collision_rect) and not self.jumping and self.current_speed >= MIN_JUMP_SPEED:
+        if surface & SURFACE_RAMP and not self.jumping and self.current_speed >= MIN_JUMP_SPEED:
             self.jumping = True # Status-Flag setzen
             self.current_jump_duration = self.machine.jump_duration_multiplier * self.current_speed # Sprungdauer basierend auf Geschwindigkeit berechnen
             self.jumped_off_timestamp = time # Zeitstempel zur Berechnung der Höhe in späteren Frames
@@ -178,7 +182,7 @@ class Player(pygame.sprite.Sprite, AnimatedMachine):
 
         # Spieler Energie wiederherstellen lassen, wenn in Wiederherstellungszone.
         # Über eine Wiederherstellungszone springen zählt natürlich nicht.
-        is_recovering = self.current_race.is_on_recovery_zone(current_collision_rect) and not self.jumping
+        is_recovering = bool(surface & SURFACE_RECOVERY_ZONE) and not self.jumping
         
         if is_recovering:
             self.current_energy += self.machine.recover_speed * delta
@@ -197,7 +201,7 @@ class Player(pygame.sprite.Sprite, AnimatedMachine):
 
         # Spieler verlangsamen, wenn auf Dirt-Zone.
         # Über Dirt springen hat keinen Effekt.
-        if self.current_race.is_on_dirt(current_collision_rect) and not self.jumping:
+        if surface & SURFACE_DIRT and not self.jumping:
             # Damping-Effekt: Geschwindigkeit wird pro Frame reduziert
             self.current_speed *= DIRT_DAMPING
 
@@ -583,7 +587,7 @@ class Player(pygame.sprite.Sprite, AnimatedMachine):
         # Wenn nein: zurückprallen lassen.
         #
         # Nur-Debug-Feature: Wenn Collision-Detection ausgeschaltet ist, wird der Spieler immer bewegt und nie zurückgeprallt.
-        if self.current_race.is_on_track(frame_lookahead_collision_rect) or self.jumping or COLLISION_DETECTION_OFF:
+        if self.current_race.is_on_track(frame_lookahead_collision_rect, "movement") or self.jumping or COLLISION_DETECTION_OFF:
             self.position[0] = next_frame_position_x
             self.position[1] = next_frame_position_y
         else:
@@ -645,7 +649,7 @@ class Player(pygame.sprite.Sprite, AnimatedMachine):
         # Wenn ja (oder wenn der Spieler springt oder Collision-Detection im Debug-Modus aus ist): bewegen.
         # Sonst: Spieler verliert Energie oder die Player-Maschine wird zerstört
         # (abhängig davon, ob der Track aktive Guard Rails hat).
-        if self.current_race.is_on_track(frame_lookahead_collision_rect) or self.jumping or COLLISION_DETECTION_OFF:
+        if self.current_race.is_on_track(frame_lookahead_collision_rect, "centrifugal") or self.jumping or COLLISION_DETECTION_OFF:
             self.position[0] = next_frame_position_x
             self.position[1] = next_frame_position_y
         else:
@@ -700,7 +704,7 @@ class Player(pygame.sprite.Sprite, AnimatedMachine):
                 PLAYER_COLLISION_RECT_WIDTH,
                 PLAYER_COLLISION_RECT_HEIGHT
             )
-            if not self.current_race.is_on_track(current_collision_rect):
+            if not self.current_race.is_on_track(current_collision_rect, "landing"):
                 print("Spieler außerhalb der Grenzen!")
                 self.destroy()
 
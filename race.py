@@ -5,11 +5,19 @@
 # - die Anzahl der Runden, die erforderlich sind, um das Rennen zu gewinnen
 # - den Modus des Rennens (Grand-Prix, Zeitangriff, ...)
 # - den Dateipfad des Musiktitels, der während des Rennens abgespielt werden soll
+
+from track import SURFACE_FINISH_LINE
+from settings.track_settings import TrackCreator, TRACK_SURFACE_RASTER
+
 class Race:
     def __init__(self, race_track_creator, floor_tex_path, bg_tex_path, required_laps, 
             init_player_pos_x, init_player_pos_y, init_player_angle, is_foggy, race_mode, music_track_path):
         # Kollisionskarte für gefahrene Strecke mit der übergebenen Funktion erstellen
         self.race_track = race_track_creator()
+
+        # Attribut-Raster für die Abfrage der Oberfläche unter dem Spieler (siehe TRACK_SURFACE_RASTER)
+        if TRACK_SURFACE_RASTER:
+            TrackCreator.attach_surface_raster(self.race_track)
         
         # Umgebungstexturen
         self.floor_texture_path = floor_tex_path
@@ -58,15 +66,18 @@ class Race:
     # Parameter:
     # player_coll - Kollisionsrechteck des Spielers
     # current_time - Aktueller Zeitstempel (wird benötigt, um den Rennstart-Zeitstempel zu setzen)
+    # surface - Ergebnis von query_surface für player_coll, falls schon abgefragt (None = hier abfragen)
     #
     # Rückgabewert: True wenn das Rennen in diesem Frame gestartet wurde, sonst False
-    def update_lap_count(self, player_coll, current_time):
-        self.race_track.update_key_checkpoints(player_coll)
+    def update_lap_count(self, player_coll, current_time, surface = None):
+        if surface is None:
+            surface = self.race_track.query_surface(player_coll)
+        self.race_track.update_key_checkpoints_from_surface(surface)
 
         race_just_started = False
 
         # Wenn Spieler die Ziellinie überquert hat
-        if self.race_track.is_on_finish_line(player_coll):
+        if surface & SURFACE_FINISH_LINE:
             # Rennen beim ersten Ziellinienkontakt starten
             if not self.race_started:
                 self.race_started = True
@@ -103,23 +114,27 @@ class Race:
         self.lap_times = []
         self.last_lap_timestamp = None
         self.race_track.reset_key_checkpoints()
+        self.race_track.reset_hit_cache_stats()
 
     # ------------- Verfügbarmachung der RaceTrack-API ---------------------
 
-    def is_on_track(self, other):
-        return self.race_track.is_on_track(other)
+    def query_surface(self, other):
+        return self.race_track.query_surface(other)
+
+    def is_on_track(self, other, site = None):
+        return self.race_track.is_on_track(other, site)
 
-    def is_on_dash_plate(self, other):
-        return self.race_track.is_on_dash_plate(other)
+    def is_on_dash_plate(self, other, site = None):
+        return self.race_track.is_on_dash_plate(other, site)
 
-    def is_on_recovery_zone(self, other):
-        return self.race_track.is_on_recovery_zone(other)
+    def is_on_recovery_zone(self, other, site = None):
+        return self.race_track.is_on_recovery_zone(other, site)
     
-    def is_on_ramp(self, other):
-        return self.race_track.is_on_ramp(other)
+    def is_on_ramp(self, other, site = None):
+        return self.race_track.is_on_ramp(other, site)
 
-    def is_on_dirt(self, other):
-        return self.race_track.is_on_dirt(other)
+    def is_on_dirt(self, other, site = None):
+        return self.race_track.is_on_dirt(other, site)
 
     def guard_rails_active(self):
         return self.race_track.guard_rails_active()
@@ -0,0 +1,115 @@
+# Abstimmung der Threads, mit denen die parallelen Mode-7-Kernel rechnen.
+# Ohne Vorgabe verteilt numba jede prange-Schleife auf alle Kerne. Laufen auf dem Rechner noch andere Dinge
+# (Audio, weitere Spielinstanzen, Aufnahme), konkurrieren die Threads um die Kerne und es kommt zu Ausreißern
+# bei der Frame-Zeit. Deshalb lassen sich Thread-Anzahl und Chunk-Größe einstellen (siehe RENDER_THREADS
+# in den Renderer-Einstellungen) oder mit renderer_benchmark.py --tune messen (siehe Mode7.tune_render_config).
+# Das Ergebnis wird pro Rechner und Renderer-Konfiguration in einer JSON-Datei gespeichert.
+#
+# Eine Konfiguration ist ein Tupel (Threads, Chunk-Größe), jeweils 0 = Vorgabe von numba.
+# numba verwaltet beides pro Thread, sie muss also in dem Thread gesetzt werden, der die Kernel aufruft
+# (Haupt-Thread bzw. Render-Thread beim asynchronen Rendern, siehe ensure_render_config).
+
+import json
+import os
+import platform
+import threading
+import time
+
+import numba
+import numpy
+
+# Konfiguration mit den Vorgaben von numba
+DEFAULT_RENDER_CONFIG = (0, 0)
+
+# Messungen, die höchstens so viel langsamer sind als die beste, gelten als gleich gut.
+# Unter gleich guten gewinnt die mit den wenigsten Threads (lässt Kerne für andere Programme frei).
+TUNING_TOLERANCE = 0.05
+
+# Anteil der Frames, deren Zeit bei der Messung höchstens erreicht wird (Perzentil).
+# Bewertet wird nicht der Durchschnitt, sondern die langsamen Frames, da es um Ausreißer geht.
+TUNING_PERCENTILE = 90
+
+# Konfiguration, die im jeweiligen Thread zuletzt gesetzt wurde (siehe ensure_render_config)
+applied_config = threading.local()
+
+# Setzt Thread-Anzahl und Chunk-Größe für die parallelen Kernel, die der aktuelle Thread aufruft.
+# Mehr Threads als numba gestartet hat (NUMBA_NUM_THREADS) gibt es nicht, größere Werte werden begrenzt.
+def apply_render_config(config):
+    threads, chunk_size = config
+    numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS) if threads else numba.config.NUMBA_NUM_THREADS)
+    numba.set_parallel_chunksize(chunk_size)
+
+# Wie apply_render_config, aber nur, wenn im aktuellen Thread noch eine andere Konfiguration gilt.
+# Kostet pro Frame fast nichts, anders als das Setzen selbst.
+def ensure_render_config(config):
+    if getattr(applied_config, "config", None) != config:
+        apply_render_config(config)
+        applied_config.config = config
+
+# Thread-Anzahlen, die gemessen werden: Zweierpotenzen bis zur Anzahl der Threads von numba und diese selbst
+def thread_count_candidates(max_threads):
+    counts = []
+    threads = 1
+    while threads < max_threads:
+        counts.append(threads)
+        threads *= 2
+    return counts + [max_threads]
+
+# Misst alle Kombinationen aus Thread-Anzahl und Chunk-Größe.
+# render_frame(k) rendert den k-ten Mess-Frame (verschiedene Kamera-Posen), frames ist die Anzahl der Frames pro Kombination.
+# Die Konfiguration wird im aufrufenden Thread gesetzt und danach auf die Vorgabe von numba zurückgesetzt.
+#
+# Rückgabe: (beste Konfiguration, Liste aus (Konfiguration, Frame-Zeit im Perzentil in ms))
+def auto_tune(render_frame, thread_counts, chunk_sizes, frames):
+    results = []
+    for threads in thread_counts:
+        for chunk_size in chunk_sizes:
+            config = (threads, chunk_size)
+            apply_render_config(config)
+            # Erster Frame mit neuer Thread-Anzahl zählt nicht (Threads müssen erst wieder anlaufen)
+            render_frame(0)
+            frame_times = []
+            for k in range(frames):
+                start = time.perf_counter()
+                render_frame(k)
+                frame_times.append((time.perf_counter() - start) * 1000)
+            results.append((config, float(numpy.percentile(frame_times, TUNING_PERCENTILE))))
+    apply_render_config(DEFAULT_RENDER_CONFIG)
+    applied_config.config = DEFAULT_RENDER_CONFIG
+
+    fastest = min(ms for _, ms in results)
+    best = min((config for config, ms in results if ms <= fastest * (1 + TUNING_TOLERANCE)), key = lambda config: config[0])
+    return best, results
+
+# Schlüssel des Rechners in der Datei mit den gemessenen Konfigurationen.
+# Liegt die Datei z.B. in einem geteilten Home-Verzeichnis, bekommt jeder Rechner einen eigenen Eintrag.
+def machine_key():
+    return f"{platform.node()}-{os.cpu_count()}cpu-{numba.config.NUMBA_NUM_THREADS}threads"
+
+# Gespeicherte Konfiguration für den Rechner und den übergebenen Schlüssel der Renderer-Konfiguration, sonst None
+def load_render_config(path, key):
+    try:
+        with open(path, "r", encoding = "utf-8") as f:
+            entry = json.load(f).get(machine_key(), {}).get(key)
+    except (OSError, ValueError):
+        return None
+    if entry is None:
+        return None
+    return entry["threads"], entry["chunk_size"]
+
+# Speichert die gemessene Konfiguration samt aller Messwerte (für die Nachvollziehbarkeit) für diesen Rechner.
+def save_render_config(path, key, config, results):
+    try:
+        with open(path, "r", encoding = "utf-8") as f:
+            machines = json.load(f)
+    except (OSError, ValueError):
+        machines = {}
+
+    machines.setdefault(machine_key(), {})[key] = {
+        "threads": config[0],
+        "chunk_size": config[1],
+        "results": [{"threads": threads, "chunk_size": chunk_size, "ms": round(ms, 3)} for (threads, chunk_size), ms in results],
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok = True)
+    with open(path, "w", encoding = "utf-8") as f:
+        json.dump(machines, f, indent = 2)
@@ -0,0 +1,278 @@
+"""
+Renderer-Benchmark - Misst die Frame-Zeit des Mode-7-Renderers ohne Spiel-Logik
+
+Rendert eine Strecke aus mehreren Kamerawinkeln rund um die Startposition
+und gibt die durchschnittliche Zeit pro Frame für jeden gewählten Kernel, jedes Pixelformat
+und jede Art der Bodentextur (direkte Farben oder palettenindiziert, jeweils mit oder ohne Mipmaps,
+linear oder gekachelt im Speicher) aus, dazu die Spanne der Frame-Zeit über die Blickrichtungen,
+optional auch für feste oder verringerte interne Auflösungen (siehe Mode7.set_render_scale)
+und mit variabler Shading-Rate (inklusive Pixelanzahl pro Band, siehe Mode7.shading_report)
+oder Interlacing des Bodens (siehe Mode7.set_interlaced) bzw. asynchronem Rendern im Render-Thread
+(siehe ASYNC_FLOOR_RENDERING, mit --logic-ms lässt sich die Arbeit des Haupt-Threads simulieren, mit der es sich überlappt)
+(inklusive Übertragen des Frames auf die Display-Surface, d.h. Mode7.draw).
+Zusätzlich wird jede Variante gegen die erste verglichen (maximale Farbabweichung
+und Anteil abweichender Pixel), damit neue Kernel-Varianten nicht unbemerkt anders aussehen.
+Mit --golden wird jede Variante des Festkomma-Kernels ("fixed") mit dem Gleitkomma-Kernel "rows"
+in sonst gleicher Konfiguration verglichen (Golden Image), bei zu großer Abweichung endet das Skript mit Exit-Code 1.
+Mit --tune werden vorher Thread-Anzahl und Chunk-Größe der Kernel für diesen Rechner neu abgestimmt und gespeichert
+(siehe RENDER_THREADS), die Varianten laufen dann mit dem Ergebnis.
+
+Aufruf:
+- python renderer_benchmark.py
+- python renderer_benchmark.py --race 2 --frames 200 --kernels columns rows --pixel-formats rgb packed
+- python renderer_benchmark.py --floor-formats direct indexed
+- python renderer_benchmark.py --kernels rows --pixel-formats packed --mipmaps off on
+- python renderer_benchmark.py --layouts linear tiled
+- python renderer_benchmark.py --kernels rows --pixel-formats packed --render-scales 1.0 0.75 0.5
+- python renderer_benchmark.py --internal-resolutions window 400x225 320x180
+- python renderer_benchmark.py --shading full bands
+- python renderer_benchmark.py --interlace off on blend
+- python renderer_benchmark.py --async off on --logic-ms 5
+- python renderer_benchmark.py --kernels columns rows --pixel-formats packed --tune
+- python renderer_benchmark.py --kernels fixed --floor-formats direct indexed --mipmaps off on --golden
+
+Ohne Fenster (z.B. auf Servern) wird automatisch der Dummy-Videotreiber von SDL verwendet.
+"""
+
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+# Muss vor dem Import von pygame gesetzt sein
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy
+import pygame
+
+from settings.renderer_settings import WIN_RES, RENDER_SCALE, RENDER_KERNELS, FLOOR_SHADING_BANDS, \
+    ASYNC_RENDER_LATENCY_BUDGET_MS
+from settings.league_settings import SINGLE_MODE_RACES
+from mode7 import Mode7
+
+# Anzahl der Kamerawinkel, die gleichmäßig über eine volle Umdrehung verteilt werden
+NUM_HEADINGS = 16
+
+# Erstellt eine Kamera-Attrappe, die alles enthält, was Mode7.update braucht.
+def make_camera(x, y, angle, speed_factor = 0.5):
+    machine = SimpleNamespace(max_speed = 1.0)
+    player = SimpleNamespace(current_speed = speed_factor, machine = machine)
+    return SimpleNamespace(position = numpy.array([x, y]), angle = angle, tracked_player = player)
+
+# Pixelformate des Renderers (siehe PACKED_PIXELS in den Renderer-Einstellungen)
+PIXEL_FORMATS = {"rgb": False, "packed": True}
+
+# Arten der Bodentextur (siehe INDEXED_FLOOR in den Renderer-Einstellungen)
+FLOOR_FORMATS = {"direct": False, "indexed": True}
+
+# Bodentextur ohne bzw. mit Mipmaps (siehe FLOOR_MIPMAPS in den Renderer-Einstellungen)
+MIPMAP_MODES = {"off": False, "on": True}
+
+# Anordnung der Bodentextur im Speicher (siehe TILED_FLOOR in den Renderer-Einstellungen)
+TEXTURE_LAYOUTS = {"linear": False, "tiled": True}
+
+# Volle Shading-Rate bzw. Bänder mit verringerter Rate (siehe FLOOR_SHADING_BANDS in den Renderer-Einstellungen)
+SHADING_MODES = {"full": None, "bands": FLOOR_SHADING_BANDS}
+
+# Interlacing des Bodens als (interlaced, interlace_blend) (siehe INTERLACED_FLOOR in den Renderer-Einstellungen)
+INTERLACE_MODES = {"off": (False, False), "on": (True, False), "blend": (True, True)}
+
+# Boden im Haupt-Thread bzw. im Render-Thread (siehe ASYNC_FLOOR_RENDERING in den Renderer-Einstellungen)
+ASYNC_MODES = {"off": False, "on": True}
+
+# Anteil der Pixel, die beim Golden-Image-Vergleich (--golden) höchstens abweichen dürfen.
+# Der Festkomma-Kernel rundet die Schrittweite pro Spalte auf 16 Nachkommabits, Pixel direkt an einer Texelgrenze
+# können deshalb das Nachbartexel zeigen (typisch etwa 0,01% der Pixel). Mehr deutet auf einen Fehler hin.
+GOLDEN_MAX_DIFF_RATIO = 0.001
+
+# Gibt pro Shading-Band aus, wie viele der Bodenpixel tatsächlich berechnet werden.
+def print_shading_report(mode7):
+    report = mode7.shading_report()
+    for band in report:
+        print(f"{'':>30}Zeilen {band['rows'][0]:>4}-{band['rows'][1]:<4} Rate 1/{band['rate']}: "
+            f"{band['shaded_pixels']:>7} von {band['pixels']:>7} Pixeln berechnet")
+    shaded = sum(band["shaded_pixels"] for band in report)
+    pixels = sum(band["pixels"] for band in report)
+    print(f"{'':>30}Gesamt: {shaded} von {pixels} Bodenpixeln ({shaded / pixels * 100:.1f}%)")
+
+# Wandelt die Angabe einer internen Auflösung ("window" oder "BREITExHÖHE") in den Wert für Mode7 um.
+def parse_resolution(text):
+    if text == "window":
+        return None
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+# Rendert einen Frame pro Kamera und gibt die Frames (als RGB-Kopie der Display-Surface) zurück.
+def render_frames(mode7, cameras):
+    frames = []
+    for camera in cameras:
+        mode7.update(camera)
+        mode7.draw()
+        frames.append(pygame.surfarray.array3d(mode7.app.screen))
+    return frames
+
+# Vergleicht zwei gleich lange Folgen von Frames.
+# Rückgabe: (maximale Farbabweichung, durchschnittlicher Anteil abweichender Pixel)
+def compare_frames(frames, reference_frames):
+    max_diff = max(int(numpy.abs(f.astype(int) - r.astype(int)).max()) for f, r in zip(frames, reference_frames))
+    diff_ratio = numpy.mean([numpy.any(f != r, axis = 2).mean() for f, r in zip(frames, reference_frames)])
+    return max_diff, diff_ratio
+
+# Hält den Haupt-Thread für die übergebene Zeit beschäftigt, mit GIL wie Spiel-Logik, Sprites und HUD in Python.
+def busy_wait(ms):
+    end = time.perf_counter() + ms / 1000
+    while time.perf_counter() < end:
+        pass
+
+# Misst die durchschnittliche Frame-Zeit (in ms) über alle Kameras.
+# logic_ms ist die simulierte Arbeit des Haupt-Threads zwischen Mode7.update und Mode7.draw (siehe busy_wait).
+#
+# Rückgabe: (Mittelwert, Standardabweichung, mittlere Frame-Zeit pro Kamera)
+def measure(mode7, cameras, frames, logic_ms = 0.0):
+    # Erste Aufrufe kompilieren den Kernel (beim Interlacing im zweiten Frame auch das Überblenden), zählen also nicht
+    mode7.update(cameras[0])
+    mode7.update(cameras[0])
+
+    frame_times = []
+    for k in range(frames):
+        start = time.perf_counter()
+        mode7.update(cameras[k % len(cameras)])
+        busy_wait(logic_ms)
+        mode7.draw()
+        frame_times.append((time.perf_counter() - start) * 1000)
+    heading_times = [numpy.mean(frame_times[k::len(cameras)]) for k in range(min(len(cameras), frames))]
+    return numpy.mean(frame_times), numpy.std(frame_times), heading_times
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark für den Mode-7-Renderer")
+    parser.add_argument("--race", type = int, default = 0, help = "Index des Rennens in SINGLE_MODE_RACES")
+    parser.add_argument("--frames", type = int, default = 100, help = "Anzahl gemessener Frames pro Kernel")
+    parser.add_argument("--kernels", nargs = "+", default = list(RENDER_KERNELS), choices = RENDER_KERNELS)
+    parser.add_argument("--pixel-formats", nargs = "+", default = list(PIXEL_FORMATS), choices = list(PIXEL_FORMATS))
+    parser.add_argument("--floor-formats", nargs = "+", default = ["direct"], choices = list(FLOOR_FORMATS))
+    parser.add_argument("--mipmaps", nargs = "+", default = ["off"], choices = list(MIPMAP_MODES))
+    parser.add_argument("--layouts", nargs = "+", default = ["linear"], choices = list(TEXTURE_LAYOUTS),
+        help = "Anordnung der Bodentextur im Speicher (gekachelt: Frame-Zeit unabhängiger von der Blickrichtung)")
+    parser.add_argument("--render-scales", nargs = "+", type = float, default = [1.0],
+        help = "Interne Auflösungen relativ zum Fenster bzw. zur festen internen Auflösung (1.0 = unverändert)")
+    parser.add_argument("--internal-resolutions", nargs = "+", default = ["window"],
+        help = "Feste interne Auflösungen für Boden und Himmel, 'window' oder BREITExHÖHE (z.B. 400x225)")
+    parser.add_argument("--shading", nargs = "+", default = ["full"], choices = list(SHADING_MODES))
+    parser.add_argument("--interlace", nargs = "+", default = ["off"], choices = list(INTERLACE_MODES),
+        help = "Interlacing des Bodens (die Bilder weichen dann ab, da die Kamera jeden Frame wechselt)")
+    parser.add_argument("--async", dest = "async_modes", nargs = "+", default = ["off"], choices = list(ASYNC_MODES),
+        help = "Boden im Render-Thread rendern (für den Bildvergleich wird dabei immer auf den aktuellen Frame gewartet)")
+    parser.add_argument("--logic-ms", type = float, default = 0.0,
+        help = "Simulierte Arbeit des Haupt-Threads pro Frame in ms (Spiel-Logik, Sprites, HUD)")
+    parser.add_argument("--latency-budget-ms", type = float, default = ASYNC_RENDER_LATENCY_BUDGET_MS,
+        help = "Latenzbudget beim asynchronen Rendern (siehe ASYNC_RENDER_LATENCY_BUDGET_MS)")
+    parser.add_argument("--static-camera", action = "store_true",
+        help = "Zusätzlich die Frame-Zeit bei ruhender Kamera messen (Frame wird wiederverwendet, siehe STATIC_FRAME_REUSE)")
+    parser.add_argument("--tune", action = "store_true",
+        help = "Threads und Chunk-Größe der Kernel für diesen Rechner neu abstimmen und speichern (siehe RENDER_THREADS)")
+    parser.add_argument("--golden", action = "store_true",
+        help = "Festkomma-Kernel mit dem Gleitkomma-Kernel 'rows' vergleichen (Exit-Code 1 bei zu großer Abweichung)")
+    args = parser.parse_args()
+
+    pygame.init()
+    app = SimpleNamespace(screen = pygame.display.set_mode(WIN_RES))
+
+    race = SINGLE_MODE_RACES[args.race]
+    cameras = [
+        make_camera(race.init_player_pos_x, race.init_player_pos_y, race.init_player_angle + 2 * numpy.pi * k / NUM_HEADINGS)
+        for k in range(NUM_HEADINGS)
+    ]
+
+    print(f"Strecke: {race.race_track.name} ({race.floor_texture_path})")
+    print(f"Auflösung: {WIN_RES[0]}x{WIN_RES[1]} (RENDER_SCALE = {RENDER_SCALE})")
+
+    # Alle Kombinationen aus interner Auflösung, asynchronem Rendern, Interlacing, Shading, Kernel, Pixelformat,
+    # Art und Anordnung der Bodentextur und Mipmaps
+    variants = [
+        (kernel, pixel_format, floor_format, layout, mipmaps, parse_resolution(resolution), render_scale, shading, interlace,
+            async_mode)
+        for resolution in args.internal_resolutions for render_scale in args.render_scales for async_mode in args.async_modes
+        for interlace in args.interlace for shading in args.shading for mipmaps in args.mipmaps for floor_format in args.floor_formats
+        for layout in args.layouts for kernel in args.kernels for pixel_format in args.pixel_formats
+    ]
+
+    # Threads abstimmen, einmal pro Kombination aus Kernel, Pixelformat, Art und Anordnung der Bodentextur
+    if args.tune:
+        for kernel, pixel_format, floor_format, layout in dict.fromkeys(variant[:4] for variant in variants):
+            best, results = Mode7.tune_render_config(kernel, PIXEL_FORMATS[pixel_format], FLOOR_FORMATS[floor_format],
+                TEXTURE_LAYOUTS[layout])
+            print(f"Abstimmung {kernel}/{pixel_format}/{floor_format}/{layout}: {best[0]} Threads, "
+                f"Chunk-Größe {best[1] or 'automatisch'}")
+            for (threads, chunk_size), ms in results:
+                print(f"{'':>30}{threads:>3} Threads, Chunk-Größe {chunk_size:>3}: {ms:7.2f} ms/Frame")
+
+    reference_frames = None
+    golden_failures = []
+    for kernel, pixel_format, floor_format, layout, mipmaps, resolution, render_scale, shading, interlace, async_mode in variants:
+        interlaced, interlace_blend = INTERLACE_MODES[interlace]
+
+        # Renderer der Variante, für den Golden-Image-Vergleich auch mit anderem Kernel
+        def create_renderer(kernel):
+            return Mode7(app, race.floor_texture_path, race.bg_texture_path, race.is_foggy,
+                kernel = kernel, packed_pixels = PIXEL_FORMATS[pixel_format], indexed_floor = FLOOR_FORMATS[floor_format],
+                mipmapped_floor = MIPMAP_MODES[mipmaps], tiled_floor = TEXTURE_LAYOUTS[layout], render_resolution = resolution, render_scale = render_scale,
+                shading_bands = SHADING_MODES[shading], interlaced = interlaced, interlace_blend = interlace_blend,
+                async_render = ASYNC_MODES[async_mode], latency_budget_ms = args.latency_budget_ms)
+
+        mode7 = create_renderer(kernel)
+
+        name = f"{kernel}/{pixel_format}/{floor_format}" + ("/mip" if MIPMAP_MODES[mipmaps] else "")
+        if TEXTURE_LAYOUTS[layout]:
+            name += "/tiled"
+        if SHADING_MODES[shading]:
+            name += "/vrs"
+        if interlaced:
+            name += "/interlaced-blend" if interlace_blend else "/interlaced"
+        if ASYNC_MODES[async_mode]:
+            name += "/async"
+        if resolution is not None or render_scale != 1.0:
+            name += f"@{mode7.render_width}x{mode7.render_height}"
+        mean_ms, std_ms, heading_times = measure(mode7, cameras, args.frames, args.logic_ms)
+        line = (f"{name:>28}: {mean_ms:7.2f} ms/Frame (± {std_ms:.2f}), {1000 / mean_ms:6.1f} FPS, "
+            f"Blickrichtungen {min(heading_times):.2f}-{max(heading_times):.2f} ms")
+
+        # Asynchron: Anteil der Frames, die den Boden des aktuellen Frames zeigen (sonst den des vorigen)
+        if ASYNC_MODES[async_mode]:
+            stats = mode7.async_stats()
+            line += f" | aktueller Boden: {stats['on_time'] / (stats['on_time'] + stats['late']) * 100:.0f}%"
+            mode7.latency_budget_ms = None
+
+        # Ruhende Kamera: immer die gleiche Pose, ab dem zweiten Frame wird der gespeicherte Frame angezeigt
+        if args.static_camera:
+            static_ms, _, _ = measure(mode7, cameras[:1], args.frames, args.logic_ms)
+            line += f" | ruhende Kamera: {static_ms:.3f} ms/Frame"
+
+        # Bildvergleich mit der ersten Variante der Liste
+        frames = render_frames(mode7, cameras)
+        if reference_frames is None:
+            reference_frames = frames
+        else:
+            max_diff, diff_ratio = compare_frames(frames, reference_frames)
+            line += f" | max. Abweichung: {max_diff}, abweichende Pixel: {diff_ratio * 100:.2f}%"
+
+        print(line)
+
+        # Golden Image: gleiche Konfiguration mit dem Gleitkomma-Kernel
+        if args.golden and kernel == "fixed":
+            _, diff_ratio = compare_frames(frames, render_frames(create_renderer("rows"), cameras))
+            passed = diff_ratio <= GOLDEN_MAX_DIFF_RATIO
+            print(f"{'':>30}Golden Image (rows): {diff_ratio * 100:.3f}% abweichende Pixel "
+                f"(erlaubt {GOLDEN_MAX_DIFF_RATIO * 100:.1f}%) {'OK' if passed else 'FEHLER'}")
+            if not passed:
+                golden_failures.append(name)
+
+        if SHADING_MODES[shading]:
+            print_shading_report(mode7)
+
+    if golden_failures:
+        print(f"Golden-Image-Vergleich fehlgeschlagen: {', '.join(golden_failures)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
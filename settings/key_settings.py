@@ -10,4 +10,5 @@ STD_LEFT_KEY = pygame.K_LEFT # Pfeil links = lenken
 STD_RIGHT_KEY = pygame.K_RIGHT # Pfeil rechts = lenken
 
 STD_CONFIRM_KEY = pygame.K_SPACE # Space zum Bestätigen in Menüs
-STD_DEBUG_RESTART_KEY = pygame.K_r # standard key to restart a race in debug mode
\ No newline at end of file
+STD_DEBUG_RESTART_KEY = pygame.K_r # standard key to restart a race in debug mode
+STD_INTERLACE_TOGGLE_KEY = pygame.K_i # standard key to toggle interlaced floor rendering during a race
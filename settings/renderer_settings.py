@@ -37,9 +37,137 @@ NORMAL_ON_SCREEN_PLAYER_POSITION_Y = int(BASE_PLAYER_POSITION_Y * RENDER_SCALE)
 # Scale-Faktor für die Höhe der Stage (z-Achse im virtuellen Koordinatensystem der Umgebung)
 SCALE = 20
 
+# Kachel der (unendlich gekachelten) Bodentextur, in der die Strecken liegen, pro Texturachse.
+# Entspricht der Umrechnung im Map Editor: Welt-y liegt in [-Texturbreite / SCALE, 0),
+# Welt-x in [0, Texturhöhe / SCALE). Innerhalb dieser Kachel ist die Abbildung Welt -> Textur
+# exakt die gleiche wie ohne Auffüllen auf Zweierpotenzen.
+FLOOR_TEXTURE_ORIGIN_TILE = (-1, 0)
+
+# Großes Vielfaches jeder Texturgröße (Zweierpotenz), das auf alle Texturkoordinaten addiert wird,
+# damit sie positiv sind und per Bitmaske umgebrochen werden können
+TEXTURE_WRAP_BIAS = 1 << 26
+
 # Wie dicht der Fog in nebligen Szenen ist
 FOG_DENSITY = 100
 
 # Wie schnell sich der Background bewegt, wenn der Player rotiert
 BACKGROUND_ROTATION_SPEED = 120
 
+# Kernel, mit dem der Mode-7-Renderer einen Frame berechnet.
+# "columns": parallel über Bildschirmspalten, jedes Pixel wird direkt aus den Zeilentabellen berechnet
+# "rows": parallel über Bildschirmzeilen, Texturkoordinaten werden pro Pixel nur weitergezählt (DDA)
+# "fixed": wie "rows", aber die Texturkoordinaten werden in 16.16-Festkomma weitergezählt (nur Ganzzahl-Operationen pro Pixel)
+RENDER_KERNELS = ("columns", "rows", "fixed")
+RENDER_KERNEL = "columns"
+
+# Ob der Mode-7-Renderer mit gepackten 32-Bit-Pixeln arbeitet.
+# True: Texturen als ein 32-Bit-Wert pro Pixel, der Kernel schreibt direkt in die Display-Surface
+# False: Texturen und Frame als RGB-Arrays, der Frame wird in jedem Frame auf das Display kopiert
+PACKED_PIXELS = False
+
+# Ob der Boden als palettenindizierte 8-Bit-Textur gerendert wird.
+# Die Bodentextur wird dann auf höchstens PALETTE_SIZE Farben reduziert (die meisten Strecken haben ohnehin weniger),
+# pro Texel liest der Kernel nur ein Byte und schlägt die Farbe in einer Palette pro Bildschirmzeile nach,
+# in der Dämpfung und Nebel schon eingerechnet sind.
+INDEXED_FLOOR = False
+PALETTE_SIZE = 256
+
+# Ob die Bodentextur mit Mipmaps gerendert wird.
+# Zeilen nahe am Horizont, die pro Bildschirmpixel mehrere Texel überspringen,
+# lesen dann aus einer verkleinerten Stufe (weniger Flimmern, kleinere Speicherbereiche).
+# FLOOR_MIP_LEVELS ist die maximale Anzahl der Stufen inklusive der Originaltextur.
+FLOOR_MIPMAPS = False
+FLOOR_MIP_LEVELS = 6
+
+# Ob die Bodentextur gekachelt im Speicher liegt (Kacheln aus 8x8 Texeln hintereinander statt Spalte für Spalte).
+# Ohne Kacheln liegen die Texel, die eine Bildschirmzeile nacheinander liest, je nach Blickrichtung direkt
+# nebeneinander oder eine ganze Texturspalte auseinander (ein Cache-Zugriff pro Pixel), die Frame-Zeit hängt
+# dann stark von der Blickrichtung ab. Mit Kacheln liegen Nachbartexel in jeder Richtung nah beieinander.
+TILED_FLOOR = False
+
+# Verzeichnis, in dem numba die kompilierten Mode-7-Kernel zwischenspeichert
+# (pro Kombination von Renderer-Einstellungen ein Unterverzeichnis, siehe mode7.py)
+RENDER_CACHE_DIR = ".numba_cache"
+
+# Speichergrenze (in MB) des prozessweiten Caches für vorbereitete Mode-7-Texturen (siehe texture_cache.py).
+# Eine auf 4096x4096 aufgefüllte Bodentextur belegt mit gepackten Pixeln 64 MB.
+TEXTURE_CACHE_BUDGET_MB = 256
+
+# Ob Mode7 vorgebackene Texturen (siehe bake_textures.py) verwendet, sofern vorhanden und aktuell.
+# Ohne passende vorgebackene Textur wird wie bisher die PNG-Datei geladen.
+USE_BAKED_TEXTURES = True
+
+# Verzeichnis der vorgebackenen Texturen
+BAKED_TEXTURE_DIR = "gfx/baked"
+
+# Variable Shading-Rate für den Boden: In Bändern von Bodenzeilen wird nur jede zweite bzw. vierte Spalte berechnet
+# und in die Nachbarspalten übernommen. FLOOR_SHADING_BANDS ist eine Tabelle aus (Beginn, Rate)-Paaren,
+# der Beginn ist der Anteil der Bodenzeilen unter dem Horizont (0.0 = Horizont, 1.0 = unterer Bildrand),
+# ab dem das Band gilt. Zeilen vor dem ersten Band werden voll berechnet.
+# Geeignet sind die Zeilen direkt unter dem Horizont (stark gestaucht, gedämpft bzw. im Nebel)
+# und die Zeilen am unteren Bildrand (stark vergrößert, Nachbarpixel liegen ohnehin im selben Texel).
+VARIABLE_RATE_SHADING = False
+SHADING_RATES = (1, 2, 4)
+FLOOR_SHADING_BANDS = ((0.0, 2), (0.1, 1), (0.6, 2), (0.85, 4))
+
+# Feste interne Auflösung (Breite, Höhe), in der Boden und Himmel gerendert werden, unabhängig von der Fenstergröße.
+# Der Frame wird per Nearest-Neighbour auf das Fenster hochskaliert, Sprites, HUD und Mini-Map bleiben in Fensterauflösung.
+# None = Fensterauflösung. Z.B. (BASE_WIDTH, BASE_HEIGHT) für die Auflösung des Original-Designs;
+# ganzzahlige Teiler der Fensterauflösung, z.B. (WIDTH // 2, HEIGHT // 2), ergeben gleich große Pixelblöcke.
+INTERNAL_RESOLUTION = None
+
+# Dynamische Auflösung: Der Boden wird in einer kleineren internen Auflösung gerendert und auf das Fenster hochskaliert,
+# sobald die Frame-Zeit das Budget von TARGET_FPS überschreitet (siehe dynamic_resolution.py).
+# Mit INTERNAL_RESOLUTION wird relativ zur festen internen Auflösung skaliert.
+# Himmel, Sprites und HUD bleiben in Fensterauflösung.
+# DYNAMIC_RESOLUTION_MIN_SCALE: kleinster Faktor relativ zur Fensterauflösung
+# DYNAMIC_RESOLUTION_STEP: Schrittweite pro Anpassung
+# DYNAMIC_RESOLUTION_HEADROOM: Anteil des Budgets, unter dem die Auflösung wieder erhöht wird
+# DYNAMIC_RESOLUTION_COOLDOWN: Frames zwischen zwei Anpassungen
+DYNAMIC_RESOLUTION = False
+DYNAMIC_RESOLUTION_MIN_SCALE = 0.5
+DYNAMIC_RESOLUTION_STEP = 0.1
+DYNAMIC_RESOLUTION_HEADROOM = 0.7
+DYNAMIC_RESOLUTION_COOLDOWN = 30
+
+# Interlacing des Bodens: In jedem Frame werden nur die geraden bzw. ungeraden Bodenzeilen (ein Halbbild)
+# mit der aktuellen Kamera neu berechnet, die anderen bleiben aus dem vorigen Frame stehen.
+# Halbiert den Aufwand für den Boden (für schwache CPUs bei TARGET_FPS), Spiel-Logik und Eingaben laufen
+# weiter mit voller Framerate. Lässt sich während des Rennens per Taste umschalten (siehe STD_INTERLACE_TOGGLE_KEY).
+# INTERLACE_BLEND: Zeilen des vorigen Halbbilds werden mit der darüberliegenden neuen Zeile überblendet
+# (weniger Kammartefakte in Kurven, dafür etwas unschärfer).
+INTERLACED_FLOOR = False
+INTERLACE_BLEND = False
+
+# Asynchrones Rendern des Bodens: Der Kernel berechnet den Boden in einem eigenen Thread (die Kernel geben dabei
+# das GIL frei), während der Haupt-Thread Spiel-Logik, Sprites und HUD erledigt und den vorigen Frame anzeigt.
+# Der Boden wird abwechselnd in zwei Puffer gerendert (Double Buffering), angezeigt wird immer ein fertiger Puffer.
+# Bringt nur auf Rechnern mit mehreren Kernen etwas.
+# ASYNC_RENDER_LATENCY_BUDGET_MS: wie lange Mode7.draw höchstens auf den Boden des aktuellen Frames wartet.
+# Ist er bis dahin nicht fertig, wird der Boden des vorigen Frames angezeigt, d.h. der Boden liegt dann
+# einen Frame hinter Sprites und HUD zurück (mehr Latenz gibt es nie). 0 = nie warten (größte Überlappung),
+# None = immer warten (keine zusätzliche Latenz, überlappt wird nur mit der Spiel-Logik nach Mode7.update).
+ASYNC_FLOOR_RENDERING = False
+ASYNC_RENDER_LATENCY_BUDGET_MS = 4.0
+
+# Ruhende Kamera (Startaufstellung, Game-Over- und Zielbildschirme): Ändern sich Position, Winkel, Brennweite
+# und Verschiebung des Himmels nicht, zeigt Mode7 den zuletzt gerenderten Frame erneut an, statt ihn neu zu berechnen.
+# Das Bild ist dasselbe, die CPU-Last des Renderers sinkt dann auf eine Kopie pro Frame.
+STATIC_FRAME_REUSE = True
+
+# Threads für die parallelen Mode-7-Kernel (siehe render_tuning.py).
+# None = Vorgabe von numba (ein Thread pro Kern), eine Zahl = höchstens so viele Threads
+# (z.B. wenn auf dem Rechner noch Audio, Aufnahme oder weitere Spielinstanzen laufen),
+# "auto" = die für diesen Rechner mit renderer_benchmark.py --tune gemessene Konfiguration aus RENDER_TUNING_FILE
+# (ohne Messung die Vorgabe von numba). Das Spiel misst nicht selbst, da die Messung sonst mit dem Menü
+# um die Kerne konkurrieren und den Start eines Rennens verzögern würde.
+# RENDER_CHUNK_SIZE: Spalten bzw. Zeilen, die ein Thread am Stück bekommt (0 = Vorgabe von numba), bei "auto" mitgemessen.
+RENDER_THREADS = None
+RENDER_CHUNK_SIZE = 0
+
+# Chunk-Größen und Anzahl der Frames pro Kombination, die beim automatischen Abstimmen gemessen werden
+RENDER_TUNING_CHUNK_SIZES = (0, 4, 16, 64)
+RENDER_TUNING_FRAMES = 16
+
+# Datei mit den gemessenen Konfigurationen (pro Rechner und Renderer-Konfiguration)
+RENDER_TUNING_FILE = RENDER_CACHE_DIR + "/render_tuning.json"
@@ -1,8 +1,13 @@
 # Einstellungen für die Race-Tracks und ihre Collision-Maps.
 
+import hashlib
+import json
+import os
+
 import numpy # numpy-Arrays für Positionen von Rechteck-Collidern
-from collision import CollisionRect
-from track import Track, KeyCheckpoint 
+from collision import CollisionRect, rect_array
+from track import Track, KeyCheckpoint, SurfaceRaster
+from settings.machine_settings import PLAYER_COLLISION_RECT_WIDTH, PLAYER_COLLISION_RECT_HEIGHT
 
 # Race-Konfiguration
 STD_REQUIRED_LAPS = 3 # Anzahl Runden, die normalerweise nötig sind, um ein Race zu beenden
@@ -11,6 +16,25 @@ STD_REQUIRED_LAPS = 3 # Anzahl Runden, die normalerweise nötig sind, um ein Rac
 DASH_PLATE_HEIGHT = 1.5
 DASH_PLATE_WIDTH = 1.5
 
+# Attribut-Raster der Strecken (siehe Track.build_surface_raster): Track.query_surface liest die Oberfläche
+# unter dem Spieler aus einem Byte pro Zelle, statt Rechtecke zu prüfen. Nur an Rechteckkanten und auf
+# Schlüssel-Checkpoints wird noch exakt geprüft. Das Ergebnis ist dasselbe.
+# Das Raster wird beim ersten Laden einer Strecke erstellt und in TRACK_RASTER_DIR gespeichert
+# (siehe TrackCreator.attach_surface_raster).
+TRACK_SURFACE_RASTER = True
+
+# Kantenlänge einer Zelle in Weltkoordinaten. Kleinere Zellen: weniger exakte Prüfungen an Kanten, mehr Speicher.
+TRACK_RASTER_CELL_SIZE = 0.25
+
+# Höchstzahl der Zellen (1 Byte pro Zelle), sehr große Strecken bekommen entsprechend größere Zellen
+TRACK_RASTER_MAX_CELLS = 1 << 22
+
+# Verzeichnis der gespeicherten Raster
+TRACK_RASTER_DIR = "gfx/baked/tracks"
+
+# Version des Dateiformats, bei Änderungen an der Rasterung erhöhen (alte Raster werden dann neu erstellt)
+TRACK_RASTER_VERSION = 1
+
 # Eine Klasse, die die Erstellung der Objekte kapselt, die die Race-Tracks im Speicher repräsentieren,
 # um das Hauptmodul nicht zu überladen.
 #
@@ -913,4 +937,61 @@ class TrackCreator:
             recovery_rects = [recovery_1],
             has_guard_rails = True,
             dirt_rects = [dirt_1, dirt_2, dirt_3, dirt_4, dirt_5, dirt_6, dirt_7, dirt_8, dirt_9]
-        )
\ No newline at end of file
+        )
+
+    # Versieht die übergebene Strecke mit einem Attribut-Raster für query_surface (siehe TRACK_SURFACE_RASTER).
+    # Ein gespeichertes Raster wird nur verwendet, wenn es zu den Rechtecken der Strecke und den Einstellungen passt,
+    # sonst wird es neu erstellt und gespeichert.
+    def attach_surface_raster(track, cell_size = TRACK_RASTER_CELL_SIZE,
+            probe_size = (PLAYER_COLLISION_RECT_WIDTH, PLAYER_COLLISION_RECT_HEIGHT)):
+        key = surface_raster_key(track, cell_size, probe_size)
+        array_path, info_path = surface_raster_paths(track)
+
+        raster = load_surface_raster(array_path, info_path, key)
+        if raster is None:
+            raster = track.build_surface_raster(cell_size, probe_size, TRACK_RASTER_MAX_CELLS)
+            try:
+                save_surface_raster(array_path, info_path, key, raster)
+            except OSError as e:
+                print(f"Attribut-Raster für {track.name} konnte nicht gespeichert werden: {e}")
+        track.surface_raster = raster
+
+
+
+# Hash über die Rechtecke (mit ihren Bits) der Strecke und die Einstellungen des Rasters.
+# Ändert sich eine Strecke, passt das gespeicherte Raster nicht mehr.
+def surface_raster_key(track, cell_size, probe_size):
+    digest = hashlib.sha256()
+    digest.update(rect_array(track.surface_grid.rects).tobytes())
+    digest.update(repr((track.surface_grid.flags, cell_size, tuple(probe_size), TRACK_RASTER_MAX_CELLS, TRACK_RASTER_VERSION)).encode())
+    return digest.hexdigest()
+
+# Pfade der Array-Datei (.npy) und der Beschreibung (.json) des Rasters einer Strecke
+def surface_raster_paths(track):
+    name = track.name.lower().replace(" ", "_") + "_surface"
+    return os.path.join(TRACK_RASTER_DIR, name + ".npy"), os.path.join(TRACK_RASTER_DIR, name + ".json")
+
+def save_surface_raster(array_path, info_path, key, raster):
+    os.makedirs(TRACK_RASTER_DIR, exist_ok = True)
+    numpy.save(array_path, raster.attributes)
+    with open(info_path, "w", encoding = "utf-8") as f:
+        json.dump({
+            "key": key,
+            "origin": list(raster.origin),
+            "cell_size": raster.cell_size,
+            "probe_size": list(raster.probe_size),
+        }, f, indent = 2)
+
+# Gespeichertes Raster, sofern vorhanden und passend zum Schlüssel, sonst None
+def load_surface_raster(array_path, info_path, key):
+    try:
+        with open(info_path, "r", encoding = "utf-8") as f:
+            info = json.load(f)
+        if info.get("key") != key:
+            return None
+        attributes = numpy.load(array_path)
+        origin, cell_size, probe_size = tuple(info["origin"]), info["cell_size"], info["probe_size"]
+    # Unvollständige oder veraltete Dateien gelten als nicht vorhanden, das Raster wird dann neu erstellt
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+    return SurfaceRaster(attributes, origin, cell_size, probe_size)
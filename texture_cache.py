@@ -0,0 +1,124 @@
+# Prozessweiter Cache für vorbereitete Mode-7-Texturen.
+# Beim Neustart eines Rennens (Taste R, Game Over, nächstes Liga-Rennen) wird jedes Mal ein neuer Mode7-Renderer erstellt.
+# Ohne Cache würden dabei die großen Boden-PNGs jedes Mal neu dekodiert, umgewandelt und aufgefüllt.
+#
+# Zusätzlich können vorbereitete Texturen offline als .npy-Dateien "vorgebacken" werden (siehe bake_textures.py).
+# Diese werden per Memory-Mapping geöffnet, d.h. das Laden kostet fast nichts und mehrere Spielinstanzen
+# auf einem Rechner teilen sich die Seiten über den Cache des Betriebssystems.
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy
+
+class TextureCache:
+    # Der Cache hält Einträge bis zur Speichergrenze budget_bytes (Summe der Array-Größen).
+    # Wird sie überschritten, werden die am längsten nicht verwendeten Einträge verworfen (LRU).
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+
+        # Schlüssel -> (Wert, Größe in Bytes), in der Reihenfolge der letzten Verwendung (neueste zuletzt)
+        self.entries = OrderedDict()
+        self.used_bytes = 0
+
+        # Zähler für das Monitoring (siehe stats)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Gibt den Wert zum Schlüssel zurück. Ist er nicht im Cache, wird er über load() erzeugt und eingetragen.
+    # Der Schlüssel muss alles enthalten, wovon das Ergebnis abhängt (Pfad, Pixelformat, Renderer-Einstellungen, ...).
+    # Die zurückgegebenen Arrays werden zwischen Renderern geteilt und dürfen deshalb nicht verändert werden.
+    def get(self, key, load):
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+
+        self.misses += 1
+        value = load()
+        self.put(key, value)
+        return value
+
+    # Trägt einen Wert ein und verwirft danach alte Einträge, bis die Speichergrenze wieder eingehalten wird.
+    # Der gerade eingetragene Wert bleibt immer erhalten, auch wenn er allein schon größer als die Grenze ist.
+    def put(self, key, value):
+        if key in self.entries:
+            self.used_bytes -= self.entries.pop(key)[1]
+
+        size = self.size_of(value)
+        self.entries[key] = (value, size)
+        self.used_bytes += size
+
+        while self.used_bytes > self.budget_bytes and len(self.entries) > 1:
+            _, (_, evicted_size) = self.entries.popitem(last = False)
+            self.used_bytes -= evicted_size
+            self.evictions += 1
+
+    # Leert den Cache (die Zähler bleiben erhalten).
+    def clear(self):
+        self.entries.clear()
+        self.used_bytes = 0
+
+    # Zählerstände und Belegung für das Monitoring
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "used_bytes": self.used_bytes,
+            "budget_bytes": self.budget_bytes,
+        }
+
+    # Speicherbedarf eines Werts: Summe der enthaltenen numpy-Arrays (auch in Tupeln)
+    @staticmethod
+    def size_of(value):
+        if isinstance(value, numpy.ndarray):
+            return value.nbytes
+        if isinstance(value, (tuple, list)):
+            return sum(TextureCache.size_of(item) for item in value)
+        return 0
+
+# ------------------ Vorgebackene Texturen ---------------------------
+
+# Version des Formats vorgebackener Texturen. Wird erhöht, wenn sich Inhalt oder Angaben ändern,
+# damit ältere Dateien als veraltet erkannt werden statt falsch gelesen zu werden.
+BAKED_TEXTURE_VERSION = 2
+
+# Hash über den Inhalt der Quelldatei. Ändert sich die PNG-Datei, passt eine vorgebackene Textur nicht mehr.
+def source_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+# Pfade der Array-Datei (.npy) und der Beschreibung (.json) einer vorgebackenen Textur
+def baked_texture_paths(directory, name):
+    return os.path.join(directory, name + ".npy"), os.path.join(directory, name + ".json")
+
+# Speichert eine vorbereitete Textur samt Hash der Quelldatei und weiteren Angaben (info, z.B. Größe und Mip-Tabelle).
+def save_baked_texture(directory, name, source_path, array, info):
+    array_path, info_path = baked_texture_paths(directory, name)
+    os.makedirs(directory, exist_ok = True)
+    numpy.save(array_path, numpy.ascontiguousarray(array))
+    with open(info_path, "w", encoding = "utf-8") as f:
+        json.dump(dict(info, source_hash = source_hash(source_path), version = BAKED_TEXTURE_VERSION), f, indent = 2)
+
+# Öffnet eine vorgebackene Textur per Memory-Mapping (nur lesend).
+# Gibt (Array, Angaben) zurück, oder None, falls es keine gibt oder sie nicht mehr zur Quelldatei passt.
+def load_baked_texture(directory, name, source_path):
+    array_path, info_path = baked_texture_paths(directory, name)
+    if not (os.path.exists(array_path) and os.path.exists(info_path)):
+        return None
+
+    try:
+        with open(info_path, "r", encoding = "utf-8") as f:
+            info = json.load(f)
+        if info.get("version") != BAKED_TEXTURE_VERSION or info.get("source_hash") != source_hash(source_path):
+            print(f"Vorgebackene Textur {name} ist veraltet, lade {source_path} (bake_textures.py neu ausführen)")
+            return None
+        return numpy.load(array_path, mmap_mode = "r"), info
+    except Exception as e:
+        print(f"Fehler beim Laden der vorgebackenen Textur {name}: {e}")
+        return None
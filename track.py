@@ -1,3 +1,47 @@
+import math
+
+import numpy
+
+from collision import CollisionGrid, CollisionHitCache, rect_array, overlap_matrix, overlaps_any
+
+# Arten von Kollisionsrechtecken einer Strecke, unter denen die Batch-Abfragen die Rechtecke finden
+# (siehe Track.rect_arrays)
+RECT_CATEGORIES = ("track_surface", "ramp", "dash_plate", "recovery_zone", "dirt", "finish_line", "key_checkpoint")
+
+# Bits des Ergebnisses von Track.query_surface: worauf das abgefragte Kollisionsrechteck liegt
+SURFACE_ON_TRACK = 1 << 0
+SURFACE_DASH_PLATE = 1 << 1
+SURFACE_RAMP = 1 << 2
+SURFACE_RECOVERY_ZONE = 1 << 3
+SURFACE_DIRT = 1 << 4
+SURFACE_FINISH_LINE = 1 << 5
+
+# Ab diesem Bit ein Bit pro Schlüssel-Checkpoint (in der Reihenfolge von Track.key_checkpoints),
+# gesetzt, wenn das Rechteck den Checkpoint trifft (siehe surface_key_checkpoints)
+SURFACE_KEY_CHECKPOINT_SHIFT = 8
+
+# Bit für den Schlüssel-Checkpoint mit dem übergebenen Index
+def surface_key_checkpoint_flag(index):
+    return 1 << (SURFACE_KEY_CHECKPOINT_SHIFT + index)
+
+# Bit im Attribut-Raster einer Strecke (siehe SurfaceRaster): Das Ergebnis hängt in dieser Zelle von der genauen
+# Position ab (Kante eines Rechtecks) oder passt nicht in ein Byte (Schlüssel-Checkpoint), es wird exakt geprüft
+RASTER_EXACT_TEST = 1 << 7
+
+# Abstand, um den die Zellen des Attribut-Rasters von den Rechteckkanten entfernt sein müssen, damit ihr Wert
+# nicht von Rundungsfehlern der exakten Prüfung abhängt (siehe build_surface_raster)
+RASTER_MARGIN = 1e-6
+
+# Indizes der Schlüssel-Checkpoints, deren Bits im Ergebnis von Track.query_surface gesetzt sind
+def surface_key_checkpoints(surface):
+    checkpoints = surface >> SURFACE_KEY_CHECKPOINT_SHIFT
+    index = 0
+    while checkpoints:
+        if checkpoints & 1:
+            yield index
+        checkpoints >>= 1
+        index += 1
+
 # Eine Klasse, die (die Kollisionskarte für) eine Rennstrecke modelliert.
 # Objekte der Klasse enthalten einen Namen und mehrere Listen von Kollisionsrechtecken,
 # die die Streckenoberfläche, Rampen, verschiedene Arten von Gimmicks und Hindernissen modellieren, ...
@@ -28,6 +72,48 @@ class Track:
         # (im letzteren Fall fällt der Spieler einfach von der Strecke)
         self.has_guard_rails = has_guard_rails
 
+        # Räumliche Indizes über die Rechtecke jeder Art, damit eine Abfrage nur die Rechtecke
+        # in der Nähe prüft statt aller Rechtecke der Strecke (siehe CollisionGrid)
+        self.track_surface_grid = CollisionGrid(self.track_surface_rects)
+        self.ramp_grid = CollisionGrid(self.ramp_rects)
+        self.dash_plate_grid = CollisionGrid(self.dash_plate_rects)
+        self.recovery_zone_grid = CollisionGrid(self.recovery_zone_rects)
+        self.dirt_grid = CollisionGrid(self.dirt_rects)
+
+        # Ein gemeinsamer Index über alle Rechtecke, jedes mit dem Bit seiner Art (siehe query_surface)
+        surface_rects = [
+            (self.track_surface_rects, SURFACE_ON_TRACK), (self.dash_plate_rects, SURFACE_DASH_PLATE),
+            (self.ramp_rects, SURFACE_RAMP), (self.recovery_zone_rects, SURFACE_RECOVERY_ZONE),
+            (self.dirt_rects, SURFACE_DIRT), ([self.finish_line_collider], SURFACE_FINISH_LINE),
+        ] + [
+            ([key_checkpoint.collider], surface_key_checkpoint_flag(index))
+            for index, key_checkpoint in enumerate(self.key_checkpoints)
+        ]
+        self.surface_grid = CollisionGrid(
+            [rect for rects, _ in surface_rects for rect in rects],
+            flags = [flag for rects, flag in surface_rects for _ in rects]
+        )
+
+        # Optionales Attribut-Raster, aus dem query_surface die Oberfläche direkt abliest
+        # (siehe SurfaceRaster und TrackCreator.attach_surface_raster in den Strecken-Einstellungen)
+        self.surface_raster = None
+
+        # Zwischenspeicher der Abfragestellen für die Methoden is_on_... ((Art, Name der Stelle) -> CollisionHitCache),
+        # angelegt bei der ersten Abfrage einer Stelle (siehe hit_cache)
+        self.hit_caches = {}
+
+        # Die Rechtecke jeder Art als (N, 4)-Array (Mittelpunkt, halbe Breite und Höhe) für Batch-Abfragen
+        # mit vielen Probe-Rechtecken auf einmal (siehe batch_overlaps)
+        self.rect_arrays = {
+            "track_surface": rect_array(self.track_surface_rects),
+            "ramp": rect_array(self.ramp_rects),
+            "dash_plate": rect_array(self.dash_plate_rects),
+            "recovery_zone": rect_array(self.recovery_zone_rects),
+            "dirt": rect_array(self.dirt_rects),
+            "finish_line": rect_array([self.finish_line_collider]),
+            "key_checkpoint": rect_array([key_checkpoint.collider for key_checkpoint in self.key_checkpoints]),
+        }
+
 
     
     # ------------------ Methoden für Kollisionserkennung ---------------------------
@@ -36,6 +122,12 @@ class Track:
 
     # Diese Methoden prüfen, ob ein übergebenes rechteckiges Kollisionsrechteck
     # mit etwas auf der Strecke kollidiert.  
+    #
+    # Mit Attribut-Raster (siehe SurfaceRaster) wird das Bit der Art aus dem Raster gelesen,
+    # nur an Rechteckkanten (und für Kollisionsrechtecke anderer Größe) wird der Index der Art abgefragt.
+    # Der optionale Parameter site benennt die Stelle im Code, die fragt (z.B. "movement").
+    # Die Abfrage über den Index prüft dann zuerst das Rechteck, das an dieser Stelle zuletzt getroffen wurde
+    # (siehe hit_cache).
 
 
 
@@ -43,37 +135,42 @@ class Track:
     # 
     # Parameter:
     # other (CollisionRect)
-    def is_on_track(self, other):
-        return collides_with_list(self.track_surface_rects, other)
+    # site (str)
+    def is_on_track(self, other, site = None):
+        return self.overlaps_category(other, "track_surface", self.track_surface_grid, SURFACE_ON_TRACK, site)
 
     # Bestimmt, ob das übergebene rechteckige Kollisionsrechteck eine Dash-Plate auf der Strecke trifft oder nicht.
     #
     # Parameter:
     # other (CollisionRect)
-    def is_on_dash_plate(self, other):
-        return collides_with_list(self.dash_plate_rects, other)
+    # site (str)
+    def is_on_dash_plate(self, other, site = None):
+        return self.overlaps_category(other, "dash_plate", self.dash_plate_grid, SURFACE_DASH_PLATE, site)
 
     # Bestimmt, ob das übergebene rechteckige Kollisionsrechteck eine Wiederherstellungszone auf der Strecke trifft.
     #
     # Parameter:
     # other (CollisionRect)
-    def is_on_recovery_zone(self, other):
-        return collides_with_list(self.recovery_zone_rects, other)
+    # site (str)
+    def is_on_recovery_zone(self, other, site = None):
+        return self.overlaps_category(other, "recovery_zone", self.recovery_zone_grid, SURFACE_RECOVERY_ZONE, site)
 
     # Bestimmt, ob das übergebene rechteckige Kollisionsrechteck auf einer Rampe ist oder nicht.
     #
     # Parameter:
     # other (CollisionRect)
-    def is_on_ramp(self, other):
-        return collides_with_list(self.ramp_rects, other)
+    # site (str)
+    def is_on_ramp(self, other, site = None):
+        return self.overlaps_category(other, "ramp", self.ramp_grid, SURFACE_RAMP, site)
 
     # Bestimmt, ob das übergebene rechteckige Kollisionsrechteck auf einer Dirt-Zone ist.
     # Dirt-Zonen verlangsamen den Spieler (Damping-Effekt).
     #
     # Parameter:
     # other (CollisionRect)
-    def is_on_dirt(self, other):
-        return collides_with_list(self.dirt_rects, other)
+    # site (str)
+    def is_on_dirt(self, other, site = None):
+        return self.overlaps_category(other, "dirt", self.dirt_grid, SURFACE_DIRT, site)
 
     # Bestimmt, ob das übergebene rechteckige Kollisionsrechteck auf der Ziellinie ist oder nicht.
     #
@@ -84,6 +181,127 @@ class Track:
 
 
 
+    # Gemeinsame Umsetzung der Methoden is_on_...: Bit surface_flag aus dem Attribut-Raster,
+    # sonst Abfrage über den Index grid der Art category mit dem Zwischenspeicher der Abfragestelle
+    def overlaps_category(self, other, category, grid, surface_flag, site):
+        if self.surface_raster is not None:
+            surface = self.surface_raster.lookup(other)
+            if surface is not None:
+                return bool(surface & surface_flag)
+        return grid.overlaps(other, self.hit_cache(category, site))
+
+    # Zwischenspeicher der übergebenen Abfragestelle für Rechtecke der übergebenen Art, None ohne Stelle
+    def hit_cache(self, category, site):
+        if site is None:
+            return None
+        cache = self.hit_caches.get((category, site))
+        if cache is None:
+            cache = self.hit_caches[(category, site)] = CollisionHitCache()
+        return cache
+
+    # Zählerstände aller Abfragestellen für das Monitoring ("Art/Stelle" -> Zählerstände, siehe CollisionHitCache.stats)
+    def hit_cache_stats(self):
+        return {f"{category}/{site}": cache.stats() for (category, site), cache in self.hit_caches.items()}
+
+    # Setzt die Zähler aller Abfragestellen zurück (z.B. beim Neustart eines Rennens)
+    def reset_hit_cache_stats(self):
+        for cache in self.hit_caches.values():
+            cache.reset_stats()
+
+    # Bestimmt mit einer Abfrage, worauf das übergebene rechteckige Kollisionsrechteck liegt:
+    # Streckenoberfläche, Dash-Plate, Rampe, Wiederherstellungszone, Dirt-Zone, Ziellinie und Schlüssel-Checkpoints.
+    # Ersetzt mehrere Aufrufe der Methoden oben für dasselbe Rechteck.
+    #
+    # Parameter:
+    # other (CollisionRect)
+    #
+    # Rückgabe: Bitmaske aus SURFACE_ON_TRACK, SURFACE_DASH_PLATE, ... und den Bits der getroffenen
+    # Schlüssel-Checkpoints (siehe surface_key_checkpoints)
+    def query_surface(self, other):
+        if self.surface_raster is not None:
+            surface = self.surface_raster.lookup(other)
+            if surface is not None:
+                return surface
+        return self.surface_grid.overlap_flags(other)
+
+    # Rastert die Rechtecke der Strecke in ein Attribut-Raster für query_surface (siehe SurfaceRaster).
+    # Jede Zelle enthält die Bits aller Rechtecke, die ein Kollisionsrechteck der Größe probe_size treffen würde,
+    # dessen Mittelpunkt irgendwo in der Zelle liegt. Dazu werden die Rechtecke um die halbe Größe des
+    # Kollisionsrechtecks vergrößert. Zellen, in denen das vom genauen Mittelpunkt abhängt, bekommen RASTER_EXACT_TEST.
+    #
+    # Parameter:
+    # cell_size     - Kantenlänge einer Zelle in Weltkoordinaten
+    # probe_size    - (Breite, Höhe) der Kollisionsrechtecke, die abgefragt werden (z.B. des Spielers)
+    # max_cells     - Höchstzahl der Zellen, bei größeren Strecken werden die Zellen entsprechend größer
+    #
+    # Rückgabe: SurfaceRaster
+    def build_surface_raster(self, cell_size, probe_size, max_cells):
+        rects = rect_array(self.surface_grid.rects)
+        flags = self.surface_grid.flags
+        probe_half_width, probe_half_height = probe_size[0] / 2, probe_size[1] / 2
+
+        # Vergrößerte Rechtecke wie in CollisionRect.overlap (halbe Breite des Rechtecks plus halbe Breite der Probe)
+        half_widths = rects[:, 2] + probe_half_width
+        half_heights = rects[:, 3] + probe_half_height
+        left, right = rects[:, 0] - half_widths, rects[:, 0] + half_widths
+        bottom, top = rects[:, 1] - half_heights, rects[:, 1] + half_heights
+
+        # Raster über alle vergrößerten Rechtecke mit einer Zelle Rand, außerhalb trifft nichts
+        origin = (float(left.min()) - cell_size, float(bottom.min()) - cell_size)
+        extent = (float(right.max()) + cell_size - origin[0], float(top.max()) + cell_size - origin[1])
+        cell_size = max(cell_size, math.sqrt(extent[0] * extent[1] / max_cells))
+        columns, rows = math.ceil(extent[0] / cell_size) + 1, math.ceil(extent[1] / cell_size) + 1
+
+        # certain: Bits der Rechtecke, die eine Zelle ganz enthalten, touched: Bits der Rechtecke, die sie berühren
+        certain = numpy.zeros((columns, rows), dtype = numpy.uint8)
+        touched = numpy.zeros((columns, rows), dtype = numpy.uint8)
+        for index, flag in enumerate(flags):
+            # Schlüssel-Checkpoints haben kein Bit im Raster, ihre Zellen werden immer exakt geprüft
+            raster_flag = flag if flag < RASTER_EXACT_TEST else RASTER_EXACT_TEST
+
+            # Zellen, die das Rechteck (mit Sicherheitsabstand) ganz enthält
+            first_column = math.ceil((left[index] + RASTER_MARGIN - origin[0]) / cell_size)
+            last_column = math.floor((right[index] - RASTER_MARGIN - origin[0]) / cell_size) - 1
+            first_row = math.ceil((bottom[index] + RASTER_MARGIN - origin[1]) / cell_size)
+            last_row = math.floor((top[index] - RASTER_MARGIN - origin[1]) / cell_size) - 1
+            if raster_flag != RASTER_EXACT_TEST and first_column <= last_column and first_row <= last_row:
+                certain[first_column:last_column + 1, first_row:last_row + 1] |= raster_flag
+
+            # Zellen, die das Rechteck (mit Sicherheitsabstand) berührt
+            first_column = math.floor((left[index] - RASTER_MARGIN - origin[0]) / cell_size)
+            last_column = math.floor((right[index] + RASTER_MARGIN - origin[0]) / cell_size)
+            first_row = math.floor((bottom[index] - RASTER_MARGIN - origin[1]) / cell_size)
+            last_row = math.floor((top[index] + RASTER_MARGIN - origin[1]) / cell_size)
+            touched[first_column:last_column + 1, first_row:last_row + 1] |= raster_flag
+
+        # Berührt eine Zelle ein Rechteck, dessen Bit nicht schon sicher gesetzt ist, hängt das Ergebnis
+        # von der genauen Position ab
+        attributes = certain | numpy.where(touched & ~certain, RASTER_EXACT_TEST, 0).astype(numpy.uint8)
+        return SurfaceRaster(attributes, origin, cell_size, probe_size)
+
+    # Batch-Abfragen: bestimmen für viele Kollisionsrechtecke auf einmal (z.B. alle Fahrzeuge eines Frames
+    # oder aufgezeichnete Positionen einer Runde), ob sie Rechtecke einer Art treffen.
+    # Liefern dieselben Ergebnisse wie die Methoden oben.
+
+    # Bestimmt für jedes der übergebenen Kollisionsrechtecke, ob es ein Rechteck der übergebenen Art trifft.
+    #
+    # Parameter:
+    # category  - Art der Rechtecke (siehe RECT_CATEGORIES), z.B. "track_surface" wie is_on_track
+    # probes    - Liste von CollisionRect oder (M, 4)-Array (siehe collision.rect_array)
+    #
+    # Rückgabe: (M,)-Array aus bool
+    def batch_overlaps(self, category, probes):
+        return overlaps_any(probes, self.rect_arrays[category])
+
+    # Wie batch_overlaps, aber für jedes Rechteck der Art einzeln
+    # (z.B. welche Schlüssel-Checkpoints eine aufgezeichnete Runde getroffen hat).
+    #
+    # Rückgabe: (M, N)-Array aus bool, N = Anzahl der Rechtecke der Art
+    def batch_overlap_matrix(self, category, probes):
+        return overlap_matrix(probes, self.rect_arrays[category])
+
+
+
     # --------------------- Ende der Methoden für Kollisionserkennung ---------------------------
 
 
@@ -100,6 +318,11 @@ class Track:
             if key_checkpoint.collider.overlap(player_coll):
                 key_checkpoint.passed = True
 
+    # Wie update_key_checkpoints, aber mit dem Ergebnis von query_surface statt des Kollisionsrechtecks.
+    def update_key_checkpoints_from_surface(self, surface):
+        for index in surface_key_checkpoints(surface):
+            self.key_checkpoints[index].passed = True
+
     # Gibt genau dann true zurück,
     # wenn der Spieler alle Schlüssel-Checkpoints auf der Strecke passiert hat.
     def all_key_checkpoints_passed(self):
@@ -141,6 +364,33 @@ class KeyCheckpoint:
         self.collider = collider
         self.passed = False
 
+# Attribut-Raster einer Strecke: ein Byte pro Zelle eines gleichmäßigen Gitters mit den Bits von query_surface
+# (siehe Track.build_surface_raster). Statt Rechtecke zu prüfen, wird die Zelle unter dem Mittelpunkt
+# des abgefragten Kollisionsrechtecks gelesen, der Aufwand hängt also nicht von der Strecke ab.
+# Gilt nur für Kollisionsrechtecke der Größe, für die das Raster erstellt wurde.
+class SurfaceRaster:
+    def __init__(self, attributes, origin, cell_size, probe_size):
+        self.attributes = attributes
+        self.origin = origin
+        self.cell_size = cell_size
+        self.probe_size = tuple(probe_size)
+        self.columns, self.rows = attributes.shape
+
+        # Zellen als bytes (Spalte für Spalte), da das Lesen eines Bytes schneller ist als der Zugriff aufs Array
+        self.cells = attributes.tobytes()
+
+    # Bits von query_surface für das übergebene Kollisionsrechteck,
+    # None, wenn das Raster dafür nicht reicht (andere Größe, Zelle an einer Kante oder mit Schlüssel-Checkpoint)
+    def lookup(self, other):
+        if (other.width, other.height) != self.probe_size:
+            return None
+        column = math.floor((other.position[0] - self.origin[0]) / self.cell_size)
+        row = math.floor((other.position[1] - self.origin[1]) / self.cell_size)
+        if not (0 <= column < self.columns and 0 <= row < self.rows):
+            return 0
+        surface = self.cells[column * self.rows + row]
+        return None if surface & RASTER_EXACT_TEST else surface
+
 # Prüft, ob das übergebene rechteckige Kollisionsrechteck
 # mit einem der Kollisionsrechtecke in der übergebenen Liste kollidiert.
 #